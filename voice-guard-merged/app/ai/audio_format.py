@@ -0,0 +1,156 @@
+# app/ai/audio_format.py
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# 클라이언트 코덱 -> Google STT 인코딩. pcm16/f32는 서버에서 16k 이하 mono LINEAR16으로 변환, 나머지는 그대로 전달
+CODECS = {
+    "pcm16": "LINEAR16",
+    "f32": "LINEAR16",
+    "mulaw": "MULAW",
+    "flac": "FLAC",
+    "ogg_opus": "OGG_OPUS",
+    "webm_opus": "WEBM_OPUS",
+}
+# start 메시지에 MIME 타입(MediaRecorder.mimeType 등)을 그대로 보내도 받아들인다
+_MIME_CODECS = {
+    "audio/l16": "pcm16",
+    "audio/pcm": "pcm16",
+    "audio/basic": "mulaw",
+    "audio/pcmu": "mulaw",
+    "audio/flac": "flac",
+    "audio/ogg": "ogg_opus",
+    "audio/webm": "webm_opus",
+}
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+TARGET_RATE_HZ = 16000
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """
+    STT 소켓의 start 핸드셰이크로 정한 입력 오디오 형식.
+    {"type": "start", "codec": "pcm16"|"f32"|"mulaw"|"flac"|"ogg_opus"|"webm_opus" (또는 MIME 타입),
+     "sampleRate": 48000, "channels": 1}
+    핸드셰이크 없이 바로 바이너리를 보내는 기존 클라이언트는 16kHz mono pcm16으로 본다.
+    """
+    codec: str = "pcm16"
+    sample_rate_hz: int = TARGET_RATE_HZ
+    channels: int = 1
+
+    @classmethod
+    def from_start(cls, msg: Any) -> "AudioFormat":
+        """start 메시지 검증. 지원하지 않는 형식이면 ValueError"""
+        if not isinstance(msg, dict) or msg.get("type") != "start":
+            raise ValueError('첫 텍스트 메시지는 {"type": "start", ...} 여야 합니다')
+        codec = str(msg.get("codec") or "pcm16").strip().lower()
+        codec = _MIME_CODECS.get(codec.split(";")[0].strip(), codec)
+        if codec not in CODECS:
+            raise ValueError(f"지원하지 않는 코덱: {codec} (가능: {', '.join(CODECS)})")
+        try:
+            rate = int(msg.get("sampleRate") or TARGET_RATE_HZ)
+            channels = int(msg.get("channels") or 1)
+        except (TypeError, ValueError):
+            raise ValueError("sampleRate/channels는 정수여야 합니다")
+        if not 8000 <= rate <= 48000:
+            raise ValueError(f"지원하지 않는 샘플레이트: {rate} (8000~48000)")
+        if codec.endswith("_opus") and rate not in _OPUS_RATES:
+            raise ValueError(f"Opus 샘플레이트는 {_OPUS_RATES} 중 하나여야 합니다")
+        if not 1 <= channels <= 8:
+            raise ValueError(f"지원하지 않는 채널 수: {channels}")
+        return cls(codec=codec, sample_rate_hz=rate, channels=channels)
+
+    @property
+    def passthrough(self) -> bool:
+        """압축/전화 코덱은 디코딩하지 않고 Google로 그대로 전달"""
+        return self.codec not in ("pcm16", "f32")
+
+    @property
+    def stt_encoding(self) -> str:
+        return CODECS[self.codec]
+
+    @property
+    def stt_sample_rate_hz(self) -> int:
+        return self.sample_rate_hz if self.passthrough else min(self.sample_rate_hz, TARGET_RATE_HZ)
+
+    @property
+    def stt_channels(self) -> int:
+        return self.channels if self.passthrough else 1
+
+    def create_transcoder(self) -> Optional["PcmTranscoder"]:
+        """변환이 필요 없으면(전달 코덱 또는 16k 이하 mono pcm16) None"""
+        if self.passthrough or (self.codec == "pcm16" and self.channels == 1 and self.sample_rate_hz <= TARGET_RATE_HZ):
+            return None
+        return PcmTranscoder(self, self.stt_sample_rate_hz)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "codec": self.codec,
+            "sampleRate": self.sample_rate_hz,
+            "channels": self.channels,
+            "mode": "passthrough" if self.passthrough else ("transcode" if self.create_transcoder() else "pcm"),
+            "sttEncoding": self.stt_encoding,
+            "sttSampleRate": self.stt_sample_rate_hz,
+        }
+
+DEFAULT_AUDIO_FORMAT = AudioFormat()
+
+def _lowpass_taps(ratio: float, taps: int = 63) -> np.ndarray:
+    """다운샘플링 전 에일리어싱 방지용 windowed-sinc FIR (차단 주파수 = 출력 나이퀴스트의 90%)"""
+    fc = 0.45 / ratio
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * fc * np.sinc(2 * fc * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+class PcmTranscoder:
+    """
+    인터리브된 pcm16/f32 다채널 청크 -> mono int16(LINEAR16) target_rate 스트림 변환.
+    - 채널 평균으로 다운믹스, 다운샘플링은 FIR 저역통과 후 선형 보간, 모두 청크 단위 NumPy 연산
+    - 청크 경계(샘플 중간에서 잘린 바이트, 필터 이력, 보간 위상)는 다음 청크로 이어서 처리
+    """
+    def __init__(self, fmt: AudioFormat, target_rate_hz: int):
+        self.dtype = np.dtype("<f4" if fmt.codec == "f32" else "<i2")
+        self.channels = fmt.channels
+        self.scale = 32768.0 if fmt.codec == "f32" else 1.0
+        self.ratio = fmt.sample_rate_hz / target_rate_hz
+        self._frame_bytes = self.dtype.itemsize * self.channels
+        self._pending = b""
+        self._fir = _lowpass_taps(self.ratio) if self.ratio > 1 else None
+        self._history = np.zeros(len(self._fir) - 1 if self._fir is not None else 0, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+        self._stats = {"bytes_in": 0, "bytes_out": 0}
+
+    def process(self, chunk: bytes) -> bytes:
+        data = self._pending + chunk
+        n = len(data) // self._frame_bytes
+        self._pending = data[n * self._frame_bytes:]
+        self._stats["bytes_in"] += len(chunk)
+        if n == 0:
+            return b""
+        x = np.frombuffer(data, dtype=self.dtype, count=n * self.channels).astype(np.float32)
+        if self.channels > 1:
+            x = x.reshape(n, self.channels).mean(axis=1)
+        x *= self.scale
+        if self.ratio != 1:
+            x = self._resample(x)
+        out = np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
+        self._stats["bytes_out"] += len(out)
+        return out
+
+    def _resample(self, x: np.ndarray) -> np.ndarray:
+        if self._fir is not None:
+            y = np.concatenate((self._history, x))
+            self._history = y[len(y) - len(self._history):]
+            x = np.convolve(y, self._fir, mode="valid")
+        buf = np.concatenate((self._tail, x))
+        last = len(buf) - 1  # 마지막 샘플은 다음 청크와의 보간을 위해 남긴다
+        count = max(0, int(np.ceil((last - self._pos) / self.ratio)))
+        t = self._pos + self.ratio * np.arange(count)
+        out = np.interp(t, np.arange(len(buf)), buf)
+        self._pos = self._pos + self.ratio * count - max(last, 0)
+        self._tail = buf[-1:]
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
@@ -0,0 +1,199 @@
+# app/ai/audio_queue.py
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from ..config import settings
+
+POLICIES = ("block", "coalesce", "drop")
+
+# 프로세스 전체 누적 통계 (세션 종료 시 합산) - 워커 크기 산정용
+_totals: Dict[str, Any] = {
+    "sessions": 0, "active_sessions": 0, "chunks_in": 0, "bytes_in": 0,
+    "dropped_chunks": 0, "dropped_bytes": 0, "coalesced_chunks": 0,
+    "blocked": 0, "blocked_seconds": 0.0, "max_high_water": 0,
+}
+_totals_lock = threading.Lock()
+
+def audio_queue_totals() -> Dict[str, Any]:
+    with _totals_lock:
+        return {**_totals, "blocked_seconds": round(_totals["blocked_seconds"], 3)}
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+class AudioQueue:
+    """
+    STT 오디오 청크 큐 (스레드/이벤트 루프 소비자 모두 지원).
+    큐가 가득 찼을 때의 정책:
+    - "block"   : feed_async()가 자리가 날 때까지 기다린다 (WebSocket 수신이 멈추고 TCP로 역압 전달)
+    - "coalesce": 이웃한 프레임을 더 큰 프레임으로 합쳐 자리를 만든다 (순서 유지, max_frame_bytes까지, 더 합칠 수 없으면 drop)
+    - "drop"    : 버린다
+    버린 바이트, 합친 청크, 대기 시간, 큐 깊이 최고치(high-water)를 세션별로 집계한다.
+    close()는 종료 신호: 소비자는 남은 프레임을 모두 받은 뒤 None을 받는다.
+    """
+    def __init__(self, maxsize: int, policy: str, max_frame_bytes: int):
+        if policy not in POLICIES:
+            raise ValueError(f"알 수 없는 역압 정책: {policy} (가능: {', '.join(POLICIES)})")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_frame_bytes = max_frame_bytes
+        self._frames: Deque[bytearray] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._not_empty: Optional[asyncio.Event] = None
+        self._not_full: Optional[asyncio.Event] = None
+        self._stats: Dict[str, Any] = {
+            "chunks_in": 0, "bytes_in": 0, "dropped_chunks": 0, "dropped_bytes": 0,
+            "coalesced_chunks": 0, "blocked": 0, "blocked_seconds": 0.0, "high_water": 0,
+        }
+        with _totals_lock:
+            _totals["sessions"] += 1
+            _totals["active_sessions"] += 1
+
+    @classmethod
+    def from_settings(cls) -> "AudioQueue":
+        return cls(
+            maxsize=settings.stt_queue_max_chunks,
+            policy=settings.stt_backpressure,
+            max_frame_bytes=settings.stt_max_frame_bytes,
+        )
+
+    def bind_loop(self) -> None:
+        """이벤트 루프 안에서 호출: feed_async()/get() 대기용 이벤트를 이 루프에 만든다"""
+        self._loop = asyncio.get_running_loop()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def _notify(self, event: Optional[asyncio.Event]) -> None:
+        loop = self._loop
+        if event is None or loop is None:
+            return
+        if _current_loop() is loop:
+            event.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # 루프 종료됨
+
+    def _append_locked(self, chunk: bytes) -> None:
+        self._frames.append(bytearray(chunk))
+        depth = len(self._frames)
+        if depth > self._stats["high_water"]:
+            self._stats["high_water"] = depth
+        self._cond.notify()
+
+    def _coalesce_locked(self, chunk: bytes) -> bool:
+        frames = self._frames
+        if len(frames[-1]) + len(chunk) <= self.max_frame_bytes:
+            frames[-1] += chunk
+            return True
+        # 가장 오래된 쪽부터 합칠 수 있는 이웃 쌍을 찾아 한 칸을 비운다
+        for i in range(len(frames) - 1):
+            if len(frames[i]) + len(frames[i + 1]) <= self.max_frame_bytes:
+                frames[i] += frames[i + 1]
+                del frames[i + 1]
+                frames.append(bytearray(chunk))
+                return True
+        return False
+
+    def feed(self, chunk: bytes) -> bool:
+        """대기 없이 넣기 (가득 찼으면 "block" 정책이어도 기다릴 수 없으므로 drop). 버렸으면 False"""
+        with self._cond:
+            if self._closed:
+                return False
+            self._stats["chunks_in"] += 1
+            self._stats["bytes_in"] += len(chunk)
+            if len(self._frames) < self.maxsize:
+                self._append_locked(chunk)
+            elif self.policy == "coalesce" and self._coalesce_locked(chunk):
+                self._stats["coalesced_chunks"] += 1
+            else:
+                self._stats["dropped_chunks"] += 1
+                self._stats["dropped_bytes"] += len(chunk)
+                return False
+        self._notify(self._not_empty)
+        return True
+
+    async def feed_async(self, chunk: bytes) -> bool:
+        """정책에 따라 넣기. "block"이면 자리가 날 때까지 기다린다 (닫히면 False)"""
+        if self.policy != "block" or self._not_full is None:
+            return self.feed(chunk)
+        started: Optional[float] = None
+        while True:
+            with self._cond:
+                if self._closed:
+                    return False
+                if len(self._frames) < self.maxsize:
+                    self._stats["chunks_in"] += 1
+                    self._stats["bytes_in"] += len(chunk)
+                    self._append_locked(chunk)
+                    if started is not None:
+                        self._stats["blocked_seconds"] += time.monotonic() - started
+                    break
+                self._not_full.clear()
+            if started is None:
+                started = time.monotonic()
+                self._stats["blocked"] += 1
+            await self._not_full.wait()
+        self._notify(self._not_empty)
+        return True
+
+    def get_blocking(self) -> Optional[bytes]:
+        """스레드 소비자용: 프레임이 올 때까지 대기, 닫히고 비면 None"""
+        with self._cond:
+            while not self._frames and not self._closed:
+                self._cond.wait()
+            if not self._frames:
+                return None
+            frame = self._frames.popleft()
+        self._notify(self._not_full)
+        return bytes(frame)
+
+    async def get(self) -> Optional[bytes]:
+        """이벤트 루프 소비자용 (bind_loop 필요): 프레임이 올 때까지 대기, 닫히고 비면 None"""
+        while True:
+            with self._cond:
+                if self._frames:
+                    frame = self._frames.popleft()
+                    break
+                if self._closed:
+                    return None
+                self._not_empty.clear()
+            await self._not_empty.wait()
+        self._notify(self._not_full)
+        return bytes(frame)
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            stats = dict(self._stats)
+        self._notify(self._not_empty)
+        self._notify(self._not_full)
+        with _totals_lock:
+            _totals["active_sessions"] -= 1
+            for key in ("chunks_in", "bytes_in", "dropped_chunks", "dropped_bytes",
+                        "coalesced_chunks", "blocked", "blocked_seconds"):
+                _totals[key] += stats[key]
+            _totals["max_high_water"] = max(_totals["max_high_water"], stats["high_water"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "blocked_seconds": round(self._stats["blocked_seconds"], 3),
+                "depth": len(self._frames),
+                "policy": self.policy,
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,165 @@
+# app/ai/cascade.py
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..utils.log import get_logger, trace
+from .risk_local import LocalRiskClassifier, get_local_risk_classifier
+from .rule_filter import calculate_rule_score, rule_hit_labels
+
+logger = get_logger("cascade")
+
+# 판정 경로: 명확한 발화는 룰/로컬 분류기에서 끝내고 애매한 발화만 LLM으로
+PATHS = (
+    "clear_safe",        # 룰 미검출 + 로컬 확률 < low
+    "clear_risk_rule",   # 룰 점수 >= rule_certain
+    "clear_risk_local",  # 로컬 확률 >= high + 룰 검출 (둘이 일치)
+    "uncertain_llm",     # 그 밖의 불확실 구간 -> LLM
+    "uncertain_local",   # 불확실 구간이지만 LLM 단계가 없거나(risk_backend=local) 분석기를 쓸 수 없음 -> 로컬(없으면 룰) 판정
+    "llm",               # cascade 꺼짐: 모든 최종 발화를 LLM으로
+)
+
+# 로컬 분류기 라벨(SCHEMA_LABELS) -> 룰 필터 라벨. 한 신호가 두 이름으로 세션 라벨 횟수에 이중 집계되지 않도록
+# cascade 판정 라벨은 룰 필터 분류 체계 하나로 맞춘다
+LOCAL_TO_RULE_LABEL = {
+    "금전요구": "금전/자산이체요구",
+    "개인정보요구": "PII/계정정보요구",
+    "정부기관사칭": "권위기관사칭/압박",
+    "원격제어유도": "원격제어유도",
+    "링크/앱설치": "링크/앱설치유도",
+    "협박/압박": "협박/압박/위협",
+}
+
+# 프로세스 전체 경로별 누적 (LLM 호출 비율 확인용)
+_totals: Dict[str, int] = {path: 0 for path in PATHS}
+_totals_lock = threading.Lock()
+
+def cascade_totals() -> Dict[str, Any]:
+    with _totals_lock:
+        totals = dict(_totals)
+    decided = sum(totals.values())
+    llm = totals["uncertain_llm"] + totals["llm"]
+    return {**totals, "decided": decided, "llm_ratio": round(llm / decided, 4) if decided else 0.0}
+
+@dataclass
+class CascadeDecision:
+    """
+    발화 하나의 판정 경로와 잠정 결과.
+    needs_llm이면 score/labels는 LLM이 실패(마감 초과 등)했을 때 쓸 대체값, 아니면 최종값.
+    labels는 룰 필터 분류 체계 (로컬 분류기 라벨은 LOCAL_TO_RULE_LABEL로 변환, 원래 라벨은 result에)
+    """
+    path: str
+    tier: str                         # 판정한 단계: "rule" | "local" | "llm"
+    needs_llm: bool
+    score: int
+    labels: List[str]
+    rule_score: int
+    local_probability: Optional[float] = None
+    result: Optional[Dict[str, Any]] = field(default=None, repr=False)  # 로컬 분류기 판정 결과
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "tier": self.tier,
+            "rule_score": self.rule_score,
+            "local_probability": round(self.local_probability, 3) if self.local_probability is not None else None,
+        }
+
+class RiskCascade:
+    """
+    최종 발화 위험도 판정 단계 (룰 -> 로컬 분류기 -> LLM).
+    - 룰 점수가 rule_certain 이상이면 룰로 위험 확정
+    - 로컬 분류기의 최대 라벨 확률이 high 이상이고 룰도 검출하면 로컬로 위험 확정
+    - 룰 미검출이고 로컬 확률이 low 미만이면 안전 확정
+    - 나머지(룰과 로컬이 엇갈리거나 확률이 low~high 사이)만 LLM으로 보낸다
+    로컬 분류기를 쓸 수 없으면 룰 미검출 발화도 LLM으로 보낸다 (재현율 우선).
+    LLM 분석기를 쓸 수 없는 소켓(decide(llm_available=False))은 불확실 구간도 로컬(없으면 룰)로 끝낸다.
+    """
+    def __init__(
+        self,
+        local: Optional[LocalRiskClassifier],
+        low: float,
+        high: float,
+        rule_certain: int,
+        enabled: bool = True,
+        llm_tier: bool = True,
+    ):
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"cascade 구간이 잘못되었습니다: low={low}, high={high}")
+        self.local = local
+        self.low = low
+        self.high = high
+        self.rule_certain = rule_certain
+        self.enabled = enabled
+        self.llm_tier = llm_tier
+
+    @classmethod
+    def from_settings(cls) -> "RiskCascade":
+        local: Optional[LocalRiskClassifier] = None
+        try:
+            local = get_local_risk_classifier()
+        except Exception as e:
+            logger.warning("로컬 분류기 없이 cascade 사용 (룰 미검출 발화도 LLM으로): %s", e)
+        return cls(
+            local,
+            low=settings.cascade_low,
+            high=settings.cascade_high,
+            rule_certain=settings.cascade_rule_certain,
+            enabled=settings.cascade_enabled,
+            # risk_backend=local이면 로컬 분류기가 최종 단계 (같은 모델을 두 번 부르지 않음)
+            llm_tier=settings.risk_backend != "local",
+        )
+
+    def decide(self, text: str, rule_labels: Optional[List[str]] = None, llm_available: bool = True) -> CascadeDecision:
+        if rule_labels is None:
+            rule_labels = rule_hit_labels(text)
+        rule_score = calculate_rule_score(rule_labels)
+        if not self.enabled:
+            return self._record(CascadeDecision("llm", "llm", True, rule_score, list(rule_labels), rule_score), text)
+
+        result: Optional[Dict[str, Any]] = None
+        prob: Optional[float] = None
+        local_score = 0
+        labels = list(rule_labels)
+        if self.local is not None:
+            result, proba = self.local.predict(text)
+            prob = max(proba.values(), default=0.0)
+            local_score = result["risk_score"]
+            for label in result["labels"]:
+                mapped = LOCAL_TO_RULE_LABEL.get(label)
+                if mapped is not None and mapped not in labels:
+                    labels.append(mapped)
+        score = max(rule_score, local_score)
+
+        if rule_score >= self.rule_certain:
+            decision = CascadeDecision("clear_risk_rule", "rule", False, score, labels, rule_score, prob, result)
+        elif prob is not None and prob >= self.high and rule_labels:
+            decision = CascadeDecision("clear_risk_local", "local", False, score, labels, rule_score, prob, result)
+        elif prob is not None and prob < self.low and not rule_labels:
+            decision = CascadeDecision("clear_safe", "local", False, 0, [], rule_score, prob, result)
+        elif llm_available and (self.llm_tier or self.local is None):
+            decision = CascadeDecision("uncertain_llm", "llm", True, score, labels, rule_score, prob, result)
+        else:
+            tier = "local" if self.local is not None else "rule"
+            decision = CascadeDecision("uncertain_local", tier, False, score, labels, rule_score, prob, result)
+        return self._record(decision, text)
+
+    @staticmethod
+    def _record(decision: CascadeDecision, text: str) -> CascadeDecision:
+        with _totals_lock:
+            _totals[decision.path] += 1
+        trace(logger, "cascade 판정", text=text, **decision.describe(), score=decision.score)
+        return decision
+
+# 프로세스 공용 cascade (로컬 분류기를 한 번만 학습)
+_shared_cascade: Optional[RiskCascade] = None
+_shared_lock = threading.Lock()
+
+def get_risk_cascade() -> RiskCascade:
+    """FastAPI 의존성"""
+    global _shared_cascade
+    with _shared_lock:
+        if _shared_cascade is None:
+            _shared_cascade = RiskCascade.from_settings()
+        return _shared_cascade
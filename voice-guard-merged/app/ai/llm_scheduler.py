@@ -0,0 +1,165 @@
+# app/ai/llm_scheduler.py
+import asyncio
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+
+class LLMSchedulerError(Exception):
+    """스케줄러가 LLM 호출을 수행하지 못함 (호출부는 룰 점수로 대체하고 그 사실을 알려야 함)"""
+    reason = "scheduler"
+
+class LLMOverloaded(LLMSchedulerError):
+    """대기열이 가득 차 요청을 받지 않음"""
+    reason = "overloaded"
+
+class LLMDeadlineExceeded(LLMSchedulerError):
+    """마감 시간 안에 LLM 결과를 얻지 못함 (대기 중 만료 또는 호출 중 초과)"""
+    reason = "deadline"
+
+@dataclass(order=True)
+class _Job:
+    sort_key: tuple
+    deadline: float = field(compare=False)
+    factory: Callable[[], Awaitable[Dict[str, Any]]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+def llm_priority(rule_score: int = 0, session_score: int = 0) -> int:
+    """
+    우선순위(클수록 먼저): 이미 룰 점수가 높은 발화, 누적 위험도가 임계값을 넘은 통화를 먼저 처리.
+    """
+    priority = rule_score
+    if session_score >= settings.llm_priority_risk_threshold:
+        priority += 100
+    return priority
+
+class LLMScheduler:
+    """
+    프로세스 전역 LLM 호출 스케줄러.
+    - 동시 호출 수를 max_concurrency로 제한 (나머지는 우선순위 큐에서 대기)
+    - 요청마다 마감 시간(deadline): 대기 중 만료되면 호출하지 않고 LLMDeadlineExceeded
+    - 대기열이 max_queue를 넘으면 즉시 LLMOverloaded (admission control)
+    - 호출한 쪽 태스크가 취소되면 대기 중인 요청은 건너뛰고, 진행 중인 호출은 취소
+    """
+    def __init__(self, max_concurrency: int, max_queue: int, deadline_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline_seconds = deadline_seconds
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0,
+                       "rejected": 0, "expired": 0, "timed_out": 0, "cancelled": 0}
+
+    def _ensure_workers(self) -> None:
+        # asyncio 객체는 이벤트 루프에 묶이므로 첫 요청 때 루프 안에서 생성
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def submit(
+        self,
+        factory: Callable[[], Awaitable[Dict[str, Any]]],
+        priority: int = 0,
+        deadline_seconds: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """factory()로 만든 LLM 호출을 예약하고 결과를 기다린다"""
+        self._ensure_workers()
+        if self._queue.qsize() >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise LLMOverloaded(f"LLM 대기열 초과 ({self.max_queue})")
+
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + (deadline_seconds if deadline_seconds is not None else self.deadline_seconds)
+        job = _Job((-priority, next(self._seq)), deadline, factory, loop.create_future())
+        self._stats["submitted"] += 1
+        self._queue.put_nowait(job)
+        return await job.future
+
+    async def _worker(self) -> None:
+        while True:
+            job: _Job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: _Job) -> None:
+        if job.future.done():  # 호출한 소켓이 이미 종료됨
+            self._stats["cancelled"] += 1
+            return
+        remaining = job.deadline - time.monotonic()
+        if remaining <= 0:
+            self._stats["expired"] += 1
+            job.future.set_exception(LLMDeadlineExceeded("LLM 대기 중 마감 시간 초과"))
+            return
+
+        self._in_flight += 1
+        call = asyncio.ensure_future(job.factory())
+        job.future.add_done_callback(lambda f: call.cancel() if f.cancelled() else None)
+        try:
+            result = await asyncio.wait_for(call, timeout=remaining)
+        except asyncio.TimeoutError:
+            self._stats["timed_out"] += 1
+            if not job.future.done():
+                job.future.set_exception(LLMDeadlineExceeded("LLM 호출 중 마감 시간 초과"))
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            if job.future.cancelled():  # 호출한 쪽이 취소함
+                return
+            job.future.cancel()  # 스케줄러 종료: 기다리는 쪽도 깨운다
+            raise
+        except Exception as e:
+            self._stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._stats["completed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "deadline_seconds": self.deadline_seconds,
+        }
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+# 프로세스 공용 스케줄러
+_shared_scheduler: Optional[LLMScheduler] = None
+_shared_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """FastAPI 의존성: 프로세스 공용 LLM 스케줄러"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler(
+                max_concurrency=settings.llm_max_concurrency,
+                max_queue=settings.llm_max_queue,
+                deadline_seconds=settings.llm_deadline_seconds,
+            )
+        return _shared_scheduler
+
+async def close_llm_scheduler() -> None:
+    global _shared_scheduler
+    with _shared_lock:
+        scheduler, _shared_scheduler = _shared_scheduler, None
+    if scheduler is not None:
+        await scheduler.close()
@@ -1,13 +1,29 @@
 # app/ai/risk_analyzer.py
 import os
 import json
+import hashlib
 import re
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
 
+import httpx
 # Google Gen AI SDK (Vertex 경유)
 from google import genai
 from google.genai import types
 
+from ..config import settings
+from ..utils.log import get_logger, trace
+from .result_cache import AnalysisCache, get_analysis_cache
+from .hedging import HedgedRetryPolicy
+from .risk_local import get_local_risk_classifier
+from .llm_scheduler import LLMSchedulerError
+from .stream_json import IncrementalJSONParser, is_complete_json_object, parse_json_object
+
+logger = get_logger("risk_analyzer")
+
+# 스트리밍 중 최상위 필드가 완성될 때마다 지금까지의 필드로 호출되는 콜백
+PartialCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
 # 모델이 순수 JSON만 반환하도록 스키마와 MIME 타입 지정
 RESPONSE_SCHEMA = {
     "type": "OBJECT",
@@ -22,6 +38,20 @@ RESPONSE_SCHEMA = {
     "required": ["risk_score", "risk_level", "labels", "evidence", "reason", "actions"],
 }
 
+# 마이크로 배칭용: 발화별 결과 배열 (id = 입력 순번)
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        **RESPONSE_SCHEMA,
+        "properties": {"id": {"type": "INTEGER"}, **RESPONSE_SCHEMA["properties"]},
+        "required": ["id", *RESPONSE_SCHEMA["required"]],
+    },
+}
+
+# 배치 응답 토큰 한도 (발화당 할당량, 상한)
+_BATCH_TOKENS_PER_ITEM = 384
+_BATCH_MAX_OUTPUT_TOKENS = 8192
+
 SCHEMA_LABELS = [
     "금전요구", "개인정보요구", "정부기관사칭", "원격제어유도", "링크/앱설치", "협박/압박", "의심 없음"
 ]
@@ -48,105 +78,385 @@ SYSTEM_PROMPT = """전화사기 위험도 분석기입니다.
   "actions": ["권고사항"]
 }"""
 
+# 시스템 프롬프트가 바뀌면 캐시 키도 자동으로 바뀌도록 내용 해시를 버전으로 사용
+PROMPT_VERSION = hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:8]
+
 def _build_client() -> genai.Client:
     project = os.getenv("GCP_PROJECT_ID")
     location = os.getenv("GCP_LOCATION", "us-central1")
     if not project:
         raise RuntimeError("GCP_PROJECT_ID 환경변수를 설정하세요.")
+    # 모든 세션이 하나의 keep-alive 커넥션 풀을 공유 (요청마다 TLS 핸드셰이크 방지)
+    limits = httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_connections,
+    )
+    http_options = types.HttpOptions(
+        client_args={"limits": limits},
+        async_client_args={"limits": limits},
+    )
     # Vertex 경유
-    return genai.Client(vertexai=True, project=project, location=location)
+    return genai.Client(vertexai=True, project=project, location=location, http_options=http_options)
+
+class _Fallback(dict):
+    """실패/기본값 결과 표시용 dict (캐시에 저장하지 않음)"""
 
 def _default_result(reason: str) -> Dict[str, Any]:
-    return {
+    return _Fallback({
         "risk_score": 0,
         "risk_level": "LOW",
         "labels": ["의심 없음"],
         "evidence": [],
         "reason": reason[:300],
         "actions": ["의심 시 공식 채널로 직접 확인"],
-    }
+    })
 
-def _strip_code_fences(text: str) -> str:
-    """```json ... ``` 또는 ``` ... ```로 감싼 응답에서 순수 JSON만 추출"""
-    if not text:
-        return text
-    s = text.strip()
-    if s.startswith("```"):
-        # 맨 앞 펜스 제거
-        s = re.sub(r"^```(?:json)?\s*", "", s, count=1, flags=re.IGNORECASE)
-        # 맨 뒤 펜스 제거
-        s = re.sub(r"\s*```$", "", s, count=1)
-    # 여분 텍스트가 붙는 경우 마지막 '}'까지만 사용
-    last = s.rfind("}")
-    if last != -1:
-        s = s[: last + 1]
-    return s.strip()
+def _fallback_result(text: str, reason: str) -> Dict[str, Any]:
+    """Vertex 호출 실패(장애/쿼터) 시 대체 결과: 설정에 따라 로컬 분류기 판정, 아니면 기본값 (둘 다 캐시하지 않음)"""
+    if settings.risk_local_fallback:
+        try:
+            result = get_local_risk_classifier().classify(text)
+            result["reason"] = f"{result['reason']} (LLM 실패: {reason})"[:300]
+            return _Fallback(result)
+        except Exception as e:
+            logger.warning("로컬 분류기 대체 실패: %s", e)
+    return _default_result(reason)
 
 def _safe_load_json(text: str) -> Dict[str, Any]:
-    """가능하면 그대로, 안되면 펜스 제거 후, 그래도 안되면 기본값"""
-    print(f"[DEBUG] JSON 파싱 시도: {repr(text)}")
+    """가능하면 그대로, 안되면 선형 시간 복구 파서, 그래도 안되면 기본값"""
     if not text:
         raise ValueError("빈 응답")
 
     # 1) 일단 그대로
     try:
-        return json.loads(text)
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
     except Exception as e:
-        print(f"[DEBUG] 직접 JSON 파싱 실패: {e}")
+        trace(logger, "직접 JSON 파싱 실패, 복구 파서 사용", error=str(e), text=text)
 
-    # 2) 코드펜스 제거 + 끝 '}'까지
-    cleaned = _strip_code_fences(text)
-    print(f"[DEBUG] 펜스 제거 후 텍스트: {repr(cleaned)}")
+    # 2) 복구 파서: 코드펜스/앞뒤 잡텍스트가 있는 응답에서 최상위 필드를 모두 꺼냄 (잘린 응답은 실패)
     try:
-        return json.loads(cleaned)
-    except Exception as e:
-        print(f"[DEBUG] 펜스 제거 후 JSON 파싱 실패: {e}")
+        return parse_json_object(text)
+    except ValueError as e:
+        logger.warning("LLM JSON 복구 파싱 실패: %s", e)
 
     # 3) 기본값 반환
     return _default_result(f"JSON 파싱 실패: {text[:100]}")
 
+def _load_json_array(text: str) -> List[Dict[str, Any]]:
+    """배치 응답 파싱: 펜스 제거 후 첫 '['부터 마지막 ']'까지"""
+    s = (text or "").strip()
+    if s.startswith("```"):
+        s = re.sub(r"^```(?:json)?\s*", "", s, count=1, flags=re.IGNORECASE)
+        s = re.sub(r"\s*```$", "", s, count=1)
+    first, last = s.find("["), s.rfind("]")
+    if first == -1 or last <= first:
+        raise ValueError("배치 응답에 JSON 배열이 없음")
+    data = json.loads(s[first : last + 1])
+    if not isinstance(data, list):
+        raise ValueError("배치 응답이 배열이 아님")
+    return [d for d in data if isinstance(d, dict)]
+
+def _normalize_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    """파싱된 응답을 스키마에 맞게 보정"""
+    score = int(max(0, min(50, int(data.get("risk_score", 0)))))
+    level = data.get("risk_level")
+    if level not in ["LOW", "MID", "HIGH"]:
+        level = "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW")
+    labels = [l for l in data.get("labels", []) if l in SCHEMA_LABELS] or ["의심 없음"]
+    evidence = data.get("evidence", [])[:3]
+    actions = data.get("actions", [])[:3]
+    reason = (data.get("reason", "") or "")[:300]
+
+    # 추가 검증: 점수가 0이 아닌데 라벨이 "의심 없음"이면 조정
+    if score > 0 and labels == ["의심 없음"]:
+        labels = ["위험 신호 감지"]
+    
+    # 추가 검증: 점수가 0인데 위험 라벨이 있으면 조정
+    if score == 0 and any(l != "의심 없음" for l in labels):
+        labels = ["의심 없음"]
+
+    return {
+        "risk_score": score,
+        "risk_level": level,
+        "labels": labels,
+        "evidence": evidence,
+        "reason": reason,
+        "actions": actions,
+    }
+
+def _normalize_partial(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """스트리밍 중 완성된 필드만 _normalize_result와 같은 범위/허용값으로 보정 (보정할 수 없는 필드는 빼고 전달)"""
+    out: Dict[str, Any] = {}
+    if "risk_score" in fields:
+        try:
+            out["risk_score"] = int(max(0, min(50, int(fields["risk_score"]))))
+        except (TypeError, ValueError):
+            pass
+    level = fields.get("risk_level")
+    if level in ["LOW", "MID", "HIGH"]:
+        out["risk_level"] = level
+    elif level is not None and "risk_score" in out:
+        score = out["risk_score"]
+        out["risk_level"] = "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW")
+    if isinstance(fields.get("labels"), list):
+        labels = [l for l in fields["labels"] if l in SCHEMA_LABELS]
+        if labels:
+            out["labels"] = labels
+    for name in ("evidence", "actions"):
+        if isinstance(fields.get(name), list):
+            out[name] = fields[name][:3]
+    if isinstance(fields.get("reason"), str):
+        out["reason"] = fields["reason"][:300]
+    return out
+
+class _PartialRelay:
+    """
+    hedge/재시도 시도들의 부분 결과를 on_partial 하나로 전달.
+    처음 필드를 보낸 시도만 계속 전달하고, 그 시도가 실패하면(예외, 빈/잘린 응답) 다음 시도가 처음부터 다시 보낸다.
+    """
+    def __init__(self, on_partial: Optional[PartialCallback]):
+        self.on_partial = on_partial
+        self._owner: Optional[int] = None
+        self._attempts = 0
+        self._sent: Dict[str, Any] = {}
+
+    async def run(self, call: Callable[[Optional[PartialCallback]], Awaitable[str]]) -> str:
+        """call(relay)로 한 번 시도하고 응답 텍스트를 반환"""
+        if self.on_partial is None:
+            return await call(None)
+        self._attempts += 1
+        attempt = self._attempts
+
+        async def relay(fields: Dict[str, Any]) -> None:
+            if self._owner is None:
+                self._owner = attempt
+                self._sent = {}
+            if self._owner != attempt:
+                return
+            new = {k: v for k, v in _normalize_partial(fields).items() if k not in self._sent}
+            if not new:
+                return
+            self._sent.update(new)
+            try:
+                await self.on_partial(dict(self._sent))
+            except Exception as e:
+                logger.warning("부분 결과 전달 실패: %s", e)
+
+        complete = False
+        try:
+            text = await call(relay)
+            complete = is_complete_json_object(text)
+            return text
+        finally:
+            if not complete and self._owner == attempt:
+                self._owner = None
+
+class RiskModel(Protocol):
+    """위험도 분석 백엔드 공통 계약 (VertexRiskAnalyzer, LocalRiskClassifier)"""
+    async def analyze_risk(self, text: str, on_partial: Optional[PartialCallback] = None) -> Dict[str, Any]: ...
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]: ...
+
 class VertexRiskAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[AnalysisCache] = None, retry_policy: Optional[HedgedRetryPolicy] = None):
         self.client = _build_client()
         self.model = "gemini-1.5-flash"
+        self.cache = cache if cache is not None else get_analysis_cache()
+        self.retry_policy = retry_policy or HedgedRetryPolicy.from_settings()
+
+    async def _generate_text(
+        self,
+        prompt: str,
+        config: types.GenerateContentConfig,
+        on_partial: Optional[PartialCallback] = None,
+        started: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """
+        한 번 스트리밍 호출하고 전체 텍스트를 반환(없으면 '').
+        on_partial을 주면 응답 조각을 증분 파싱해 최상위 필드가 완성될 때마다 호출하고,
+        첫 조각이 오면 started()로 retry_policy에 알린다 (이후 hedge 안 함).
+        """
+        parser = IncrementalJSONParser() if on_partial is not None else None
+        pieces: List[str] = []
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
+            config=config,
+        )
+        async for chunk in stream:
+            piece = getattr(chunk, "text", "") or ""
+            if not piece:
+                continue
+            if not pieces and started is not None:
+                started()
+            pieces.append(piece)
+            if parser is not None and parser.feed(piece):
+                await on_partial(dict(parser.fields))
+        return "".join(pieces)
 
-    async def analyze_risk(self, text: str) -> Dict[str, Any]:
-        """텍스트의 위험도를 분석하여 결과 반환"""
+    async def analyze_risk(self, text: str, on_partial: Optional[PartialCallback] = None) -> Dict[str, Any]:
+        """
+        텍스트의 위험도를 분석하여 결과 반환.
+        on_partial을 주면 risk_score/risk_level 등 먼저 완성된 필드를 전체 응답 전에 전달한다
+        (_normalize_partial로 보정, 한 시도의 값만 - _PartialRelay).
+        응답이 중간에 잘리면 실패한 시도로 보고 재시도하고, 끝내 잘리면 대체 결과(캐시하지 않음).
+        """
         if not text or not text.strip():
             return _default_result("빈 텍스트")
 
+        # 반복되는 사기 스크립트는 정규화된 텍스트 기준으로 캐시된 결과 재사용
+        key = self.cache.make_key(text, self.model, PROMPT_VERSION) if self.cache is not None else None
+        cached = await self.cache.aget(key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        config = types.GenerateContentConfig(
+            temperature=0.1,
+            max_output_tokens=1024,
+            response_mime_type="application/json",
+            response_schema=RESPONSE_SCHEMA,
+        )
+        partials = _PartialRelay(on_partial)
+
         try:
-            response = self.client.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        parts=[
-                            types.Part.from_text(SYSTEM_PROMPT + f"\n\n분석할 텍스트: {text}")
-                        ]
-                    )
-                ],
-                generation_config=types.GenerationConfig(
-                    temperature=0.1,
-                    max_output_tokens=1024,
-                    response_mime_type="application/json",
-                    response_schema=RESPONSE_SCHEMA,
+            # 비동기 클라이언트 사용: 응답을 기다리는 동안 이벤트 루프(다른 소켓)를 막지 않음
+            # retry_policy가 지연 예산 안에서 hedge/재시도/백오프를 처리하고, 마감 시간을 넘기면
+            # LLMDeadlineExceeded (호출부는 룰 점수 사용). 태스크가 취소되면 진행 중인 요청도 취소된다
+            response_text = await self.retry_policy.run(
+                lambda stage, started: partials.run(
+                    lambda relay: self._generate_text(SYSTEM_PROMPT + f"\n\n분석할 텍스트: {text}", config, relay, started)
                 ),
+                accept=is_complete_json_object,
+            )
+            if not response_text:
+                return _default_result("응답 텍스트 없음")
+            if not is_complete_json_object(response_text):
+                logger.warning("LLM 응답이 중간에 잘려 대체 결과 사용 (%d자)", len(response_text))
+                return _fallback_result(text, "LLM 응답이 중간에 잘림")
+
+            data = _safe_load_json(response_text)
+            trace(logger, "LLM 판정", text=text, response=response_text)
+            if isinstance(data, _Fallback):
+                return data
+            result = _normalize_result(data)
+            if self.cache is not None:
+                self.cache.put(key, result)
+            return result
+
+        except LLMSchedulerError:
+            raise
+        except Exception as e:
+            logger.error("위험도 분석 실패: %s", e)
+            return _fallback_result(text, f"분석 오류: {str(e)}")
+
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        여러 발화를 한 번의 호출로 분석 (RiskBatcher용, 결과는 입력 순서대로).
+        캐시에 있는 발화는 빼고 나머지만 묶어 보내며, 응답에서 빠진 항목은 기본값으로 채운다.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        keys: List[Optional[str]] = [None] * len(texts)
+        todo: List[int] = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = _default_result("빈 텍스트")
+                continue
+            if self.cache is not None:
+                keys[i] = self.cache.make_key(text, self.model, PROMPT_VERSION)
+                cached = await self.cache.aget(keys[i])
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            todo.append(i)
+        if not todo:
+            return results
+
+        listing = "\n".join(f'{n + 1}) "{texts[i]}"' for n, i in enumerate(todo))
+        prompt = (
+            SYSTEM_PROMPT
+            + "\n\n아래 각 발화를 서로 독립적으로 분석해, 발화 번호를 id로 하는 JSON 배열로 입력 순서대로 출력하세요."
+            + f"\n\n분석할 발화:\n{listing}"
+        )
+        config = types.GenerateContentConfig(
+            temperature=0.1,
+            max_output_tokens=min(_BATCH_MAX_OUTPUT_TOKENS, _BATCH_TOKENS_PER_ITEM * len(todo)),
+            response_mime_type="application/json",
+            response_schema=BATCH_RESPONSE_SCHEMA,
+        )
+        try:
+            response_text = await self.retry_policy.run(
+                lambda stage, started: self._generate_text(prompt, config, started=started),
+                accept=lambda t: "[" in t,
             )
+            items = _load_json_array(response_text)
+        except LLMSchedulerError:
+            raise
+        except Exception as e:
+            logger.error("배치 위험도 분석 실패: %s", e)
+            return [r if r is not None else _fallback_result(texts[i], f"분석 오류: {str(e)}")
+                    for i, r in enumerate(results)]
 
-            if not response.candidates:
-                return _default_result("응답 없음")
+        # id가 있으면 id로, 없으면 위치로 매칭
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for pos, item in enumerate(items):
+            try:
+                by_id[int(item.pop("id", pos + 1))] = item
+            except (TypeError, ValueError):
+                by_id[pos + 1] = item
+        for n, i in enumerate(todo):
+            item = by_id.get(n + 1)
+            if item is None:
+                results[i] = _default_result("배치 응답에 항목 누락")
+                continue
+            try:
+                item = _normalize_result(item)
+            except (TypeError, ValueError) as e:
+                results[i] = _default_result(f"배치 응답 항목 형식 오류: {e}")
+                continue
+            if self.cache is not None:
+                self.cache.put(keys[i], item)
+            results[i] = item
+        return results
 
-            candidate = response.candidates[0]
-            if not candidate.content or not candidate.content.parts:
-                return _default_result("응답 내용 없음")
+# 프로세스 공용 분석기: 앱 시작 시 한 번 만들고 모든 세션이 공유
+_shared_analyzer: Optional[RiskModel] = None
+_shared_lock = threading.Lock()
 
-            part = candidate.content.parts[0]
-            if not hasattr(part, 'text') or not part.text:
-                return _default_result("응답 텍스트 없음")
+def init_risk_analyzer() -> RiskModel:
+    """
+    공용 분석기를 생성(이미 있으면 재사용). settings.risk_backend에 따라
+    "vertex"(자격증명이 없으면 예외) | "local"(프로세스 내 분류기)
+    """
+    global _shared_analyzer
+    with _shared_lock:
+        if _shared_analyzer is None:
+            if settings.risk_backend == "local":
+                _shared_analyzer = get_local_risk_classifier()
+            elif settings.risk_backend == "vertex":
+                _shared_analyzer = VertexRiskAnalyzer()
+            else:
+                raise ValueError(f"알 수 없는 위험도 분석 백엔드: {settings.risk_backend} (가능: vertex, local)")
+        return _shared_analyzer
 
-            result = _safe_load_json(part.text)
-            return result
+def get_risk_analyzer() -> Optional[RiskModel]:
+    """FastAPI 의존성. 시작 시 생성에 실패했으면 여기서 다시 시도하고, 그래도 안되면 None"""
+    if _shared_analyzer is not None:
+        return _shared_analyzer
+    try:
+        return init_risk_analyzer()
+    except Exception as e:
+        logger.warning("위험도 분석기 생성 실패: %s", e)
+        return None
 
+async def close_risk_analyzer() -> None:
+    """앱 종료 시 커넥션 풀 정리 (분석 경로가 모두 client.aio를 쓰므로 비동기 클라이언트도 닫는다)"""
+    global _shared_analyzer
+    with _shared_lock:
+        analyzer, _shared_analyzer = _shared_analyzer, None
+    if isinstance(analyzer, VertexRiskAnalyzer):
+        try:
+            await analyzer.client.aio.aclose()
+            analyzer.client.close()  # aclose()는 동기 클라이언트를 닫지 않음
         except Exception as e:
-            print(f"[ERROR] 위험도 분석 실패: {e}")
-            return _default_result(f"분석 오류: {str(e)}")
+            logger.warning("위험도 분석기 종료 실패: %s", e)
@@ -0,0 +1,158 @@
+# app/ai/stream_json.py
+import json
+from typing import Any, Dict, List, Tuple
+
+_WS = " \t\r\n"
+
+class IncrementalJSONParser:
+    """
+    LLM이 스트리밍으로 내보내는 JSON 객체를 조각 단위로 파싱하는 파서.
+    - 최상위 필드(key: value)의 값이 완성되는 즉시 feed()가 (key, value)를 돌려준다
+      (예: risk_score/risk_level이 먼저 나오면 reason/actions를 기다리지 않고 사용 가능)
+    - 입력을 한 글자씩 한 번만 훑는 상태 기계라 전체 길이에 선형 시간
+    - 첫 '{' 앞의 텍스트(코드펜스, 설명 문구)는 건너뛰고, 끝난 뒤의 텍스트는 무시
+    - close(): 응답이 중간에 잘렸으면 끝나지 않은 마지막 값은 버린다 ("risk_score": 3 은 35였을 수 있음).
+      done은 닫는 '}'까지 받은 경우에만 True
+    """
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.errors: List[str] = []
+        self.done = False
+        self._state = "start"   # start | key_or_end | key | colon | value | after_value | done
+        self._key = ""
+        self._buf: List[str] = []
+        self._stack: List[str] = []  # 값 안의 열린 괄호
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """조각을 넣고 이번에 완성된 최상위 필드 목록을 반환"""
+        completed: List[Tuple[str, Any]] = []
+        for c in chunk:
+            state = self._state
+            if state == "done":
+                break
+            if state == "start":
+                if c == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if c == '"':
+                    self._state = "key"
+                    self._buf = []
+                elif c == "}":
+                    self._finish_object()
+            elif state == "key":
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(c)
+                elif c == "\\":
+                    self._escape = True
+                    self._buf.append(c)
+                elif c == '"':
+                    self._key = self._decode_key("".join(self._buf))
+                    self._state = "colon"
+                else:
+                    self._buf.append(c)
+            elif state == "colon":
+                if c == ":":
+                    self._state = "value"
+                    self._buf = []
+                    self._stack = []
+                    self._in_string = False
+                    self._escape = False
+            elif state == "value":
+                self._feed_value(c, completed)
+            elif state == "after_value":
+                if c == ",":
+                    self._state = "key_or_end"
+                elif c == "}":
+                    self._finish_object()
+        return completed
+
+    def _feed_value(self, c: str, completed: List[Tuple[str, Any]]) -> None:
+        buf = self._buf
+        if self._in_string:
+            buf.append(c)
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if not self._stack:
+                    self._emit(completed)
+                    self._state = "after_value"
+            return
+        if not buf and c in _WS:
+            return
+        if c == '"':
+            self._in_string = True
+            buf.append(c)
+        elif c in "[{":
+            self._stack.append(c)
+            buf.append(c)
+        elif c in "]}" and self._stack:
+            self._stack.pop()
+            buf.append(c)
+            if not self._stack:
+                self._emit(completed)
+                self._state = "after_value"
+        elif not self._stack and c in ",}":
+            # 숫자/true/false/null은 구분자가 와야 끝난다
+            self._emit(completed)
+            if c == ",":
+                self._state = "key_or_end"
+            else:
+                self._finish_object()
+        else:
+            buf.append(c)
+
+    def _emit(self, completed: List[Tuple[str, Any]]) -> None:
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            self.errors.append(f"{self._key}: {raw[:40]}")
+            return
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+
+    def _finish_object(self) -> None:
+        self._state = "done"
+        self.done = True
+
+    @staticmethod
+    def _decode_key(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+
+    def close(self) -> Dict[str, Any]:
+        """입력 끝: 완성된 필드만 반환 (끝나지 않은 마지막 값은 복구하지 않음)"""
+        if self._state == "value" and self._buf:
+            self.errors.append(f"{self._key}: 값이 끝나기 전에 응답이 끝남")
+        self._buf = []
+        self._state = "done"
+        return self.fields
+
+def is_complete_json_object(text: str) -> bool:
+    """응답에 닫는 '}'까지 온전한 JSON 객체가 있는지 (잘린 응답은 실패한 시도로 처리하기 위함)"""
+    parser = IncrementalJSONParser()
+    parser.feed(text or "")
+    return parser.done
+
+def parse_json_object(text: str) -> Dict[str, Any]:
+    """
+    결정적 복구 파서: 앞뒤 잡텍스트/코드펜스가 있는 응답에서 최상위 필드를 모두 꺼낸다.
+    객체가 닫히지 않았거나(잘린 응답) 필드가 하나도 없으면 ValueError.
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(text or "")
+    fields = parser.close()
+    if not parser.done:
+        raise ValueError("JSON 객체가 중간에 잘림")
+    if not fields:
+        raise ValueError("JSON 객체를 찾을 수 없음")
+    return fields
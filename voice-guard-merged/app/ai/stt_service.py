@@ -1,29 +1,40 @@
 # app/ai/stt_service.py
 import asyncio
-import queue
 import threading
 import traceback
-from typing import Optional
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Set
 
 from google.cloud import speech_v1 as speech
 
-SPACEPIECE = "\u2581"  # '▁'
+from ..config import settings
+from ..utils.text import clean_text
+from .audio_queue import AudioQueue
+from .audio_format import AudioFormat
+from .stt_local import ScriptedSTT
+from .stt_rotation import StreamRotation, StreamSegment, is_stream_limit_error
+from .vad import create_vad
 
-def clean_text(s: str) -> str:
-    if not s:
-        return s
-    s = s.replace(SPACEPIECE, " ")
-    return " ".join(s.split()).strip()
+class StreamingSTT(Protocol):
+    """STT 백엔드 공통 계약 (소켓 라우터는 이 메서드만 사용)"""
+    async def start(self, on_json: Callable[[dict], Awaitable[None]]) -> None: ...
+    def feed_audio(self, pcm_chunk: bytes) -> None: ...
+    async def feed_audio_async(self, pcm_chunk: bytes) -> None: ...
+    def audio_stats(self) -> Dict[str, Any]: ...
+    def close(self) -> None: ...
 
 def build_streaming_config(
     sample_rate_hz: int = 16000,
+    encoding: str = "LINEAR16",
+    audio_channel_count: int = 1,
     language_code: str = "ko-KR",
     model: str = "default",
     enable_automatic_punctuation: bool = True,
 ) -> speech.StreamingRecognitionConfig:
     cfg = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        encoding=speech.RecognitionConfig.AudioEncoding[encoding],
         sample_rate_hertz=sample_rate_hz,
+        audio_channel_count=audio_channel_count,
         language_code=language_code,
         model=model,  # 리전 미지원 대비 "default"
         enable_automatic_punctuation=enable_automatic_punctuation,
@@ -34,53 +45,97 @@ def build_streaming_config(
         single_utterance=False,
     )
 
+def _stt_payload(result, rotation: Optional[StreamRotation], segment: StreamSegment) -> Optional[dict]:
+    """STT 결과 -> on_json payload (스트림 교체 겹침 구간의 중복 결과면 None)"""
+    if not result.alternatives:
+        return None
+    alt = result.alternatives[0]
+    transcript = clean_text(alt.transcript)
+    if rotation is not None:
+        transcript = rotation.accept(segment, transcript, result.is_final, getattr(result, "result_end_time", None))
+        if transcript is None:
+            return None
+    return {
+        "type": "stt_update",
+        "is_final": result.is_final,
+        "transcript": transcript,
+        "confidence": getattr(alt, "confidence", None),
+    }
+
 class GoogleStreamingSTT:
     """
     start(on_json)  : 내부 스레드에서 Google STT 시작
-    feed_audio(b)   : 16kHz mono int16 PCM 청크 입력
+    feed_audio(b)   : audio_format 형식의 오디오 청크 입력 (기본 16kHz mono int16 PCM)
+                      대기 없음, 큐가 차면 settings.stt_backpressure 정책
+                      PCM은 필요하면 16k 이하 mono로 변환, settings.stt_vad가 켜져 있으면 침묵 구간은 보내지 않음
+                      Opus/FLAC/mu-law는 변환 없이 Google로 그대로 전달
+    feed_audio_async(b): 같은 입력, "block" 정책이면 큐에 자리가 날 때까지 대기
+    audio_stats()   : 오디오 큐/변환/VAD 통계 (버린 바이트, 합친 청크, 대기 시간, 큐 깊이 최고치 등)
     close()         : 종료
+    긴 통화는 스트림 길이 제한(settings.stt_stream_max_seconds) 전에 새 스트림으로 교체 (겹침 재전송 + 중복 제거)
     on_json(payload): 코루틴. {"type":"stt_update","is_final":bool,"transcript":str,"confidence":float|None}
                       오류 시 {"type":"error","stage":"stt","message":..., "trace":...}
     """
-    def __init__(self, sample_rate_hz: int = 16000):
+    def __init__(self, sample_rate_hz: int = 16000, audio_format: Optional[AudioFormat] = None):
         self.client = speech.SpeechClient()
-        self.streaming_config = build_streaming_config(sample_rate_hz=sample_rate_hz)
-        self._audio_q: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=64)
+        self.audio_format = audio_format or AudioFormat(sample_rate_hz=sample_rate_hz)
+        self.streaming_config = build_streaming_config(
+            sample_rate_hz=self.audio_format.stt_sample_rate_hz,
+            encoding=self.audio_format.stt_encoding,
+            audio_channel_count=self.audio_format.stt_channels,
+        )
+        self._audio_q = AudioQueue.from_settings()
+        self._transcoder = self.audio_format.create_transcoder()
+        # VAD는 PCM(LINEAR16)에서만: 압축 코덱은 디코딩하지 않고 그대로 보낸다
+        self._vad = create_vad(self.audio_format.stt_sample_rate_hz) if self.audio_format.stt_encoding == "LINEAR16" else None
+        self._rotation = StreamRotation.for_format(self.audio_format)
         self._running = False
         self._thread: Optional[threading.Thread] = None
 
-    def _request_generator(self):
+    def _request_generator(self, segment: StreamSegment, replay: List[bytes]):
         from google.cloud.speech_v1 import StreamingRecognizeRequest
-        # 설정은 전송하지 않고 오디오 데이터만 전송
+        # 설정은 전송하지 않고 오디오 데이터만 전송 (교체된 스트림은 겹침 오디오부터)
+        for chunk in replay:
+            yield StreamingRecognizeRequest(audio_content=chunk)
         while self._running:
-            chunk = self._audio_q.get()
+            if self._rotation is not None and self._rotation.due(segment):
+                segment.rotate = True  # 이 스트림은 닫고 다음 스트림으로
+                break
+            chunk = self._audio_q.get_blocking()
             if chunk is None:
                 break
+            if self._rotation is not None:
+                self._rotation.record(segment, chunk)
             yield StreamingRecognizeRequest(audio_content=chunk)
 
     async def start(self, on_json):
         self._running = True
+        self._audio_q.bind_loop()
         loop = asyncio.get_running_loop()
 
         def consume():
+            segment, replay = StreamSegment(), []
             try:
-                # config를 여기서 전달하고, _request_generator()에서는 오디오만 전송
-                responses = self.client.streaming_recognize(
-                    config=self.streaming_config,
-                    requests=self._request_generator()
-                )
-                for response in responses:
-                    for result in response.results:
-                        if not result.alternatives:
-                            continue
-                        alt = result.alternatives[0]
-                        payload = {
-                            "type": "stt_update",
-                            "is_final": result.is_final,
-                            "transcript": clean_text(alt.transcript),
-                            "confidence": getattr(alt, "confidence", None),
-                        }
-                        asyncio.run_coroutine_threadsafe(on_json(payload), loop)
+                while True:
+                    try:
+                        # config를 여기서 전달하고, _request_generator()에서는 오디오만 전송
+                        responses = self.client.streaming_recognize(
+                            config=self.streaming_config,
+                            requests=self._request_generator(segment, replay)
+                        )
+                        for response in responses:
+                            for result in response.results:
+                                payload = _stt_payload(result, self._rotation, segment)
+                                if payload is not None:
+                                    asyncio.run_coroutine_threadsafe(on_json(payload), loop)
+                    except Exception as e:
+                        if not (self._rotation is not None and self._running and is_stream_limit_error(e)):
+                            raise
+                        segment.rotate = True
+                    if not segment.rotate:
+                        break
+                    # 순차 교체: 이전 스트림의 확정 결과를 모두 받은 뒤 다음 스트림을 연다 (그 사이 오디오는 큐에 쌓임)
+                    segment, replay = self._rotation.next_segment()
             except Exception as e:
                 tb = traceback.format_exc()
                 asyncio.run_coroutine_threadsafe(
@@ -91,15 +146,211 @@ class GoogleStreamingSTT:
         self._thread = threading.Thread(target=consume, daemon=True)
         self._thread.start()
 
+    def _prepare(self, chunk: bytes) -> bytes:
+        if self._transcoder is not None:
+            chunk = self._transcoder.process(chunk)
+        return self._vad.process(chunk) if self._vad is not None else chunk
+
     def feed_audio(self, pcm_chunk: bytes):
         if self._running:
-            try:
-                self._audio_q.put_nowait(pcm_chunk)
-            except queue.Full:
-                pass  # 드롭
+            pcm_chunk = self._prepare(pcm_chunk)
+            if pcm_chunk:
+                self._audio_q.feed(pcm_chunk)
+
+    async def feed_audio_async(self, pcm_chunk: bytes):
+        if self._running:
+            pcm_chunk = self._prepare(pcm_chunk)
+            if pcm_chunk:
+                await self._audio_q.feed_async(pcm_chunk)
+
+    def audio_stats(self) -> Dict[str, Any]:
+        return {
+            **self._audio_q.stats(),
+            "format": self.audio_format.describe(),
+            "transcode": self._transcoder.stats() if self._transcoder is not None else None,
+            "vad": self._vad.stats() if self._vad is not None else None,
+            "rotation": self._rotation.stats() if self._rotation is not None else None,
+        }
 
     def close(self):
         self._running = False
+        if self._vad is not None:
+            self._vad.close()
+        self._audio_q.close()  # 남은 오디오를 보낸 뒤 스레드 종료
         if self._thread:
-            self._audio_q.put(None)  # 스레드 종료 신호
             self._thread.join(timeout=1.0)
+
+# 이벤트 루프별 공용 비동기 클라이언트: 하나의 gRPC 채널(HTTP/2) 위에 모든 통화의 스트림을 다중화
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, speech.SpeechAsyncClient]" = weakref.WeakKeyDictionary()
+
+def _shared_async_client() -> speech.SpeechAsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = speech.SpeechAsyncClient()
+        _async_clients[loop] = client
+    return client
+
+async def close_stt_clients() -> None:
+    """앱 종료 시 현재 이벤트 루프의 공용 gRPC 채널 정리"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.transport.close()
+
+class AsyncGoogleStreamingSTT:
+    """
+    GoogleStreamingSTT와 같은 계약(start/feed_audio/close)의 asyncio 기반 구현.
+    - 통화마다 스레드를 만들지 않고 비동기 gRPC 클라이언트(SpeechAsyncClient)의 스트림을 이벤트 루프에서 처리
+    - 오디오는 AudioQueue로 전달, 결과는 on_json 태스크로 바로 예약 (run_coroutine_threadsafe 없음)
+    - 동시 통화 수는 스레드 수가 아니라 이벤트 루프 처리량에 비례
+    - 스트림 교체 시 다음 스트림을 먼저 열고(겹침 오디오 재전송), 이전 스트림의 남은 확정 결과를 받은 뒤 새 결과를 내보낸다
+    """
+    _CLOSE_GRACE_SECONDS = 3.0
+    _HANDOVER_SECONDS = 5.0
+
+    def __init__(self, sample_rate_hz: int = 16000, audio_format: Optional[AudioFormat] = None):
+        self.audio_format = audio_format or AudioFormat(sample_rate_hz=sample_rate_hz)
+        self.streaming_config = build_streaming_config(
+            sample_rate_hz=self.audio_format.stt_sample_rate_hz,
+            encoding=self.audio_format.stt_encoding,
+            audio_channel_count=self.audio_format.stt_channels,
+        )
+        self._audio_q = AudioQueue.from_settings()
+        self._transcoder = self.audio_format.create_transcoder()
+        # VAD는 PCM(LINEAR16)에서만: 압축 코덱은 디코딩하지 않고 그대로 보낸다
+        self._vad = create_vad(self.audio_format.stt_sample_rate_hz) if self.audio_format.stt_encoding == "LINEAR16" else None
+        self._rotation = StreamRotation.for_format(self.audio_format)
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._streams: Set[asyncio.Task] = set()
+        self._callbacks: Set[asyncio.Task] = set()
+
+    async def _requests(self, segment: StreamSegment, replay: List[bytes], rotate: asyncio.Event):
+        # 비동기 클라이언트는 헬퍼가 없으므로 첫 요청에 설정을 직접 담는다
+        yield speech.StreamingRecognizeRequest(streaming_config=self.streaming_config)
+        for chunk in replay:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+        while True:
+            if self._rotation is not None and self._rotation.due(segment):
+                rotate.set()  # 다음 스트림을 열고 이 스트림은 닫는다 (남은 확정 결과는 계속 받음)
+                return
+            chunk = await self._audio_q.get()
+            if chunk is None:
+                return
+            if self._rotation is not None:
+                self._rotation.record(segment, chunk)
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def _dispatch(self, on_json, payload: dict) -> None:
+        # 기존 스레드 구현처럼 결과 처리(LLM 분석 등)가 다음 STT 응답 수신을 막지 않도록 태스크로 실행
+        task = asyncio.create_task(on_json(payload))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def _run_stream(
+        self,
+        on_json,
+        segment: StreamSegment,
+        replay: List[bytes],
+        rotate: asyncio.Event,
+        previous: Optional[asyncio.Task],
+    ) -> None:
+        try:
+            responses = await _shared_async_client().streaming_recognize(requests=self._requests(segment, replay, rotate))
+            async for response in responses:
+                if previous is not None:
+                    # 겹침 구간 중복을 걸러내려면 이전 스트림의 남은 확정 결과가 먼저 나가야 한다
+                    await asyncio.wait({previous}, timeout=self._HANDOVER_SECONDS)
+                    previous.cancel()
+                    previous = None
+                for result in response.results:
+                    payload = _stt_payload(result, self._rotation, segment)
+                    if payload is not None:
+                        self._dispatch(on_json, payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self._rotation is not None and self._running and is_stream_limit_error(e):
+                rotate.set()
+                return
+            self._dispatch(on_json, {"type": "error", "stage": "stt", "message": str(e), "trace": traceback.format_exc()})
+
+    async def _consume(self, on_json) -> None:
+        segment, replay, previous = StreamSegment(), [], None
+        while True:
+            rotate = asyncio.Event()
+            stream = asyncio.create_task(self._run_stream(on_json, segment, replay, rotate, previous))
+            self._streams.add(stream)
+            stream.add_done_callback(self._streams.discard)
+            rotating = asyncio.create_task(rotate.wait())
+            try:
+                await asyncio.wait({stream, rotating}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                rotating.cancel()
+            if not rotate.is_set():
+                return
+            segment, replay = self._rotation.next_segment()
+            previous = stream
+
+    def _cancel_streams(self) -> None:
+        for task in (self._task, *self._streams):
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def start(self, on_json):
+        self._running = True
+        self._audio_q.bind_loop()
+        self._task = asyncio.create_task(self._consume(on_json))
+
+    def _prepare(self, chunk: bytes) -> bytes:
+        if self._transcoder is not None:
+            chunk = self._transcoder.process(chunk)
+        return self._vad.process(chunk) if self._vad is not None else chunk
+
+    def feed_audio(self, pcm_chunk: bytes):
+        if self._running:
+            pcm_chunk = self._prepare(pcm_chunk)
+            if pcm_chunk:
+                self._audio_q.feed(pcm_chunk)
+
+    async def feed_audio_async(self, pcm_chunk: bytes):
+        if self._running:
+            pcm_chunk = self._prepare(pcm_chunk)
+            if pcm_chunk:
+                await self._audio_q.feed_async(pcm_chunk)
+
+    def audio_stats(self) -> Dict[str, Any]:
+        return {
+            **self._audio_q.stats(),
+            "format": self.audio_format.describe(),
+            "transcode": self._transcoder.stats() if self._transcoder is not None else None,
+            "vad": self._vad.stats() if self._vad is not None else None,
+            "rotation": self._rotation.stats() if self._rotation is not None else None,
+        }
+
+    def close(self):
+        """종료 신호를 보내 스트림을 정상 종료시키고, 유예 시간 안에 끝나지 않으면 취소"""
+        if self._vad is not None:
+            self._vad.close()
+        self._audio_q.close()  # 남은 오디오를 보낸 뒤 스트림 종료
+        if not self._running:
+            return
+        self._running = False
+        asyncio.get_running_loop().call_later(self._CLOSE_GRACE_SECONDS, self._cancel_streams)
+        for callback in list(self._callbacks):
+            callback.cancel()
+
+def create_streaming_stt(sample_rate_hz: int = 16000, audio_format: Optional[AudioFormat] = None) -> StreamingSTT:
+    """
+    settings.stt_backend에 따라 STT 백엔드 생성
+    - "google"(기본): settings.stt_engine "async"(이벤트 루프) | "thread"(통화당 스레드)
+    - "scripted": 대본 파일을 오디오 길이에 맞춰 재생하는 로컬 STT (GCP 없이 부하 시험용)
+    audio_format: 소켓 start 핸드셰이크로 정한 입력 형식 (없으면 sample_rate_hz mono pcm16)
+    """
+    if settings.stt_backend == "scripted":
+        return ScriptedSTT(sample_rate_hz=sample_rate_hz, audio_format=audio_format)
+    if settings.stt_backend != "google":
+        raise ValueError(f"알 수 없는 STT 백엔드: {settings.stt_backend} (가능: google, scripted)")
+    if settings.stt_engine == "thread":
+        return GoogleStreamingSTT(sample_rate_hz=sample_rate_hz, audio_format=audio_format)
+    return AsyncGoogleStreamingSTT(sample_rate_hz=sample_rate_hz, audio_format=audio_format)
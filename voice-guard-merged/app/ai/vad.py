@@ -0,0 +1,144 @@
+# app/ai/vad.py
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from ..config import settings
+
+# 프로세스 전체 누적 통계 (세션 종료 시 합산)
+_totals: Dict[str, int] = {"sessions": 0, "frames": 0, "speech_frames": 0, "bytes_in": 0, "bytes_suppressed": 0}
+_totals_lock = threading.Lock()
+
+def vad_totals() -> Dict[str, Any]:
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["suppressed_ratio"] = round(totals["bytes_suppressed"] / totals["bytes_in"], 4) if totals["bytes_in"] else 0.0
+    return totals
+
+class EnergyVAD:
+    """
+    STT 앞단의 경량 음성 구간 검출기 (16bit mono PCM).
+    - 청크를 frame_ms 프레임으로 나눠 프레임별 에너지(dBFS)와 영교차율(ZCR)을 NumPy로 한 번에 계산
+    - 음성: 에너지가 임계값(절대값과 잡음 바닥 + margin 중 큰 값) 이상인 프레임.
+      ZCR이 높은 프레임(치찰음/잡음)은 임계값 + 6dB를 넘어야 음성으로 본다
+    - hangover: 음성 뒤 hangover_ms 동안은 계속 보낸다 (단어 끝 보존 + STT가 문장 끝을 판단할 침묵 제공)
+    - pre-roll: 음성 시작 직전 preroll_ms를 함께 보낸다 (단어 시작 보존)
+    - keepalive: 긴 침묵 중에도 keepalive_ms마다 프레임 하나를 보내 스트림이 끊기지 않게 한다
+    process(chunk)는 STT로 보낼 바이트를 돌려준다 (모두 침묵이면 b"").
+    """
+    _ZCR_MAX = 0.35
+    _ZCR_PENALTY_DB = 6.0
+
+    def __init__(
+        self,
+        sample_rate_hz: int = 16000,
+        frame_ms: int = 20,
+        threshold_db: float = -45.0,
+        noise_margin_db: float = 10.0,
+        hangover_ms: int = 800,
+        preroll_ms: int = 200,
+        keepalive_ms: int = 5000,
+    ):
+        self.frame_bytes = sample_rate_hz * frame_ms // 1000 * 2
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.hangover_frames = max(0, hangover_ms // frame_ms)
+        self.keepalive_frames = max(1, keepalive_ms // frame_ms)
+        self.noise_floor_db: Optional[float] = None
+        self._pending = b""  # 프레임 경계에 걸친 남은 바이트
+        self._preroll: Deque[bytes] = deque(maxlen=max(0, preroll_ms // frame_ms))
+        self._since_speech = self.hangover_frames + 1  # 마지막 음성 프레임 이후 프레임 수
+        self._since_sent = 0
+        self._closed = False
+        self._stats = {"frames": 0, "speech_frames": 0, "bytes_in": 0, "bytes_suppressed": 0}
+        with _totals_lock:
+            _totals["sessions"] += 1
+
+    @classmethod
+    def from_settings(cls, sample_rate_hz: int = 16000) -> "EnergyVAD":
+        return cls(
+            sample_rate_hz=sample_rate_hz,
+            threshold_db=settings.stt_vad_threshold_db,
+            hangover_ms=settings.stt_vad_hangover_ms,
+            preroll_ms=settings.stt_vad_preroll_ms,
+        )
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """(프레임 수, 샘플 수) int16 배열 -> 프레임별 음성 여부"""
+        x = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        db = 20.0 * np.log10(np.maximum(rms, 1e-5))
+        zcr = np.mean(np.signbit(x[:, 1:]) != np.signbit(x[:, :-1]), axis=1)
+        threshold = self.threshold_db
+        if self.noise_floor_db is not None:
+            threshold = max(threshold, self.noise_floor_db + self.noise_margin_db)
+        speech = (db >= threshold) & ((zcr <= self._ZCR_MAX) | (db >= threshold + self._ZCR_PENALTY_DB))
+        # 잡음 바닥: 침묵 프레임 에너지의 지수 이동 평균 (청크 단위 갱신)
+        silent = db[~speech]
+        if silent.size:
+            level = float(np.median(silent))
+            self.noise_floor_db = level if self.noise_floor_db is None else 0.9 * self.noise_floor_db + 0.1 * level
+        return speech
+
+    def process(self, chunk: bytes) -> bytes:
+        data = self._pending + chunk
+        n = len(data) // self.frame_bytes
+        self._pending = data[n * self.frame_bytes:]
+        self._stats["bytes_in"] += len(chunk)
+        if n == 0:
+            return b""
+        frames = np.frombuffer(data, dtype="<i2", count=n * self.frame_bytes // 2).reshape(n, -1)
+        speech = self.classify(frames)
+
+        # 프레임별 "마지막 음성 이후 프레임 수" (청크 사이 상태 이어받기)
+        idx = np.arange(n)
+        last = np.maximum.accumulate(np.where(speech, idx, -1))
+        since = np.where(last >= 0, idx - last, self._since_speech + idx + 1)
+        keep = since <= self.hangover_frames
+        self._since_speech = int(since[-1])
+        self._stats["frames"] += n
+        self._stats["speech_frames"] += int(speech.sum())
+
+        out: List[bytes] = []
+        fb = self.frame_bytes
+        for i in range(n):
+            frame = data[i * fb:(i + 1) * fb]
+            if keep[i]:
+                if self._preroll:
+                    out.extend(self._preroll)  # 음성 시작 직전 구간
+                    self._preroll.clear()
+                out.append(frame)
+                self._since_sent = 0
+                continue
+            self._since_sent += 1
+            if self._since_sent >= self.keepalive_frames:
+                out.append(frame)
+                self._since_sent = 0
+            elif self._preroll.maxlen:
+                self._preroll.append(frame)
+        sent = b"".join(out)
+        self._stats["bytes_suppressed"] += n * fb - len(sent)
+        return sent
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        stats = self.stats()
+        with _totals_lock:
+            for key in ("frames", "speech_frames", "bytes_in", "bytes_suppressed"):
+                _totals[key] += stats[key]
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["suppressed_ratio"] = round(s["bytes_suppressed"] / s["bytes_in"], 4) if s["bytes_in"] else 0.0
+        s["noise_floor_db"] = round(self.noise_floor_db, 1) if self.noise_floor_db is not None else None
+        return s
+
+def create_vad(sample_rate_hz: int = 16000) -> Optional[EnergyVAD]:
+    """settings.stt_vad가 꺼져 있으면 None (모든 오디오를 그대로 STT로 보냄)"""
+    if not settings.stt_vad:
+        return None
+    return EnergyVAD.from_settings(sample_rate_hz)
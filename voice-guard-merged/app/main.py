@@ -1,17 +1,42 @@
 # app/main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
 from .config import settings
+from .utils.log import configure_logging, get_logger, shutdown_logging
 from .db import Base, engine
+from .migrations import run_migrations
 from .routers import call_logs, uploads, realtime
+from .ai import get_risk_analyzer, close_risk_analyzer, close_analysis_cache, get_analysis_cache, get_llm_scheduler, close_llm_scheduler, get_risk_batcher, close_risk_batcher, close_stt_clients, audio_queue_totals, vad_totals, VertexRiskAnalyzer, get_local_risk_classifier, get_risk_cascade, cascade_totals
+
+# 구조화 로깅 (레벨/형식은 settings.log_level, settings.log_format)
+configure_logging()
+logger = get_logger("main")
 
 # DB 모델 자동생성
 Base.metadata.create_all(bind=engine)
+# 기존 DB에 새 인덱스/보조 테이블 내용 적용 (create_all은 기존 테이블을 바꾸지 않음)
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # 프로세스 공용 위험도 분석기(genai.Client + 커넥션 풀)를 시작 시 한 번만 생성
+    get_risk_analyzer()
+    # 판정 cascade의 로컬 분류기도 시작 시 학습 (첫 발화에서 지연되지 않도록)
+    get_risk_cascade()
+    yield
+    await close_risk_batcher()
+    await close_llm_scheduler()
+    await close_risk_analyzer()
+    close_analysis_cache()
+    await close_stt_clients()
+    shutdown_logging()
 
-app = FastAPI(title="VoiceGuard API - 통합 시스템")
+app = FastAPI(title="VoiceGuard API - 통합 시스템", lifespan=lifespan)
 
 # CORS: 프론트 로컬 개발 주소 허용
 origins = [o.strip() for o in settings.allowed_origins.split(",") if o.strip()]
@@ -50,14 +75,14 @@ def _setup_gcp_credentials():
                 project_id = key_data.get('project_id')
                 if project_id:
                     os.environ["GCP_PROJECT_ID"] = project_id
-                    print(f"✅ GCP_PROJECT_ID 자동 설정: {project_id}")
+                    logger.info("GCP_PROJECT_ID 자동 설정: %s", project_id)
         except Exception as e:
-            print(f"⚠️ GCP_PROJECT_ID 자동 설정 실패: {e}")
+            logger.warning("GCP_PROJECT_ID 자동 설정 실패: %s", e)
 
     # GCP 위치 기본값 설정
     if not os.environ.get("GCP_LOCATION"):
         os.environ["GCP_LOCATION"] = "us-central1"
-        print(f"✅ GCP_LOCATION 기본값 설정: us-central1")
+        logger.info("GCP_LOCATION 기본값 설정: us-central1")
 
 # 앱 시작 시 GCP 자격증명 설정
 _setup_gcp_credentials()
@@ -94,6 +119,32 @@ def index():
 def health():
     return {"status": "ok", "service": "VoiceGuard API - 통합 시스템"}
 
+@app.get("/diag/llm")
+def diag_llm():
+    cache = get_analysis_cache()
+    batcher = get_risk_batcher()
+    analyzer = get_risk_analyzer()
+    return {
+        "ok": True,
+        "scheduler": get_llm_scheduler().stats(),
+        "backend": settings.risk_backend,
+        "calls": analyzer.retry_policy.stats() if isinstance(analyzer, VertexRiskAnalyzer) else None,
+        "local": get_local_risk_classifier().stats() if settings.risk_backend == "local" or settings.risk_local_fallback else None,
+        "cache": cache.stats() if cache else None,
+        "batcher": batcher.stats() if batcher else None,
+        "cascade": cascade_totals(),
+    }
+
+@app.get("/diag/audio")
+def diag_audio():
+    """STT 오디오 큐/VAD 누적 통계 (버린 바이트, 큐 깊이 최고치, 침묵으로 거른 비율 등) - 워커 크기 산정용"""
+    return {
+        "ok": True,
+        "backpressure": settings.stt_backpressure,
+        "audio_queue": audio_queue_totals(),
+        "vad": vad_totals() if settings.stt_vad else None,
+    }
+
 @app.get("/diag/creds")
 def diag_creds():
     path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
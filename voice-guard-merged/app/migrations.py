@@ -0,0 +1,97 @@
+# app/migrations.py
+"""
+가벼운 스키마 마이그레이션.
+Base.metadata.create_all은 없는 테이블만 만들고 기존 테이블에 인덱스를 더하지 않으므로,
+기존 DB에 필요한 변경을 버전 순서대로 한 번씩 적용하고 schema_migrations 테이블에 기록한다.
+각 단계는 여러 번 실행해도 안전하게 작성한다 (여러 워커가 동시에 시작해도 결과가 같음).
+
+실행: 앱 시작 시 자동, 또는 배포 전에 python -m app.migrations [--status]
+"""
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Engine, MetaData, String, Table, func, inspect, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .db import SessionLocal
+from .models.call_log import CallLog
+from .services.call_log_service import backfill_call_keywords
+from .utils.log import get_logger
+
+logger = get_logger("migrations")
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, server_default=func.now()),
+)
+
+def _create_indexes(engine: Engine, table: Table) -> None:
+    """모델에 선언된 인덱스 중 DB에 없는 것만 만든다 (MySQL 8은 온라인으로 추가)"""
+    existing = {ix["name"] for ix in inspect(engine).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        try:
+            index.create(bind=engine)
+            logger.info("인덱스 생성: %s", index.name)
+        except OperationalError as e:
+            # 다른 워커가 먼저 만든 경우
+            if index.name not in {ix["name"] for ix in inspect(engine).get_indexes(table.name)}:
+                raise
+            logger.info("인덱스 이미 있음: %s (%s)", index.name, e.orig)
+
+def _calllog_indexes(engine: Engine) -> None:
+    _create_indexes(engine, CallLog.__table__)
+
+def _call_keyword_backfill(engine: Engine) -> None:
+    with SessionLocal(bind=engine) as db:
+        filled = backfill_call_keywords(db)
+    if filled:
+        logger.info("call_keyword 채움: %d행", filled)
+
+# (버전, 설명, 적용 함수) - 버전 순서대로 적용. 한 번 배포한 항목은 고치지 말고 새 항목을 추가한다.
+MIGRATIONS: List[Tuple[str, str, Callable[[Engine], None]]] = [
+    ("0001_calllog_indexes", "callLog 보조 인덱스 (phoneHash, callDate), (callDate, id), (riskScore, createdAt) 등",
+     _calllog_indexes),
+    ("0002_call_keyword_backfill", "call_keyword 보조 테이블을 기존 통화 기록 키워드로 채움", _call_keyword_backfill),
+]
+
+def applied_versions(engine: Engine) -> List[str]:
+    _meta.create_all(bind=engine)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(select(schema_migrations.c.version))]
+
+def run_migrations(engine: Engine) -> List[str]:
+    """아직 적용하지 않은 마이그레이션을 순서대로 적용하고 적용한 버전 목록을 돌려준다"""
+    done = set(applied_versions(engine))
+    applied: List[str] = []
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        started = time.perf_counter()
+        step(engine)
+        try:
+            with engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(version=version))
+        except IntegrityError:
+            pass  # 다른 워커가 같은 단계를 먼저 기록
+        logger.info("마이그레이션 적용: %s (%s) %.1f초", version, description, time.perf_counter() - started)
+        applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    from .db import Base, engine
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="적용 여부만 출력")
+    args = parser.parse_args()
+    if args.status:
+        done = set(applied_versions(engine))
+        for version, description, _ in MIGRATIONS:
+            print(f"[{'x' if version in done else ' '}] {version}  {description}")
+    else:
+        Base.metadata.create_all(bind=engine)
+        print("적용:", run_migrations(engine) or "없음")
@@ -1,3 +1,3 @@
-from .call_log import CallLog
+from .call_log import CallLog, CallKeyword
 
-__all__ = ["CallLog"]
+__all__ = ["CallLog", "CallKeyword"]
@@ -1,10 +1,20 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Date, DateTime, JSON
+from sqlalchemy import String, Integer, Date, DateTime, JSON, Index, ForeignKey
 from datetime import datetime, date
 from ..db import Base
 
 class CallLog(Base):
     __tablename__ = "callLog"
+    # 새 인덱스는 app/migrations.py의 MIGRATIONS에도 단계를 추가해야 기존 DB에 생긴다
+    __table_args__ = (
+        # 전화번호별 이력: 기간 조회/날짜 정렬, id 정렬(커서)
+        Index("ix_callLog_phoneHash_callDate", "phoneHash", "callDate"),
+        Index("ix_callLog_phoneHash_id", "phoneHash", "id"),
+        # 기간 조회 + 커서 페이지네이션 (callDate, id) 정렬
+        Index("ix_callLog_callDate_id", "callDate", "id"),
+        # 대시보드: 위험도 높은 순/최근 순
+        Index("ix_callLog_riskScore_createdAt", "riskScore", "createdAt"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     phoneHash: Mapped[str] = mapped_column(String(64))       # 전화번호는 해시 저장 권장
@@ -15,3 +25,14 @@ class CallLog(Base):
     keywords: Mapped[list] = mapped_column(JSON)             # ["계좌이체","원격제어"]
     audioUrl: Mapped[str] = mapped_column(String(255))       # S3 URL
     createdAt: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class CallKeyword(Base):
+    """통화 기록 키워드 보조 테이블 (callLog.keywords와 같은 내용, 키워드 검색을 인덱스 조회로)"""
+    __tablename__ = "call_keyword"
+    __table_args__ = (
+        Index("ix_call_keyword_call_id", "call_id"),
+    )
+
+    # PK (keyword, call_id): 키워드로 찾은 통화 id가 id 순으로 정렬돼 있다
+    keyword: Mapped[str] = mapped_column(String(64), primary_key=True)
+    call_id: Mapped[int] = mapped_column(ForeignKey("callLog.id", ondelete="CASCADE"), primary_key=True)
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import io
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from ..config import settings
 from ..db import get_db
-from ..schemas.call_log import CallCreate, CallResponse, CallList
-from ..services.call_log_service import create_call, list_calls, get_call
+from ..schemas.call_log import CallCreate, CallResponse, CallList, CallBulkResult
+from ..services.call_log_service import create_call, create_calls_bulk, check_column_lengths, list_calls, get_call
+from ..utils.log import get_logger
+
+logger = get_logger("routers.call_logs")
 
 router = APIRouter(prefix="/api/calls", tags=["calls"])
 
@@ -10,6 +19,99 @@ router = APIRouter(prefix="/api/calls", tags=["calls"])
 def create_call_api(body: CallCreate, db: Session = Depends(get_db)):
     return create_call(db, body)
 
+def _parse_bulk_body(raw: bytes, content_type: str) -> list:
+    """
+    JSON 배열, {"items": [...]}, 또는 NDJSON(한 줄에 하나) -> 항목 목록 (NDJSON 줄 파싱 실패는 항목 오류로).
+    NDJSON은 call_bulk_max_items건을 넘는 순간 나머지 줄을 파싱하지 않고 413.
+    """
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        for line in io.BytesIO(raw):
+            if not line.strip():
+                continue
+            if len(items) >= settings.call_bulk_max_items:
+                raise HTTPException(413, f"too many items: more than {settings.call_bulk_max_items}")
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f"invalid JSON line: {e}"))
+        return items
+    try:
+        data = json.loads(raw or b"null")
+    except ValueError as e:
+        raise HTTPException(400, f"invalid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list):
+        raise HTTPException(400, "expected a JSON array, {\"items\": [...]} or NDJSON")
+    return data
+
+async def _read_bulk_body(request: Request) -> bytes:
+    """본문을 최대 call_bulk_max_bytes까지만 받는다 (Content-Length가 크면 읽기 전에, 없거나 틀리면 받는 도중 413)"""
+    limit = settings.call_bulk_max_bytes
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            size = int(declared)
+        except ValueError:
+            raise HTTPException(400, "invalid Content-Length")
+        if size > limit:
+            raise HTTPException(413, f"request body too large: {size} > {limit} bytes")
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(413, f"request body too large: more than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _ingest_bulk(db: Session, raw: bytes, content_type: str) -> dict:
+    """본문 파싱 -> 항목별 검증 -> 한 트랜잭션 저장 (CPU/DB 작업이라 스레드풀에서 실행)"""
+    items = _parse_bulk_body(raw, content_type)
+    if len(items) > settings.call_bulk_max_items:
+        raise HTTPException(413, f"too many items: {len(items)} > {settings.call_bulk_max_items}")
+
+    valid: list[tuple[int, CallCreate]] = []
+    errors = []
+    for index, item in enumerate(items):
+        if isinstance(item, ValueError):
+            errors.append({"index": index, "error": str(item)})
+            continue
+        try:
+            body = CallCreate.model_validate(item)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors())
+            errors.append({"index": index, "error": detail})
+            continue
+        problem = check_column_lengths(body)
+        if problem:
+            errors.append({"index": index, "error": problem})
+            continue
+        valid.append((index, body))
+
+    try:
+        saved = create_calls_bulk(db, [body for _, body in valid])
+    except Exception:
+        # DB 오류 원문(테이블/제약 이름 등)은 로그에만 남긴다
+        logger.exception("통화 기록 일괄 저장 실패 (%d건)", len(valid))
+        raise HTTPException(500, "bulk insert failed")
+    ids: list[int | None] = [None] * len(items)
+    for (index, _), call_id in zip(valid, saved):
+        ids[index] = call_id
+    return {"inserted": len(saved), "ids": ids, "errors": errors}
+
+@router.post(":bulk", response_model=CallBulkResult)
+async def create_calls_bulk_api(request: Request, db: Session = Depends(get_db)):
+    """
+    통화 기록 일괄 저장 (게이트웨이 장애 복구 후 몰아서 보내는 요약 등).
+    항목별로 검증해 잘못된 항목은 errors로 알려주고 나머지는 한 트랜잭션으로 저장한다.
+    본문만 이벤트 루프에서 받고 파싱/검증/저장은 스레드풀에서 한다 (최대 call_bulk_max_items건 검증이 루프를 막지 않도록).
+    본문은 call_bulk_max_bytes까지만 받는다.
+    """
+    raw = await _read_bulk_body(request)
+    return await run_in_threadpool(_ingest_bulk, db, raw, request.headers.get("content-type", ""))
+
 @router.get("", response_model=CallList)
 def list_calls_api(
     db: Session = Depends(get_db),
@@ -20,16 +122,24 @@ def list_calls_api(
     page: int = 1,
     size: int = 20,
     order: str = "desc",
+    sort: str = "id",
+    cursor: str | None = None,
+    count: str | None = None,
 ):
-    res = list_calls(
-        db, phone=phone, q=q, from_date=fromDate, to_date=toDate,
-        page=page, size=size, order=order
-    )
+    try:
+        res = list_calls(
+            db, phone=phone, q=q, from_date=fromDate, to_date=toDate,
+            page=page, size=size, order=order, sort=sort, cursor=cursor, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     items_model = [CallResponse.model_validate(it) for it in res["items"]]
     return {
         "meta": {
             "page": res["page"], "size": res["size"],
-            "total": res["total"], "hasNext": res["has_next"]
+            "total": res["total"], "totalEstimated": res["total_estimated"],
+            "hasNext": res["has_next"],
+            "nextCursor": res["next_cursor"]
         },
         "items": items_model
     }
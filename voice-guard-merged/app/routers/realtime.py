@@ -1,14 +1,22 @@
 # app/routers/realtime.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 import json
 import time
+import asyncio
 import base64
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
-from ..ai import GoogleStreamingSTT, rule_hit_labels, should_call_llm, calculate_rule_score, VertexRiskAnalyzer
+from ..utils.log import get_logger
+from ..ai import (
+    create_streaming_stt, IncrementalRuleMatcher, calculate_rule_score, RiskModel, get_risk_analyzer,
+    RiskCascade, get_risk_cascade, SessionState,
+    LLMScheduler, LLMSchedulerError, llm_priority, get_llm_scheduler, RiskBatcher, get_risk_batcher,
+    AudioFormat, DEFAULT_AUDIO_FORMAT,
+)
 
 router = APIRouter(prefix="/ws", tags=["realtime"])
+logger = get_logger("routers.realtime")
 
 # 자격증명/경로 설정
 def _setup_gcp_credentials():
@@ -32,58 +40,143 @@ def _setup_gcp_credentials():
                 project_id = key_data.get('project_id')
                 if project_id:
                     os.environ["GCP_PROJECT_ID"] = project_id
-                    print(f"✅ GCP_PROJECT_ID 자동 설정: {project_id}")
+                    logger.info("GCP_PROJECT_ID 자동 설정: %s", project_id)
         except Exception as e:
-            print(f"⚠️ GCP_PROJECT_ID 자동 설정 실패: {e}")
+            logger.warning("GCP_PROJECT_ID 자동 설정 실패: %s", e)
 
     # GCP 위치 기본값 설정
     if not os.environ.get("GCP_LOCATION"):
         os.environ["GCP_LOCATION"] = "us-central1"
-        print(f"✅ GCP_LOCATION 기본값 설정: us-central1")
+        logger.info("GCP_LOCATION 기본값 설정: us-central1")
+
+async def _negotiate_audio_format(ws: WebSocket) -> Tuple[Optional[AudioFormat], Optional[bytes]]:
+    """
+    첫 메시지로 오디오 형식 협상.
+    - 텍스트 {"type":"start","codec":...,"sampleRate":...,"channels":...}: 형식을 정하고 {"type":"ready", ...} 응답
+    - 바이너리: 핸드셰이크 없는 기존 클라이언트(16kHz mono pcm16), 받은 청크는 첫 오디오로 사용
+    형식이 잘못됐으면 오류를 보내고 (None, None)
+    """
+    msg = await ws.receive()
+    if msg.get("type") == "websocket.disconnect":
+        raise WebSocketDisconnect(msg.get("code", 1000))
+    if msg.get("bytes") is not None:
+        return DEFAULT_AUDIO_FORMAT, msg["bytes"]
+    try:
+        audio_format = AudioFormat.from_start(json.loads(msg.get("text") or ""))
+    except ValueError as e:
+        await ws.send_json({"type": "error", "stage": "handshake", "message": str(e)})
+        return None, None
+    await ws.send_json({"type": "ready", **audio_format.describe()})
+    return audio_format, None
 
 @router.websocket("/stt")
-async def stt_socket(ws: WebSocket):
+async def stt_socket(
+    ws: WebSocket,
+    risk_analyzer: Optional[RiskModel] = Depends(get_risk_analyzer),
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    batcher: Optional[RiskBatcher] = Depends(get_risk_batcher),
+    cascade: RiskCascade = Depends(get_risk_cascade),
+):
     await ws.accept()
     
     # GCP 자격증명 설정
     _setup_gcp_credentials()
     
-    stt = GoogleStreamingSTT()
-    risk_analyzer = VertexRiskAnalyzer()
+    stt = None
     
-    current_transcript = ""
+    # 통화 상태: 최근 최종 발화 링 버퍼, 누적 점수, 라벨 id별 횟수 (통화가 길어도 메모리 고정)
+    state = SessionState.from_settings()
     risk_score = 0
     fraud_type = "정상"
     keywords = []
+    # 발화 단위 증분 룰 매처: partial마다 전체를 다시 훑지 않고 바뀐 부분만 스캔
+    rule_matcher = IncrementalRuleMatcher()
+    # 진행 중인 LLM 분석 태스크 (소켓 종료 시 취소)
+    llm_tasks: set = set()
     
     async def on_stt_update(payload: Dict[str, Any]):
-        nonlocal current_transcript, risk_score, fraud_type, keywords
+        nonlocal risk_score, fraud_type, keywords
         
         if payload.get("type") == "stt_update":
             transcript = payload.get("transcript", "")
             is_final = payload.get("is_final", False)
             
             if transcript:
-                current_transcript = transcript
-                
                 # 룰 기반 필터링
-                rule_labels = rule_hit_labels(transcript)
+                rule_matcher.update(transcript)
+                rule_labels = rule_matcher.labels()
                 rule_score = calculate_rule_score(rule_labels)
+                if is_final:
+                    rule_matcher.reset()
+                # 점수 출처: "rule" | "local" | "llm" | "rule_only"(LLM을 건너뛰고 잠정 점수로 대체)
+                #           | "partial"(마감 초과 전에 받은 부분 결과를 판정으로 유지)
+                analysis_source = "rule"
+                degraded_reason = None
+                # 최종 발화는 cascade로 판정 경로 결정 (명확한 발화는 룰/로컬 분류기에서 끝냄)
+                # 분석기가 없으면 불확실 구간도 로컬 분류기로 끝낸다
+                decision = cascade.decide(transcript, rule_labels, llm_available=risk_analyzer is not None) if is_final else None
                 
-                # LLM 분석이 필요한 경우
-                if should_call_llm(transcript) and is_final:
+                # 불확실 구간이라 LLM 분석이 필요한 경우
+                if risk_analyzer is not None and decision is not None and decision.needs_llm:
                     try:
-                        ai_result = await risk_analyzer.analyze_risk(transcript)
+                        # 전역 스케줄러가 동시 호출 수와 마감 시간을 관리 (룰 점수/누적 위험도 높은 발화 우선)
+                        # 배칭 사용 시 다른 세션의 최종 발화와 묶어 한 번의 호출로 분석
+                        priority = llm_priority(rule_score, risk_score)
+                        partial: Dict[str, Any] = {}  # 마지막으로 보낸 부분 결과 (마감 초과 시 판정으로 유지)
+                        if batcher is not None:
+                            task = asyncio.create_task(batcher.analyze(transcript, priority=priority))
+                        else:
+                            # 스트리밍 응답에서 먼저 완성된 필드(risk_score/risk_level 등)를 바로 전달
+                            async def send_partial(fields: Dict[str, Any]):
+                                partial.clear()
+                                partial.update(fields)
+                                await ws.send_json({
+                                    "type": "analysis_partial",
+                                    "transcript": transcript,
+                                    "partial": fields,
+                                    "timestamp": time.time()
+                                })
+
+                            task = asyncio.create_task(scheduler.submit(
+                                lambda: risk_analyzer.analyze_risk(transcript, on_partial=send_partial),
+                                priority=priority,
+                            ))
+                        llm_tasks.add(task)
+                        task.add_done_callback(llm_tasks.discard)
+                        ai_result = await task
                         risk_score = ai_result.get("risk_score", 0)
                         fraud_type = "의심" if risk_score >= 30 else "정상"
                         keywords = ai_result.get("labels", [])
+                        analysis_source = "llm"
+                    except LLMSchedulerError as e:
+                        if "risk_score" in partial:
+                            # 이미 보낸 부분 점수를 판정으로 유지 (HIGH를 보낸 뒤 더 낮은 잠정 점수로 뒤집지 않음)
+                            risk_score = partial["risk_score"]
+                            fraud_type = "의심" if risk_score >= 30 else "정상"
+                            keywords = partial.get("labels", decision.labels)
+                            analysis_source = "partial"
+                        else:
+                            risk_score = decision.score
+                            keywords = decision.labels
+                            analysis_source = "rule_only"
+                        degraded_reason = e.reason
                     except Exception as e:
-                        print(f"AI 분석 오류: {e}")
-                        risk_score = rule_score
-                        keywords = rule_labels
+                        logger.error("AI 분석 오류: %s", e)
+                        risk_score = decision.score
+                        keywords = decision.labels
+                        analysis_source = "rule_only"
+                        degraded_reason = "error"
+                elif decision is not None:
+                    # 명확한 발화(또는 분석기 없음): 룰/로컬 분류기 판정 그대로
+                    risk_score = decision.score
+                    fraud_type = "의심" if risk_score >= 30 else "정상"
+                    keywords = decision.labels
+                    analysis_source = "rule" if decision.tier == "llm" else decision.tier
                 else:
                     risk_score = rule_score
                     keywords = rule_labels
+                if is_final:
+                    state.add(transcript, risk_score, keywords)
                 
                 await ws.send_json({
                     "type": "analysis_update",
@@ -92,6 +185,9 @@ async def stt_socket(ws: WebSocket):
                     "risk_score": risk_score,
                     "fraud_type": fraud_type,
                     "keywords": keywords,
+                    "analysis_source": analysis_source,
+                    "decision_path": decision.path if decision is not None else None,
+                    "degraded_reason": degraded_reason,
                     "confidence": payload.get("confidence"),
                     "timestamp": time.time()
                 })
@@ -104,23 +200,39 @@ async def stt_socket(ws: WebSocket):
             })
     
     try:
+        audio_format, first_chunk = await _negotiate_audio_format(ws)
+        if audio_format is None:
+            await ws.close(code=1003)
+            return
+        stt = create_streaming_stt(audio_format=audio_format)
         await stt.start(on_stt_update)
+        if first_chunk:
+            await stt.feed_audio_async(first_chunk)
         
         while True:
             # WebSocket에서 오디오 데이터 수신
             data = await ws.receive_bytes()
-            stt.feed_audio(data)
+            await stt.feed_audio_async(data)
             
     except WebSocketDisconnect:
-        print("WebSocket 연결 종료")
+        logger.info("WebSocket 연결 종료")
     except Exception as e:
-        print(f"WebSocket 오류: {e}")
+        logger.error("WebSocket 오류: %s", e)
         await ws.send_json({
             "type": "error",
             "message": str(e)
         })
     finally:
-        stt.close()
+        for task in list(llm_tasks):
+            task.cancel()
+        logger.info("통화 세션 상태", extra={"fields": state.stats()})
+        if stt is not None:
+            stt.close()
+            audio = stt.audio_stats()
+            if audio.get("dropped_chunks"):
+                logger.warning("STT 오디오 손실 (큐 포화)", extra={"fields": audio})
+            else:
+                logger.info("STT 오디오 큐 통계", extra={"fields": audio})
 
 @router.websocket("/analysis")
 async def analysis_socket(ws: WebSocket):
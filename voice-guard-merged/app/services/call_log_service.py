@@ -1,10 +1,65 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..models.call_log import CallLog
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, func, insert, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from ..config import settings
+from ..models.call_log import CallLog, CallKeyword
 from ..schemas.call_log import CallCreate
-from ..utils.security import phone_hash
+from ..utils.security import phone_hash, phone_hashes
 from ..db import engine
 
+COUNT_MODES = ("exact", "estimate", "none")
+
+# 필터 조합별 정확한 개수 캐시: 서명 -> (만료 시각, 개수).
+# 기록을 추가해도 비우지 않는다 (쓰기마다 전체를 비우면 적재 중에는 캐시가 거의 맞지 않음).
+# 다른 프로세스의 기록처럼 이 프로세스의 기록도 TTL이 지나야 total에 반영된다.
+_count_cache: "OrderedDict[tuple, tuple[float, int]]" = OrderedDict()
+_count_lock = threading.Lock()
+
+def _cached_count(signature: tuple) -> int | None:
+    with _count_lock:
+        hit = _count_cache.get(signature)
+        if hit is None:
+            return None
+        if hit[0] < time.monotonic():
+            del _count_cache[signature]
+            return None
+        _count_cache.move_to_end(signature)
+        return hit[1]
+
+def _store_count(signature: tuple, total: int) -> None:
+    if settings.call_count_cache_ttl_seconds <= 0 or settings.call_count_cache_size <= 0:
+        return
+    with _count_lock:
+        _count_cache[signature] = (time.monotonic() + settings.call_count_cache_ttl_seconds, total)
+        _count_cache.move_to_end(signature)
+        while len(_count_cache) > settings.call_count_cache_size:
+            _count_cache.popitem(last=False)
+
+def clear_count_cache() -> None:
+    with _count_lock:
+        _count_cache.clear()
+
+def normalize_keyword(keyword) -> str:
+    """키워드 저장/검색 공통 정규화 (앞뒤/연속 공백 정리, 컬럼 길이로 자름)"""
+    return " ".join(str(keyword).split())[:64]
+
+def keyword_set(keywords) -> list[str]:
+    """통화 하나의 키워드 -> call_keyword 행으로 쓸 값 (빈 값/중복 제거, 순서 유지)"""
+    seen: dict[str, None] = {}
+    for keyword in keywords or []:
+        keyword = normalize_keyword(keyword)
+        if keyword:
+            seen.setdefault(keyword)
+    return list(seen)
+
 def create_call(db: Session, body: CallCreate) -> CallLog:
     row = CallLog(
         phoneHash=phone_hash(body.phone),
@@ -16,25 +71,197 @@ def create_call(db: Session, body: CallCreate) -> CallLog:
         audioUrl=body.audioUrl
     )
     db.add(row)
+    db.flush()  # id 확정 후 키워드 보조 테이블도 같은 트랜잭션으로
+    db.add_all(CallKeyword(keyword=k, call_id=row.id) for k in keyword_set(body.keywords))
     db.commit()
     db.refresh(row)
     return row
 
+def check_column_lengths(body: CallCreate) -> str | None:
+    """문자열 컬럼 길이 초과 여부 (일괄 저장 시 한 건 때문에 트랜잭션 전체가 실패하지 않도록 미리 거른다)"""
+    for name in ("fraudType", "audioUrl"):
+        limit = CallLog.__table__.c[name].type.length
+        if len(getattr(body, name)) > limit:
+            return f"{name}: at most {limit} characters"
+    return None
+
+def _insert_calls(db: Session, rows: list[dict]) -> list[int]:
+    """callLog 행 여러 개 INSERT 후 id 목록 (입력 순서)"""
+    table = CallLog.__table__
+    if getattr(engine.dialect, "insert_executemany_returning_sort_by_parameter_order", False):
+        # SQLite/PostgreSQL 등: executemany + RETURNING (입력 순서 보장)
+        result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    if engine.dialect.name == "mysql":
+        # RETURNING이 없다. 여러 행 INSERT 한 문장은 연속된 id 블록을 받으므로 LAST_INSERT_ID(첫 id)부터 계산
+        result = db.execute(insert(table).values(rows))
+        step = db.execute(text("SELECT @@auto_increment_increment")).scalar()
+        return [result.lastrowid + i * int(step or 1) for i in range(len(rows))]
+    return [db.execute(insert(table).values(row)).inserted_primary_key[0] for row in rows]
+
+def create_calls_bulk(db: Session, bodies: list[CallCreate], chunk_size: int = 1000) -> list[int]:
+    """
+    통화 기록 여러 건을 한 트랜잭션으로 저장 (create_call의 행마다 commit/refresh 왕복 없이).
+    chunk_size개씩 여러 행 INSERT, 키워드 보조 테이블도 같은 트랜잭션. 저장된 id 목록(입력 순서)을 돌려준다.
+    실패하면 전부 롤백하고 예외를 그대로 올린다.
+    """
+    if not bodies:
+        return []
+    now = datetime.utcnow()
+    rows = [
+        {
+            "phoneHash": hashed, "callDate": body.callDate, "totalSeconds": body.totalSeconds,
+            "riskScore": body.riskScore, "fraudType": body.fraudType, "keywords": body.keywords,
+            "audioUrl": body.audioUrl, "createdAt": now,
+        }
+        for body, hashed in zip(bodies, phone_hashes([body.phone for body in bodies]))
+    ]
+    try:
+        ids: list[int] = []
+        for start in range(0, len(rows), chunk_size):
+            ids += _insert_calls(db, rows[start:start + chunk_size])
+        keyword_rows = [
+            {"keyword": k, "call_id": call_id}
+            for call_id, body in zip(ids, bodies) for k in keyword_set(body.keywords)
+        ]
+        for start in range(0, len(keyword_rows), chunk_size):
+            db.execute(CallKeyword.__table__.insert(), keyword_rows[start:start + chunk_size])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ids
+
+def _insert_keywords_ignore(db: Session, rows: list[dict]) -> int:
+    """call_keyword 행 INSERT, 이미 있는 (keyword, call_id)는 건너뛴다. 새로 넣은 행 수"""
+    table = CallKeyword.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(table).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect in ("mysql", "mariadb"):
+        stmt = insert(table).prefix_with("IGNORE")
+    else:
+        # 그 밖의 DB: 이미 있는 키를 빼고 INSERT
+        existing = set(db.execute(
+            select(table.c.keyword, table.c.call_id).where(table.c.call_id.in_({row["call_id"] for row in rows}))
+        ).tuples())
+        rows = [row for row in rows if (row["keyword"], row["call_id"]) not in existing]
+        stmt = insert(table)
+    if not rows:
+        return 0
+    return max(db.execute(stmt, rows).rowcount, 0)
+
+def backfill_call_keywords(db: Session, batch_size: int = 5000) -> int:
+    """
+    기존 callLog.keywords로 call_keyword를 채운다 (보조 테이블 도입 전 DB).
+    id 순으로 batch_size개씩 읽어 배치마다 커밋하므로, 중간에 끊겼으면 call_keyword의 MAX(call_id) 다음부터 이어서 채운다
+    (마이그레이션이 끝나기 전에는 요청을 받지 않으므로 그보다 큰 id는 아직 채우지 않은 기록).
+    INSERT는 이미 있는 행을 건너뛰어 여러 워커가 동시에 실행해도 안전하다. 새로 채운 키워드 행 수를 돌려준다.
+    """
+    inserted = 0
+    last_id = db.query(func.max(CallKeyword.call_id)).scalar() or 0
+    while True:
+        batch = (db.query(CallLog.id, CallLog.keywords)
+                   .filter(CallLog.id > last_id)
+                   .order_by(CallLog.id)
+                   .limit(batch_size)
+                   .all())
+        if not batch:
+            return inserted
+        rows = [{"keyword": k, "call_id": call_id} for call_id, keywords in batch for k in keyword_set(keywords)]
+        if rows:
+            inserted += _insert_keywords_ignore(db, rows)
+        db.commit()
+        last_id = batch[-1][0]
+
 def get_call(db: Session, call_id: int) -> CallLog | None:
     return db.query(CallLog).filter(CallLog.id == call_id).first()
 
+# 목록 정렬 키: 커서는 정렬 키 값 묶음 (id는 유일하므로 항상 마지막 키)
+SORT_KEYS = {
+    "id": (CallLog.id,),
+    "callDate": (CallLog.callDate, CallLog.id),
+}
+
+def _encode_cursor(sort: str, order: str, row: CallLog) -> str:
+    """마지막 행의 정렬 키 -> 불투명 커서 (base64url JSON)"""
+    keys = [getattr(row, col.key) for col in SORT_KEYS[sort]]
+    payload = {"s": sort, "o": order, "k": [k.isoformat() if isinstance(k, date) else k for k in keys]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> list:
+    """커서 -> 정렬 키 값 (정렬/방향이 다른 요청에서 만든 커서면 ValueError)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        keys = payload["k"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("invalid cursor")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise ValueError("cursor does not match sort/order")
+    cols = SORT_KEYS[sort]
+    if not isinstance(keys, list) or len(keys) != len(cols):
+        raise ValueError("invalid cursor")
+    try:
+        return [
+            date.fromisoformat(k) if col.key == "callDate" else int(k)
+            for col, k in zip(cols, keys)
+        ]
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor")
+
+def _after_cursor(cols: tuple, values: list, desc: bool):
+    """
+    정렬 키가 커서 값 다음인 행 (keyset 조건).
+    (callDate, id) 내림차순이면 callDate <= d AND (callDate < d OR id < i):
+    앞 키는 범위 조건으로 남겨 (callDate, id) 인덱스를 탄다 (행 값 비교는 MySQL에서 인덱스를 못 쓰는 경우가 있음)
+    """
+    first, value = cols[0], values[0]
+    beyond = first < value if desc else first > value
+    if len(cols) == 1:
+        return beyond
+    rest = _after_cursor(cols[1:], values[1:], desc)
+    within = first <= value if desc else first >= value
+    return and_(within, or_(beyond, rest))
+
 def list_calls(
     db: Session,
     phone: str | None = None,
-    q: str | None = None,
+    q: str | None = None,      # 키워드 정확히 일치 (call_keyword)
     from_date: str | None = None,
     to_date: str | None = None,
     page: int = 1,
     size: int = 20,
     order: str = "desc",  # 'asc'|'desc'
+    sort: str = "id",     # 'id'|'callDate'
+    cursor: str | None = None,
+    count: str | None = None,  # 'exact'|'estimate'|'none' (기본: page 방식 exact, 커서 방식 none)
 ):
+    """
+    통화 기록 목록.
+    - cursor 없음: 기존 page/size (OFFSET) 방식
+    - cursor 있음: 이전 응답의 nextCursor 다음부터 size개 (page 무시, 깊은 페이지도 첫 페이지와 같은 비용).
+      빈 문자열이면 처음부터 커서 방식으로 시작
+    두 방식 모두 다음 행이 있으면 next_cursor를 돌려준다.
+    has_next는 size+1개를 읽어 판단하고, 전체 개수(COUNT)는 count 모드에 따라서만 구한다:
+    - exact: 필터 조합별로 TTL 동안 캐시한 정확한 개수
+    - estimate: 캐시된 정확한 개수, 없으면 테이블 통계(필터 없음) 또는 최대 call_count_estimate_cap개까지만 센 값
+    - none: total 없음 (무한 스크롤)
+    """
     page = max(page, 1)
     size = min(max(size, 1), 100)
+    if sort not in SORT_KEYS:
+        raise ValueError(f"unsupported sort: {sort}")
+    if count is None:
+        count = "none" if cursor is not None else "exact"
+    if count not in COUNT_MODES:
+        raise ValueError(f"unsupported count: {count}")
+    order = "asc" if order == "asc" else "desc"
+    cols = SORT_KEYS[sort]
+    after = _decode_cursor(cursor, sort, order) if cursor else None
 
     query = db.query(CallLog)
 
@@ -46,22 +273,68 @@ def list_calls(
         query = query.filter(CallLog.callDate <= to_date)
 
     if q:
-        if engine.dialect.name == "mysql":
-            # MySQL 8: JSON 배열에 값이 있으면 경로 반환
-            query = query.filter(func.json_search(CallLog.keywords, 'one', q) != None)
-        else:
-            # SQLite 호환: 문자열 LIKE
-            query = query.filter(func.json_extract(CallLog.keywords, '$').like(f'%{q}%'))
+        # 키워드 정확히 일치: call_keyword PK (keyword, call_id) 인덱스 조회.
+        # id 정렬이면 call_keyword.call_id로 정렬/커서 비교해 PK 순서 그대로 읽는다 (정렬용 임시 테이블 없음)
+        query = (query.join(CallKeyword, CallKeyword.call_id == CallLog.id)
+                      .filter(CallKeyword.keyword == normalize_keyword(q)))
+        if sort == "id":
+            cols = (CallKeyword.call_id,)
+
+    filtered = query
+    signature = (phone_hash(phone) if phone else None, normalize_keyword(q) if q else None, from_date or None, to_date or None)
+    desc = order == "desc"
+    query = query.order_by(*(col.desc() if desc else col.asc() for col in cols))
 
-    total = query.count()
-    if order == "asc":
-        query = query.order_by(CallLog.id.asc())
+    if cursor is not None:
+        if after is not None:
+            query = query.filter(_after_cursor(cols, after, desc))
+        rows = query.limit(size + 1).all()
     else:
-        query = query.order_by(CallLog.id.desc())
+        rows = (query.offset((page - 1) * size)
+                     .limit(size + 1)
+                     .all())
+    items, has_next = rows[:size], len(rows) > size
 
-    items = (query.offset((page - 1) * size)
-                  .limit(size)
-                  .all())
+    total, estimated = None, False
+    if cursor is None and not has_next and (items or page == 1):
+        # 마지막 페이지: 세지 않아도 정확한 개수를 안다
+        total = (page - 1) * size + len(items)
+        _store_count(signature, total)
+    elif count != "none":
+        total = _cached_count(signature)
+        if total is None and count == "exact":
+            total = filtered.order_by(None).count()
+            _store_count(signature, total)
+        elif total is None:
+            total, estimated = _estimate_count(db, filtered, signature)
+            if cursor is None:  # 이 페이지까지 읽은 행 수보다 작을 수는 없다
+                total = max(total, (page - 1) * size + len(rows))
 
-    has_next = (page * size) < total
-    return {"total": total, "items": items, "page": page, "size": size, "has_next": has_next}
+    next_cursor = _encode_cursor(sort, order, items[-1]) if has_next and items else None
+    return {
+        "total": total, "total_estimated": estimated, "items": items, "page": page, "size": size,
+        "has_next": has_next, "next_cursor": next_cursor,
+    }
+
+def _estimate_count(db: Session, filtered: Query, signature: tuple) -> tuple[int, bool]:
+    """
+    (개수, 추정 여부). 필터가 없으면 테이블 통계, 있으면 최대 call_count_estimate_cap개까지만 센다
+    (상한보다 적으면 정확한 값이므로 캐시).
+    """
+    if not any(signature):
+        if engine.dialect.name == "mysql":
+            rows = db.execute(text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES"
+                " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+            ), {"name": CallLog.__tablename__}).scalar()
+        else:
+            rows = db.query(func.max(CallLog.id)).scalar()  # 삭제가 드물면 행 수에 가깝다
+        return int(rows or 0), True
+    cap = max(settings.call_count_estimate_cap, 1)
+    capped = db.query(func.count()).select_from(
+        filtered.order_by(None).with_entities(CallLog.id).limit(cap).subquery()
+    ).scalar()
+    if capped < cap:
+        _store_count(signature, capped)
+        return capped, False
+    return capped, True
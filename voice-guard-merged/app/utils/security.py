@@ -9,3 +9,16 @@ def normalize_phone(raw: str) -> str:
 def phone_hash(raw: str) -> str:
     norm = normalize_phone(raw)
     return hashlib.sha256((norm + settings.phone_salt).encode()).hexdigest()
+
+def phone_hashes(raws: list[str]) -> list[str]:
+    """여러 번호를 한 번에 해시 (같은 번호는 한 번만 계산, 일괄 저장용)"""
+    salt = settings.phone_salt.encode()
+    cache: dict[str, str] = {}
+    out = []
+    for raw in raws:
+        norm = normalize_phone(raw)
+        hashed = cache.get(norm)
+        if hashed is None:
+            hashed = cache[norm] = hashlib.sha256(norm.encode() + salt).hexdigest()
+        out.append(hashed)
+    return out
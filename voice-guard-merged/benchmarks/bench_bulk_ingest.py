@@ -0,0 +1,59 @@
+# benchmarks/bench_bulk_ingest.py
+"""
+통화 기록 저장 처리량: POST /api/calls(한 건씩) vs POST /api/calls:bulk (JSON 배열 / NDJSON)
+
+실행: python -m benchmarks.bench_bulk_ingest [--db bench_ingest.db] [--rows 5000]  (voice-guard-merged/ 에서)
+앱을 프로세스 안에서 띄우므로(TestClient) HTTP 서버 없이 라우터 -> 서비스 -> DB 경로를 잰다.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+def make_items(n: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    words = ["계좌이체", "원격제어", "검찰사칭", "인증번호", "대출"]
+    return [
+        {
+            "phone": f"010-{rng.randrange(10000):04d}-{rng.randrange(10000):04d}",
+            "callDate": f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            "totalSeconds": rng.randrange(1, 900), "riskScore": rng.randrange(101), "fraudType": "정상",
+            "keywords": rng.sample(words, rng.randint(0, 3)), "audioUrl": "",
+        }
+        for _ in range(n)
+    ]
+
+def main(path: str, rows: int) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["db_url"] = f"sqlite:///{os.path.abspath(path)}"
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    single = make_items(min(rows, 500), seed=1)
+    started = time.perf_counter()
+    for item in single:
+        client.post("/api/calls", json=item).raise_for_status()
+    elapsed = time.perf_counter() - started
+    print(f"POST /api/calls       {len(single):>6}건 {elapsed:6.2f}초  {len(single) / elapsed:8.0f}건/초")
+
+    items = make_items(rows, seed=2)
+    started = time.perf_counter()
+    res = client.post("/api/calls:bulk", json=items).json()
+    elapsed = time.perf_counter() - started
+    print(f"POST :bulk (JSON)     {res['inserted']:>6}건 {elapsed:6.2f}초  {res['inserted'] / elapsed:8.0f}건/초")
+
+    ndjson = "\n".join(json.dumps(item, ensure_ascii=False) for item in make_items(rows, seed=3))
+    started = time.perf_counter()
+    res = client.post("/api/calls:bulk", content=ndjson.encode(), headers={"content-type": "application/x-ndjson"}).json()
+    elapsed = time.perf_counter() - started
+    print(f"POST :bulk (NDJSON)   {res['inserted']:>6}건 {elapsed:6.2f}초  {res['inserted'] / elapsed:8.0f}건/초  오류 {len(res['errors'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="bench_ingest.db")
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.db, args.rows)
@@ -0,0 +1,89 @@
+# benchmarks/bench_call_keywords.py
+"""
+키워드 검색 벤치마크: callLog.keywords JSON 스캔(기존 q 필터) vs call_keyword 보조 테이블 인덱스 조회
+
+실행: python -m benchmarks.bench_call_keywords [--db bench_calls.db] [--rows 1000000]  (voice-guard-merged/ 에서)
+처음 실행 시 SQLite DB에 통화 기록 --rows개와 키워드 행을 채운다 (이후 재사용).
+기존 방식은 키워드가 JSON 문자열 안에 있는지 LIKE로 찾으므로 다른 키워드의 일부도 걸린다 ("계좌" -> "안전계좌").
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+KEYWORDS = ["계좌", "안전계좌", "계좌이체", "원격제어", "검찰사칭", "대출", "인증번호", "앱설치", "금감원", "택배"]
+RARE = "보이스피싱신고"  # 0.1% 통화에만
+
+def seed(engine, rows: int) -> None:
+    from app.models.call_log import CallLog, CallKeyword
+    from app.services.call_log_service import keyword_set
+
+    rng = random.Random(7)
+    start = date(2023, 1, 1)
+    started = time.perf_counter()
+    batch = 20000
+    with engine.begin() as conn:
+        for base in range(0, rows, batch):
+            calls, words = [], []
+            for i in range(base + 1, min(rows, base + batch) + 1):
+                kws = rng.sample(KEYWORDS, rng.randint(0, 3)) + ([RARE] if rng.random() < 0.001 else [])
+                calls.append({
+                    "id": i, "phoneHash": f"{rng.randrange(50000):064x}",
+                    "callDate": start + timedelta(days=rng.randrange(700)), "totalSeconds": rng.randrange(1, 900),
+                    "riskScore": rng.randrange(101), "fraudType": "정상", "keywords": kws, "audioUrl": "",
+                })
+                words += [{"keyword": k, "call_id": i} for k in keyword_set(kws)]
+            conn.execute(CallLog.__table__.insert(), calls)
+            conn.execute(CallKeyword.__table__.insert(), words)
+    print(f"시드 {rows}행: {time.perf_counter() - started:.1f}초")
+
+def timed(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def main(path: str, rows: int) -> None:
+    os.environ["db_url"] = f"sqlite:///{os.path.abspath(path)}"
+    from sqlalchemy import func
+    from app.db import Base, SessionLocal, engine
+    from app.models.call_log import CallLog
+    from app.services.call_log_service import list_calls, clear_count_cache
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if not db.query(CallLog.id).first():
+            seed(engine, rows)
+        total = db.query(func.count(CallLog.id)).scalar()
+        print(f"통화 기록 {total}행")
+
+        def json_scan(keyword: str, size: int = 20):
+            # 기존 SQLite 경로: json_extract(keywords,'$') LIKE '%q%' (JSON은 유니코드 이스케이프로 저장되므로 같은 형태로 찾음)
+            needle = json.dumps(keyword)[1:-1]
+            query = db.query(CallLog).filter(func.json_extract(CallLog.keywords, "$").like(f"%{needle}%"))
+            return query.count(), query.order_by(CallLog.id.desc()).limit(size).all()
+
+        def indexed(keyword: str, size: int = 20):
+            clear_count_cache()
+            res = list_calls(db, q=keyword, size=size, count="exact")
+            return res["total"], res["items"]
+
+        print(f"{'키워드':<10}{'JSON 스캔(ms)':>14}{'건수':>10}{'인덱스(ms)':>12}{'건수':>10}")
+        for keyword in ("계좌", "원격제어", RARE):
+            scan_ms, (scan_n, _) = timed(lambda: json_scan(keyword))
+            idx_ms, (idx_n, _) = timed(lambda: indexed(keyword))
+            print(f"{keyword:<10}{scan_ms:>14.1f}{scan_n:>10}{idx_ms:>12.1f}{idx_n:>10}")
+
+        idx_ms, _ = timed(lambda: list_calls(db, q="원격제어", size=20, count="none"))
+        print(f"첫 페이지만 (count=none, q=원격제어): {idx_ms:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="bench_calls.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.db, args.rows)
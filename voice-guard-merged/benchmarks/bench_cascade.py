@@ -0,0 +1,99 @@
+# benchmarks/bench_cascade.py
+"""
+판정 cascade 벤치마크: 경로별 분포, LLM 호출 비율, 명확 판정의 오판 수, 판정 지연
+
+실행: python -m benchmarks.bench_cascade  (voice-guard-merged/ 에서)
+학습 파일(fixtures/risk_train.json)에 없는 발화로 평가한다. 실제 통화처럼 일상 발화가 대부분이다.
+"""
+import time
+from collections import Counter
+from typing import List, Tuple
+
+from app.ai.cascade import RiskCascade
+from app.ai.risk_local import LocalRiskClassifier
+
+# (발화, 사기 위험 여부)
+RISKY: List[str] = [
+    "중앙지검 검사입니다 고객님 통장이 대포통장으로 쓰였어요",
+    "지금 말씀드리는 계좌로 예금 전액 옮기세요",
+    "카드 뒷면 보안코드 세 자리 불러주세요",
+    "보내드린 주소 들어가서 보안 프로그램 깔아주세요",
+    "통화 끊으시면 공무집행방해로 처벌됩니다",
+    "엄마 나 핸드폰 액정 깨져서 그러는데 편의점 기프트카드 좀 사줘",
+    "원격 앱 깔고 제가 알려드리는 숫자 입력하세요",
+    "저금리 대환대출 하시려면 기존 대출금을 현금으로 먼저 갚으셔야 합니다",
+    "경찰청 사이버수사팀인데 주민번호 확인 좀 하겠습니다",
+    "오늘 안으로 처리 안 하시면 계좌가 영구 정지됩니다",
+]
+BENIGN: List[str] = [
+    "여보세요",
+    "네 말씀하세요",
+    "지금 운전 중이라 이따가 다시 걸게",
+    "내일 아침에 몇 시에 출발해",
+    "오늘 회식 장소 어디야",
+    "우유랑 계란 좀 사 와",
+    "아빠 생신 선물 뭐 살까",
+    "방금 회의 끝났어",
+    "다음 주 화요일에 치과 예약했어",
+    "버스가 안 와서 좀 늦을 것 같아",
+    "주말에 비 온대",
+    "사진 잘 받았어 고마워",
+    "애들 학교 끝나면 데리러 갈게",
+    "이번 달 월세 냈어",
+    "점심 뭐 먹었어",
+    "그 책 다 읽었어",
+    "드라마 마지막 회 봤어",
+    "네 그럼 내일 뵙겠습니다",
+    "집에 도착하면 연락해",
+    "감기 기운 있어서 오늘 쉬려고",
+    "강아지 밥 줬어",
+    "저녁은 집에서 먹을게",
+    "엘리베이터 점검 중이래",
+    "퇴근하고 헬스장 갈 거야",
+    "회사 앞 식당 새로 생겼더라",
+    "조카 돌잔치 토요일이야",
+    "커피 한 잔 할래",
+    "휴가 언제 가",
+    "세탁기 고장 나서 기사님 부르기로 했어",
+    "오늘 날씨 진짜 좋다",
+    "지하철 타고 가고 있어",
+    "할머니 댁에 들렀다 갈게",
+    "은행 가서 통장 정리 좀 해야겠다",
+    "택배 왔는지 확인해 줘",
+    "응 알았어 끊어",
+    "회의 자료 메일로 보냈어요",
+    "아이 숙제 좀 봐줘",
+    "냉장고에 반찬 있어",
+    "마트 세일한대",
+    "내일 비 오면 우산 챙겨",
+]
+
+def evaluate(cascade: RiskCascade, samples: List[Tuple[str, bool]]) -> None:
+    paths: Counter = Counter()
+    missed: List[str] = []  # 위험 발화를 안전으로 확정
+    false_alarm: List[str] = []  # 일상 발화를 위험으로 확정
+    started = time.perf_counter()
+    for text, risky in samples:
+        d = cascade.decide(text)
+        paths[d.path] += 1
+        if risky and d.path == "clear_safe":
+            missed.append(text)
+        if not risky and not d.needs_llm and d.score > 0:
+            false_alarm.append(text)
+    elapsed = time.perf_counter() - started
+    total = len(samples)
+    llm = paths["uncertain_llm"] + paths["llm"]
+    print(f"발화 {total}개, 평균 판정 {elapsed / total * 1e6:.0f}us")
+    for path, n in paths.most_common():
+        print(f"  {path:<18}{n:>5}  ({n / total:.1%})")
+    print(f"LLM 호출 비율: {llm / total:.1%} (cascade 없이 100%)")
+    print(f"위험 발화를 안전으로 확정: {len(missed)}/{len(RISKY)} {missed}")
+    print(f"일상 발화를 위험으로 확정: {len(false_alarm)}/{len(BENIGN)} {false_alarm}")
+
+def main():
+    local = LocalRiskClassifier.from_settings()
+    cascade = RiskCascade(local, low=0.2, high=0.9, rule_certain=30)
+    evaluate(cascade, [(t, True) for t in RISKY] + [(t, False) for t in BENIGN])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_realtime_ws.py
+"""
+실시간 경로 부하 시험: 동시 통화 N개가 /ws/stt로 PCM을 보내고 analysis_update 지연/처리량을 잰다
+
+서버를 scripted STT 백엔드로 띄운 뒤 실행 (GCP STT 없이 WebSocket -> 룰 -> LLM 전체 경로):
+  stt_backend=scripted uvicorn app.main:app --port 8000
+  python -m benchmarks.bench_realtime_ws --calls 50 --seconds 30  (voice-guard-merged/ 에서)
+--speed 10 이면 오디오를 실시간의 10배 속도로 보낸다 (대본도 그만큼 빨리 재생됨).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import websockets
+
+CHUNK_MS = 100
+SAMPLE_RATE = 16000
+
+async def run_call(url: str, seconds: float, speed: float, out: Dict[str, List[float]]) -> None:
+    chunk = b"\0" * (SAMPLE_RATE * CHUNK_MS // 1000 * 2)
+    # scripted STT는 받은 오디오 길이에 맞춰 결과를 내므로 결과는 마지막으로 보낸 청크가 트리거한다
+    last_sent = [time.perf_counter()]
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "start", "codec": "pcm16", "sampleRate": SAMPLE_RATE}))
+        ready = json.loads(await ws.recv())
+        if ready.get("type") != "ready":
+            raise RuntimeError(f"핸드셰이크 실패: {ready}")
+
+        async def sender():
+            interval = CHUNK_MS / 1000 / speed
+            start = time.perf_counter()
+            for i in range(int(seconds * 1000 / CHUNK_MS)):
+                await ws.send(chunk)
+                last_sent[0] = time.perf_counter()
+                delay = start + (i + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        async def receiver():
+            async for raw in ws:
+                msg: Dict[str, Any] = json.loads(raw)
+                now = time.perf_counter()
+                kind = msg.get("type")
+                if kind == "analysis_update":
+                    out["updates"].append(now)
+                    out["latency_ms"].append((now - last_sent[0]) * 1000)
+                    if msg.get("is_final"):
+                        out["finals"].append(now)
+                elif kind == "error":
+                    out["errors"].append(now)
+
+        recv_task = asyncio.create_task(receiver())
+        await sender()
+        await asyncio.sleep(1.0)  # 마지막 결과 대기
+        recv_task.cancel()
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def main(url: str, calls: int, seconds: float, speed: float) -> None:
+    out: Dict[str, List[float]] = {"updates": [], "finals": [], "latency_ms": [], "errors": []}
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_call(url, seconds, speed, out) for _ in range(calls)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    failed = [r for r in results if isinstance(r, Exception)]
+    lat = out["latency_ms"]
+    print(f"통화 {calls}개 x 오디오 {seconds:.0f}초 (x{speed:g}) / 경과 {elapsed:.1f}초, 실패 {len(failed)}")
+    print(f"analysis_update {len(out['updates'])}건 ({len(out['updates']) / elapsed:.1f}/s), "
+          f"확정 {len(out['finals'])}건, 오류 메시지 {len(out['errors'])}건")
+    if lat:
+        print(f"마지막 오디오 전송 -> analysis_update 지연(ms): p50={statistics.median(lat):.1f} "
+              f"p95={_pct(lat, 0.95):.1f} p99={_pct(lat, 0.99):.1f} max={max(lat):.1f}")
+    for e in failed[:3]:
+        print(f"  실패: {e!r}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws/stt")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.calls, args.seconds, args.speed))
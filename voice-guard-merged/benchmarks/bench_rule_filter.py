@@ -0,0 +1,60 @@
+# benchmarks/bench_rule_filter.py
+"""
+룰 필터 벤치마크: 한 번짜리 라벨 검사(rule_hit_labels, 정규식) vs 위치 포함 매칭(rule_matches, 키워드 오토마톤),
+발화 하나의 partial 누적 처리(매번 전체 검사 vs IncrementalRuleMatcher)
+
+실행: python -m benchmarks.bench_rule_filter  (voice-guard-merged/ 에서)
+"""
+import timeit
+from typing import List
+
+from app.ai.rule_filter import IncrementalRuleMatcher, labels_from_matches, rule_hit_labels, rule_matches
+
+SAMPLES = {
+    "짧은 일상 대화": "네 안녕하세요 오늘 날씨가 좋네요",
+    "짧은 사기 발화": "서울중앙지검 수사관입니다 지금 바로 안전계좌로 이체하세요",
+    "긴 일상 대화": "어제 친구랑 저녁 먹고 영화 보고 왔는데 정말 재밌었어요 " * 8,
+    "긴 사기 발화": (
+        "고객님 명의로 대포통장이 개설되어 범죄에 연루되셨습니다 "
+        "계좌동결을 막으려면 일회용 번호와 비밀번호를 알려주시고 "
+        "보내드린 링크로 앱설치 후 원격제어를 허용해 주세요 "
+    ) * 4 + "3,000,000원을 즉시 송금하셔야 합니다",
+}
+
+def _bench(fn, text: str, number: int) -> float:
+    return min(timeit.repeat(lambda: fn(text), number=number, repeat=5)) / number * 1e6
+
+def main(number: int = 20000):
+    print(f"{'샘플':<14}{'길이':>6}{'labels(us)':>12}{'matches(us)':>13}")
+    for name, text in SAMPLES.items():
+        assert rule_hit_labels(text) == labels_from_matches(rule_matches(text)), name
+        labels_us = _bench(rule_hit_labels, text, number)
+        matches_us = _bench(rule_matches, text, number)
+        print(f"{name:<14}{len(text):>6}{labels_us:>12.2f}{matches_us:>13.2f}")
+
+def partials(text: str, step: int = 4) -> List[str]:
+    """STT 중간 결과처럼 step 글자씩 자라나는 전사 텍스트 목록"""
+    return [text[:i] for i in range(step, len(text) + step, step)]
+
+def bench_partials(number: int = 200):
+    """발화 하나의 partial 전체를 처리하는 비용: 매번 전체 재스캔 vs 증분 스캔"""
+    def full(texts):
+        for t in texts:
+            rule_hit_labels(t)
+
+    def incremental(texts):
+        matcher = IncrementalRuleMatcher()
+        for t in texts:
+            matcher.update(t)
+            matcher.labels()
+
+    print(f"\n{'partial 누적':<14}{'길이':>6}{'partial 수':>10}{'full(us)':>12}{'incremental(us)':>17}")
+    for name, text in SAMPLES.items():
+        texts = partials(text)
+        full_us = _bench(full, texts, number)
+        inc_us = _bench(incremental, texts, number)
+        print(f"{name:<14}{len(text):>6}{len(texts):>10}{full_us:>12.2f}{inc_us:>17.2f}")
+
+if __name__ == "__main__":
+    main()
+    bench_partials()
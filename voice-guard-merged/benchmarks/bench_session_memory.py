@@ -0,0 +1,42 @@
+# benchmarks/bench_session_memory.py
+"""
+통화별 상태 메모리 벤치마크: 통화가 길어져도 SessionState 크기가 일정한지 확인
+
+실행: python -m benchmarks.bench_session_memory [--turns 20000]  (voice-guard-merged/ 에서)
+memory_bytes()(객체가 들고 있는 값의 크기)와 tracemalloc 할당량을 발화 수별로 출력한다.
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.ai.session_state import SessionState
+
+UTTERANCES = [
+    ("서울중앙지검 수사관입니다 고객님 명의 계좌가 범죄에 연루되었습니다", 10, ["정부기관사칭"]),
+    ("네 무슨 일이시죠", 0, []),
+    ("본인 확인을 위해 주민등록번호 불러주세요", 8, ["개인정보요구"]),
+    ("잠시만요", 0, ["의심 없음"]),
+    ("자산 보호를 위해 안전계좌로 지금 바로 이체하셔야 합니다", 27, ["금전요구", "협박/압박"]),
+]
+
+def main(turns: int) -> None:
+    state = SessionState(max_utterances=8, max_bytes=16384)
+    checkpoints = {turns // 100, turns // 10, turns // 2, turns}
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for i in range(1, turns + 1):
+        text, score, labels = UTTERANCES[i % len(UTTERANCES)]
+        state.add(f"{text} {i}", score, labels)
+        if i in checkpoints:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"발화 {i:>7}: memory_bytes={state.memory_bytes():>6}  할당={current - base:>6}B")
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    print(f"발화당 평균 {elapsed / turns * 1e6:.1f}us (tracemalloc 포함), 상태: {state.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.turns)
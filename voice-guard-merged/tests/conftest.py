@@ -0,0 +1,5 @@
+# tests/conftest.py
+import os
+
+# app.config.Settings는 db_url이 필수 - 테스트는 DB를 쓰지 않으므로 메모리 SQLite
+os.environ.setdefault("db_url", "sqlite://")
@@ -0,0 +1,106 @@
+# tests/test_batcher.py
+"""RiskBatcher: 배치 묶기, 최대 크기/최대 대기 flush, 호출자별 결과/예외 분배, close() 시 취소 (FakeRiskModel 사용)"""
+import asyncio
+
+import pytest
+
+from app.ai.batcher import FakeRiskModel, RiskBatcher
+
+TEXTS = [
+    "네 안녕하세요",
+    "서울중앙지검 수사관입니다 지금 바로 안전계좌로 이체하세요",
+    "인증번호 알려주세요",
+    "오늘 날씨가 좋네요",
+    "보내드린 링크로 앱설치 후 원격제어를 허용해 주세요",
+]
+
+class _FailingModel(FakeRiskModel):
+    async def analyze_batch(self, texts):
+        self.calls += 1
+        raise RuntimeError("boom")
+
+class _ShortModel(FakeRiskModel):
+    async def analyze_batch(self, texts):
+        return (await super().analyze_batch(texts))[:-1]
+
+def test_concurrent_calls_share_one_batch_in_order():
+    async def main():
+        model = FakeRiskModel(call_latency=0, per_item_latency=0)
+        batcher = RiskBatcher(model, max_batch_size=8, max_wait_seconds=0.05)
+        results = await asyncio.gather(*(batcher.analyze(t, deadline_seconds=5) for t in TEXTS))
+        return model, batcher, results
+
+    model, batcher, results = asyncio.run(main())
+    assert model.calls == 1
+    assert results == [FakeRiskModel.score(t) for t in TEXTS]
+    assert batcher.stats()["max_batch"] == len(TEXTS)
+
+def test_max_size_flushes_without_waiting():
+    async def main():
+        model = FakeRiskModel(call_latency=0, per_item_latency=0)
+        batcher = RiskBatcher(model, max_batch_size=2, max_wait_seconds=10)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.analyze(t, deadline_seconds=5) for t in TEXTS[:4])), timeout=1
+        )
+        return model, results
+
+    model, results = asyncio.run(main())
+    assert model.calls == 2
+    assert results == [FakeRiskModel.score(t) for t in TEXTS[:4]]
+
+def test_max_wait_flushes_partial_batch():
+    async def main():
+        model = FakeRiskModel(call_latency=0, per_item_latency=0)
+        batcher = RiskBatcher(model, max_batch_size=8, max_wait_seconds=0.02)
+        first = await asyncio.wait_for(batcher.analyze(TEXTS[1], deadline_seconds=5), timeout=1)
+        second = await asyncio.wait_for(batcher.analyze(TEXTS[2], deadline_seconds=5), timeout=1)
+        return model, first, second
+
+    model, first, second = asyncio.run(main())
+    assert model.calls == 2
+    assert first == FakeRiskModel.score(TEXTS[1])
+    assert second == FakeRiskModel.score(TEXTS[2])
+
+@pytest.mark.parametrize("model, error", [
+    (_FailingModel(call_latency=0, per_item_latency=0), RuntimeError),
+    (_ShortModel(call_latency=0, per_item_latency=0), ValueError),
+])
+def test_batch_failure_reaches_every_caller(model, error):
+    async def main():
+        batcher = RiskBatcher(model, max_batch_size=8, max_wait_seconds=0.01)
+        return await asyncio.gather(
+            *(batcher.analyze(t, deadline_seconds=5) for t in TEXTS[:3]), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(r, error) for r in results)
+
+def test_cancelled_caller_does_not_affect_others():
+    async def main():
+        model = FakeRiskModel(call_latency=0, per_item_latency=0)
+        batcher = RiskBatcher(model, max_batch_size=8, max_wait_seconds=0.02)
+        tasks = [asyncio.create_task(batcher.analyze(t, deadline_seconds=5)) for t in TEXTS[:3]]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert results[0] == FakeRiskModel.score(TEXTS[0])
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert results[2] == FakeRiskModel.score(TEXTS[2])
+
+def test_close_cancels_in_flight_batches():
+    async def main():
+        model = FakeRiskModel(call_latency=10, per_item_latency=0)
+        batcher = RiskBatcher(model, max_batch_size=2, max_wait_seconds=0.01)
+        tasks = [asyncio.create_task(batcher.analyze(t, deadline_seconds=5)) for t in TEXTS[:3]]
+        await asyncio.sleep(0.05)
+        assert batcher.stats()["in_flight"] == 2
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert batcher.stats()["in_flight"] == 0
@@ -0,0 +1,62 @@
+# tests/test_rule_filter.py
+"""IncrementalRuleMatcher가 매번 전체를 다시 스캔한 결과(rule_matches/rule_hit_labels)와 같은지 무작위로 확인"""
+import random
+
+import pytest
+
+from app.ai.rule_filter import IncrementalRuleMatcher, labels_from_matches, rule_hit_labels, rule_matches
+
+# 키워드 조각, 금액 표현, 공백, 일반 글자를 섞어 키워드 경계/공백 허용 키워드/금액 되짚기를 자주 건드린다
+PIECES = [
+    "검찰", "수사", "계좌", "번호", "계좌번호", "비밀", "비밀번호", "인증번호", "일회용", " 번호", "송금", "이체",
+    "지금", " 바로", "지금 바로", "화면", "  공유", "접속", " 허용", "OTP", "otp", "URL", "팀뷰어", "앱설치",
+    "3", "30", ",000", ",000,000", "원", "만원", "억", "달러", "USD", "krw", " ", "  ", "\n",
+    "네", "고객님", "안녕하세요", "입니다", "하세요", "돈", "현금", "가", "나", ".", "?",
+]
+
+def _random_text(rng: random.Random, pieces: int) -> str:
+    return "".join(rng.choice(PIECES) for _ in range(pieces))
+
+def _assert_same(matcher: IncrementalRuleMatcher, text: str) -> None:
+    matches = matcher.update(text)
+    assert matches == rule_matches(text), text
+    assert matcher.labels() == labels_from_matches(rule_matches(text)) == rule_hit_labels(text), text
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_matches_full_rescan(seed):
+    rng = random.Random(seed)
+    matcher = IncrementalRuleMatcher()
+    text = ""
+    for _ in range(300):
+        op = rng.random()
+        if op < 0.6:
+            # partial이 자라남 (한 글자씩 또는 조각 단위)
+            piece = rng.choice(PIECES)
+            text += piece[: rng.randint(1, len(piece))]
+        elif op < 0.8 and text:
+            # STT가 뒷부분을 고쳐 씀
+            text = text[: rng.randrange(len(text))] + _random_text(rng, rng.randint(0, 3))
+        elif op < 0.9 and text:
+            # 앞부분을 고쳐 씀 (공통 접두사가 짧음)
+            cut = rng.randrange(len(text))
+            text = _random_text(rng, 1) + text[cut:]
+        else:
+            # is_final: 다음 발화를 새로 시작
+            matcher.reset()
+            text = _random_text(rng, rng.randint(0, 4))
+        _assert_same(matcher, text)
+
+def test_amount_grows_across_partials():
+    """금액이 여러 partial에 걸쳐 자라면 되짚어 하나의 금액으로 잡는다"""
+    matcher = IncrementalRuleMatcher()
+    for text in ["3", "3,0", "3,000", "3,000,0", "3,000,000", "3,000,000 원", "3,000,000 원을 송금"]:
+        _assert_same(matcher, text)
+    assert [m.keyword for m in matcher.update("3,000,000 원을 송금") if m.pattern_index == 2] == ["3,000,000 원"]
+
+def test_reset_starts_a_new_utterance():
+    matcher = IncrementalRuleMatcher()
+    matcher.update("검찰 수사관입니다 지금 바로 이체")
+    matcher.reset()
+    assert matcher.text == ""
+    _assert_same(matcher, "네 안녕하세요")
+    assert matcher.labels() == []
@@ -1,11 +1,68 @@
-from .stt_service import GoogleStreamingSTT
+from .stt_service import StreamingSTT, GoogleStreamingSTT, AsyncGoogleStreamingSTT, create_streaming_stt, close_stt_clients
+from .stt_local import ScriptedSTT, load_scripts
+from .audio_queue import AudioQueue, audio_queue_totals
+from .vad import EnergyVAD, vad_totals
+from .audio_format import AudioFormat, PcmTranscoder, DEFAULT_AUDIO_FORMAT
+from .stt_rotation import StreamRotation
 from .rule_filter import rule_hit_labels, should_call_llm, calculate_rule_score
-from .risk_analyzer import VertexRiskAnalyzer
+from .risk_analyzer import RiskModel, VertexRiskAnalyzer, init_risk_analyzer, get_risk_analyzer, close_risk_analyzer
+from .risk_local import LocalRiskClassifier, get_local_risk_classifier
+from .cascade import RiskCascade, CascadeDecision, get_risk_cascade, cascade_totals
+from .session_state import SessionState, intern_label, label_name
+from .context import SessionContext, estimate_tokens
+from .result_cache import AnalysisCache, normalize_transcript, get_analysis_cache, close_analysis_cache
+from .llm_scheduler import LLMScheduler, LLMSchedulerError, llm_priority, get_llm_scheduler, close_llm_scheduler
+from .hedging import HedgedRetryPolicy, LLMCallMetrics
+from .batcher import RiskBatcher, FakeRiskModel, get_risk_batcher, close_risk_batcher
 
 __all__ = [
+    "StreamingSTT",
     "GoogleStreamingSTT",
+    "ScriptedSTT",
+    "load_scripts",
+    "AsyncGoogleStreamingSTT",
+    "create_streaming_stt",
+    "close_stt_clients",
+    "AudioQueue",
+    "audio_queue_totals",
+    "EnergyVAD",
+    "vad_totals",
+    "AudioFormat",
+    "PcmTranscoder",
+    "DEFAULT_AUDIO_FORMAT",
+    "StreamRotation",
     "rule_hit_labels", 
     "should_call_llm", 
     "calculate_rule_score",
-    "VertexRiskAnalyzer"
+    "RiskModel",
+    "VertexRiskAnalyzer",
+    "LocalRiskClassifier",
+    "get_local_risk_classifier",
+    "RiskCascade",
+    "CascadeDecision",
+    "get_risk_cascade",
+    "cascade_totals",
+    "SessionState",
+    "intern_label",
+    "label_name",
+    "SessionContext",
+    "estimate_tokens",
+    "init_risk_analyzer",
+    "get_risk_analyzer",
+    "close_risk_analyzer",
+    "AnalysisCache",
+    "normalize_transcript",
+    "get_analysis_cache",
+    "close_analysis_cache",
+    "LLMScheduler",
+    "LLMSchedulerError",
+    "llm_priority",
+    "get_llm_scheduler",
+    "close_llm_scheduler",
+    "HedgedRetryPolicy",
+    "LLMCallMetrics",
+    "RiskBatcher",
+    "FakeRiskModel",
+    "get_risk_batcher",
+    "close_risk_batcher",
 ]
@@ -0,0 +1,205 @@
+# app/ai/batcher.py
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Coroutine, Dict, List, Optional, Protocol, Set
+
+from ..config import settings
+from .llm_scheduler import LLMScheduler, get_llm_scheduler
+from .risk_analyzer import get_risk_analyzer
+from .rule_filter import calculate_rule_score, rule_hit_labels
+
+class BatchRiskModel(Protocol):
+    """여러 발화를 한 번의 호출로 분석하는 모델 (결과는 입력 순서대로)"""
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]: ...
+
+@dataclass
+class _Pending:
+    text: str
+    priority: int
+    deadline: float
+    future: asyncio.Future
+
+class RiskBatcher:
+    """
+    동시에 들어온 최종 발화들을 모아 한 번의 LLM 호출(JSON 배열 응답)로 처리하는 마이크로 배칭 단계.
+    - 첫 요청 후 max_wait_seconds 동안 또는 max_batch_size개가 찰 때까지 모은다
+    - 스케줄러가 있으면 배치 하나를 작업 하나로 제출 (우선순위는 최댓값, 마감은 가장 이른 값)
+    - 결과는 각 호출자의 future로 나눠 돌려준다
+    - 내부 태스크는 _tasks에 강한 참조로 보관하고 close()에서 취소한다
+    """
+    def __init__(
+        self,
+        model: BatchRiskModel,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.scheduler = scheduler
+        self._pending: List[_Pending] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"items": 0, "batches": 0, "max_batch": 0}
+
+    async def analyze(self, text: str, priority: int = 0, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """발화 하나를 배치에 넣고 결과를 기다린다"""
+        loop = asyncio.get_running_loop()
+        if deadline_seconds is None:
+            deadline_seconds = self.scheduler.deadline_seconds if self.scheduler else settings.llm_deadline_seconds
+        item = _Pending(text, priority, time.monotonic() + deadline_seconds, loop.create_future())
+        self._pending.append(item)
+        self._stats["items"] += 1
+        if self._full is None:
+            self._full = asyncio.Event()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._spawn(self._flush_after_wait())
+        return await item.future
+
+    async def _flush_after_wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            self._full.clear()
+            self._spawn(self._run(batch))
+
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """이벤트 루프는 태스크를 약하게만 참조하므로 끝날 때까지 집합에 보관"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def close(self) -> None:
+        """대기 중인 발화와 진행 중인 배치를 취소하고 끝날 때까지 기다린다"""
+        pending, self._pending = self._pending, []
+        for item in pending:
+            item.future.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._flush_task = None
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        batch = [item for item in batch if not item.future.done()]  # 이미 취소된 호출자 제외
+        if not batch:
+            return
+        self._stats["batches"] += 1
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+        texts = [item.text for item in batch]
+
+        def call() -> Awaitable[List[Dict[str, Any]]]:
+            return self.model.analyze_batch(texts)
+
+        try:
+            if self.scheduler is not None:
+                remaining = min(item.deadline for item in batch) - time.monotonic()
+                results = await self.scheduler.submit(
+                    call,
+                    priority=max(item.priority for item in batch),
+                    deadline_seconds=remaining,
+                )
+            else:
+                results = await call()
+        except asyncio.CancelledError:
+            for item in batch:
+                item.future.cancel()
+            raise
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        if len(results) != len(batch):
+            e = ValueError(f"배치 결과 개수 불일치: {len(results)} != {len(batch)}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch": round(self._stats["items"] / batches, 2) if batches else 0.0,
+            "pending": len(self._pending),
+            "in_flight": len(self._tasks),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+class FakeRiskModel:
+    """
+    오프라인 테스트/부하 시험용 가짜 배치 모델.
+    룰 필터로 결정적인 결과를 만들고, 호출당 고정 지연 + 발화당 지연으로 LLM 왕복을 흉내낸다.
+    """
+    def __init__(self, call_latency: float = 0.3, per_item_latency: float = 0.01):
+        self.call_latency = call_latency
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+
+    @staticmethod
+    def score(text: str) -> Dict[str, Any]:
+        labels = rule_hit_labels(text)
+        score = calculate_rule_score(labels)
+        return {
+            "risk_score": score,
+            "risk_level": "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW"),
+            "labels": labels or ["의심 없음"],
+            "evidence": [],
+            "reason": "fake model",
+            "actions": [],
+        }
+
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        self.calls += 1
+        await asyncio.sleep(self.call_latency + self.per_item_latency * len(texts))
+        return [self.score(t) for t in texts]
+
+# 프로세스 공용 배처 (llm_batching=True일 때만 사용)
+_shared_batcher: Optional[RiskBatcher] = None
+_shared_lock = threading.Lock()
+
+def build_risk_batcher(model: BatchRiskModel, scheduler: Optional[LLMScheduler] = None) -> RiskBatcher:
+    return RiskBatcher(
+        model,
+        max_batch_size=settings.llm_batch_max_size,
+        max_wait_seconds=settings.llm_batch_max_wait_ms / 1000.0,
+        scheduler=scheduler,
+    )
+
+def get_risk_batcher() -> Optional[RiskBatcher]:
+    """FastAPI 의존성: 배칭이 꺼져 있거나 분석기가 없으면 None"""
+    global _shared_batcher
+    if not settings.llm_batching:
+        return None
+    with _shared_lock:
+        if _shared_batcher is None:
+            analyzer = get_risk_analyzer()
+            if analyzer is None:
+                return None
+            _shared_batcher = build_risk_batcher(analyzer, get_llm_scheduler())
+        return _shared_batcher
+
+async def close_risk_batcher() -> None:
+    """앱 종료 시 공용 배처 해제: 진행 중인 배치를 취소하고 (스케줄러/분석기와 함께 다시 만들어지도록) 비운다"""
+    global _shared_batcher
+    with _shared_lock:
+        batcher, _shared_batcher = _shared_batcher, None
+    if batcher is not None:
+        await batcher.close()
@@ -0,0 +1,130 @@
+# app/ai/context.py
+import math
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ..config import settings
+from .session_state import SessionState, Utterance, label_name
+
+# 한글/한자/가나: 글자당 토큰 하나 가까이 쓰는 문자
+_WIDE = re.compile("[\uac00-\ud7a3\u3130-\u318f\u3040-\u30ff\u4e00-\u9fff]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    프롬프트 토큰 수 추정 (토크나이저 호출 없이, 실제보다 약간 크게 잡는 보수적 추정).
+    한글 등은 글자당 1토큰, 나머지는 4글자당 1토큰.
+    """
+    if not text:
+        return 0
+    wide = len(_WIDE.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰이 max_tokens를 넘으면 앞부분만 남기고 '…'를 붙인다"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:  # max_tokens 안에 들어가는 가장 긴 앞부분
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "…"
+
+class SessionContext(SessionState):
+    """
+    통화 하나의 LLM 문맥 (SessionState 위에서, 통화 길이와 상관없이 메모리/프롬프트 크기 고정).
+    - 최근 발화: 최대 max_turns개이면서 recent_tokens(와 SessionState의 max_bytes) 안에 드는 만큼 원문 그대로
+    - 그보다 오래된 발화: 요약으로 접는다 (발화 수, 라벨별 횟수, 누적 점수, 점수 높은 발화 몇 개)
+      요약은 summary_tokens 안에서 점수가 높은 발화부터 남긴다 (같은 발화는 한 번만)
+    프롬프트 크기는 최근 발화 + 요약 예산으로 묶이고, 내용 없는 일상 발화는 요약에 숫자로만 남는다.
+    """
+    __slots__ = ("recent_tokens", "summary_tokens", "_recent_total", "_highlights", "_summary")
+
+    _HIGHLIGHT_TOKENS = 40  # 요약에 남길 발화 하나의 최대 토큰
+
+    def __init__(self, max_turns: int = 5, recent_tokens: int = 240, summary_tokens: int = 120, max_bytes: int = 16384):
+        super().__init__(max_utterances=max_turns, max_bytes=max_bytes)
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self._recent_total = 0
+        self._highlights: List[Tuple[int, int, str]] = []  # (점수, 순번, 발화) 점수 높은 순
+        self._summary = ""
+
+    @classmethod
+    def from_settings(cls) -> "SessionContext":
+        return cls(
+            max_turns=settings.llm_context_turns,
+            recent_tokens=settings.llm_context_recent_tokens,
+            summary_tokens=settings.llm_context_summary_tokens,
+            max_bytes=settings.session_memory_bytes,
+        )
+
+    @property
+    def max_turns(self) -> int:
+        return self.max_utterances
+
+    def add(self, text: str, score: int = 0, labels: Iterable[str] = ()) -> None:
+        """판정이 끝난 최종 발화 추가 (넘치는 오래된 발화는 요약으로 접힌다)"""
+        folded = self.turns - len(self._recent)
+        super().add(text, score, labels)
+        self._recent_total = sum(estimate_tokens(item[0]) for item in self._recent)
+        if self.turns - len(self._recent) != folded:
+            self._summary = self._render()
+
+    def _over_budget(self) -> bool:
+        tokens = sum(estimate_tokens(item[0]) for item in self._recent)
+        return super()._over_budget() or tokens > self.recent_tokens
+
+    def _evict(self, utterance: Utterance) -> None:
+        super()._evict(utterance)
+        text, score = utterance[0], utterance[1]
+        line = clip_tokens(text, self._HIGHLIGHT_TOKENS)
+        if score > 0 and all(item[2] != line for item in self._highlights):
+            self._highlights.append((score, -self.turns, line))
+            self._highlights.sort(reverse=True)
+
+    def _render(self) -> str:
+        # 접힌 발화 집계 = 통화 전체 - 최근 발화 (따로 세지 않는다)
+        folded = self.turns - len(self._recent)
+        folded_score = self.total_score - sum(item[1] for item in self._recent)
+        labels = list(self._label_counts)
+        for item in self._recent:
+            for label_id in item[2]:
+                labels[label_id] -= 1
+        head = f"앞선 대화 {folded}문장, 누적 {folded_score}점"
+        ranked = sorted(((n, -i) for i, n in enumerate(labels) if n > 0), reverse=True)
+        if ranked:
+            head += ", 위험 신호: " + ", ".join(f"{label_name(-i)} {n}회" for n, i in ranked)
+        summary = head
+        kept: List[Tuple[int, int, str]] = []
+        for item in self._highlights:
+            line = f'\n- "{item[2]}"'
+            if estimate_tokens(summary + line) > self.summary_tokens:
+                break
+            summary += line
+            kept.append(item)
+        self._highlights = kept  # 예산 밖으로 밀린 발화는 버린다 (메모리 상한)
+        return clip_tokens(summary, self.summary_tokens)
+
+    def summary(self) -> str:
+        """오래된 발화 요약 (아직 접힌 발화가 없으면 '')"""
+        return self._summary
+
+    def memory_bytes(self) -> int:
+        return (
+            super().memory_bytes()
+            + sys.getsizeof(self._highlights)
+            + sum(sys.getsizeof(item) + sys.getsizeof(item[2]) for item in self._highlights)
+            + sys.getsizeof(self._summary)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "recent_tokens": self._recent_total,
+            "folded": self.turns - len(self._recent),
+            "summary_tokens": estimate_tokens(self._summary),
+        }
@@ -0,0 +1,243 @@
+# app/ai/hedging.py
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from ..config import settings
+from .llm_scheduler import LLMDeadlineExceeded
+
+def is_quota_error(e: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED 계열(쿼터 초과) 여부"""
+    if getattr(e, "code", None) == 429 or getattr(e, "status_code", None) == 429:
+        return True
+    return "RESOURCE_EXHAUSTED" in str(e) or "429" in str(getattr(e, "status", ""))
+
+class LLMCallMetrics:
+    """
+    LLM 호출 결과 지표.
+    - 시도 종류: primary / hedge / retry(빈 응답 후 재시도) / backoff(쿼터 초과 후 재시도)
+    - 결과: ok / empty / quota / error / timeout / deadline / cancelled, 승자(primary/hedge/retry/backoff)
+    - 최근 verdict 지연시간(p50/p95/p99), 스트리밍 첫 조각까지의 시간, SLO(마감 시간) 충족률
+    """
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._first_chunk: Deque[float] = deque(maxlen=window)
+        self._counts: Dict[str, int] = {
+            "calls": 0, "primary": 0, "hedge": 0, "retry": 0, "backoff": 0,
+            "ok": 0, "empty": 0, "quota": 0, "error": 0, "timeout": 0, "deadline": 0, "cancelled": 0,
+            "won_primary": 0, "won_hedge": 0, "won_retry": 0, "won_backoff": 0, "slo_met": 0,
+        }
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def observe(self, seconds: float, within_slo: bool) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            if within_slo:
+                self._counts["slo_met"] += 1
+
+    def observe_first_chunk(self, seconds: float) -> None:
+        with self._lock:
+            self._first_chunk.append(seconds)
+
+    def percentile(self, q: float, first_chunk: bool = False) -> Optional[float]:
+        with self._lock:
+            samples = self._first_chunk if first_chunk else self._latencies
+            if not samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def sample_count(self, first_chunk: bool = False) -> int:
+        with self._lock:
+            return len(self._first_chunk if first_chunk else self._latencies)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        p = {k: self.percentile(q) for k, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+        first_p95 = self.percentile(0.95, first_chunk=True)
+        return {
+            **counts,
+            **{f"latency_{k}_ms": round(v * 1000, 1) if v is not None else None for k, v in p.items()},
+            "first_chunk_p95_ms": round(first_p95 * 1000, 1) if first_p95 is not None else None,
+            "slo_rate": round(counts["slo_met"] / counts["calls"], 4) if counts["calls"] else None,
+        }
+
+class HedgedRetryPolicy:
+    """
+    지연 예산 기반 LLM 호출 정책 (순차 3회 재시도 대체).
+    - 주 요청이 hedge_delay 안에 끝나지 않으면 같은 요청을 한 번 더 보내고 먼저 온 응답을 사용 (hedged request)
+      단, 스트리밍 응답이 이미 도착하기 시작했으면 hedge하지 않는다
+    - 빈 응답이면 다음 단계(더 단순한 프롬프트)로 즉시 재시도
+    - 쿼터 초과(429)면 지수 백오프 + 지터 후 재시도
+    - 전체 시도는 max_attempts 이하, 발화당 마감 시간(deadline)을 넘기면 LLMDeadlineExceeded
+      (호출부는 룰 점수로 대체)
+    - adaptive=True면 hedge 지연은 최근 첫 조각 도착 시간(없으면 응답 시간)의 p95
+      (표본이 적을 때는 hedge_delay 고정값)
+    """
+    _MIN_SAMPLES = 20
+
+    def __init__(
+        self,
+        hedge_delay: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        deadline_seconds: float,
+        adaptive: bool = True,
+        metrics: Optional[LLMCallMetrics] = None,
+    ):
+        self.hedge_delay_seconds = hedge_delay
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline_seconds = deadline_seconds
+        self.adaptive = adaptive
+        self.metrics = metrics or LLMCallMetrics()
+
+    @classmethod
+    def from_settings(cls) -> "HedgedRetryPolicy":
+        return cls(
+            hedge_delay=settings.llm_hedge_delay_ms / 1000.0,
+            max_attempts=settings.llm_max_attempts,
+            backoff_base=settings.llm_backoff_base_ms / 1000.0,
+            backoff_max=settings.llm_backoff_max_ms / 1000.0,
+            deadline_seconds=settings.llm_deadline_seconds,
+            adaptive=settings.llm_hedge_adaptive,
+        )
+
+    def hedge_delay(self) -> float:
+        if self.adaptive:
+            for first_chunk in (True, False):
+                if self.metrics.sample_count(first_chunk) >= self._MIN_SAMPLES:
+                    return self.metrics.percentile(0.95, first_chunk)
+        return self.hedge_delay_seconds
+
+    def backoff(self, n: int) -> float:
+        """n번째 백오프 대기 시간 (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** n)))
+
+    async def run(
+        self,
+        call: Callable[[int, Callable[[], None]], Awaitable[str]],
+        accept: Callable[[str], bool],
+        deadline_seconds: Optional[float] = None,
+    ) -> str:
+        """
+        call(stage, started)로 요청을 보내고 accept(text)를 만족하는 첫 응답을 반환.
+        stage는 빈 응답 재시도마다 1씩 증가(hedge는 같은 stage 사용).
+        스트리밍 호출은 첫 조각을 받으면 started()를 부른다 (이후로는 hedge하지 않음).
+        모든 시도가 빈 응답이면 마지막 응답(빈 문자열일 수 있음), 오류로 끝나면 마지막 예외를 던진다.
+        """
+        start = time.monotonic()
+        budget = deadline_seconds if deadline_seconds is not None else self.deadline_seconds
+        deadline = start + budget
+        pending: Dict[asyncio.Task, str] = {}
+        attempts = 0
+        stage = 0
+        backoffs = 0
+        last_text = ""
+        last_error: Optional[BaseException] = None
+        hedge_at: Optional[float] = start + self.hedge_delay()
+        self.metrics.inc("calls")
+
+        streaming = False
+
+        def started() -> None:
+            nonlocal hedge_at, streaming
+            if not streaming:
+                streaming = True
+                hedge_at = None
+                self.metrics.observe_first_chunk(time.monotonic() - start)
+
+        def launch(kind: str) -> None:
+            nonlocal attempts
+            attempts += 1
+            self.metrics.inc(kind)
+            task = asyncio.ensure_future(
+                asyncio.wait_for(call(stage, started), timeout=min(settings.llm_timeout_seconds, deadline - time.monotonic()))
+            )
+            pending[task] = kind
+
+        try:
+            launch("primary")
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise asyncio.TimeoutError
+                wait = deadline - now
+                if hedge_at is not None and attempts < self.max_attempts:
+                    wait = min(wait, max(0.0, hedge_at - now))
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedge_at is not None and time.monotonic() >= hedge_at and attempts < self.max_attempts:
+                        hedge_at = None
+                        launch("hedge")
+                    continue
+
+                for task in done:
+                    kind = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except asyncio.TimeoutError as e:
+                        self.metrics.inc("timeout")
+                        last_error = e
+                        if not pending and attempts < self.max_attempts and time.monotonic() < deadline:
+                            launch("retry")
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        if not is_quota_error(e):
+                            self.metrics.inc("error")
+                            continue
+                        self.metrics.inc("quota")
+                        if pending or attempts >= self.max_attempts:
+                            continue
+                        delay = self.backoff(backoffs)
+                        backoffs += 1
+                        if time.monotonic() + delay >= deadline:
+                            raise asyncio.TimeoutError
+                        await asyncio.sleep(delay)
+                        launch("backoff")
+                        continue
+
+                    if accept(text):
+                        elapsed = time.monotonic() - start
+                        self.metrics.inc("ok")
+                        self.metrics.inc(f"won_{kind}")
+                        self.metrics.observe(elapsed, elapsed <= budget)
+                        return text
+                    self.metrics.inc("empty")
+                    last_text = text
+                    if not pending and attempts < self.max_attempts:
+                        stage += 1
+                        launch("retry")
+
+            if last_error is not None and not last_text:
+                raise last_error
+            return last_text
+        except asyncio.TimeoutError:
+            self.metrics.inc("deadline")
+            raise LLMDeadlineExceeded(f"LLM 판정 마감 시간 초과 ({budget}s)")
+        except asyncio.CancelledError:
+            # 스케줄러 마감 초과 또는 소켓 종료
+            self.metrics.inc("cancelled")
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.stats(),
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "max_attempts": self.max_attempts,
+            "deadline_seconds": self.deadline_seconds,
+        }
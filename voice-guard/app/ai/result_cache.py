@@ -0,0 +1,224 @@
+# app/ai/result_cache.py
+import asyncio
+import hashlib
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from ..utils.log import get_logger
+from ..utils.text import clean_text
+
+logger = get_logger("result_cache")
+
+_DIGITS_RX = re.compile(r"\d+")
+
+def normalize_transcript(text: str) -> str:
+    """
+    캐시 키용 정규화: clean_text 적용 후 소문자화, 구두점/기호 제거, 숫자 마스킹, 공백 정리.
+    "검찰청 수사관입니다." 와 "검찰청  수사관 입니다" 가 최대한 같은 키가 되도록 한다.
+    """
+    s = clean_text(text or "").lower()
+    s = "".join(" " if unicodedata.category(c)[0] in "PS" else c for c in s)
+    s = _DIGITS_RX.sub("#", s)
+    return " ".join(s.split())
+
+class AnalysisCache:
+    """
+    위험도 분석 결과 LRU + TTL 캐시.
+    - 키: (모델명, 프롬프트 버전, 정규화된 전사 텍스트, 프롬프트 문맥)의 해시
+    - 메모리 항목 수가 max_entries를 넘으면 가장 오래 쓰지 않은 항목부터 제거
+    - sqlite_path를 주면 SQLite에도 기록해 재시작 후에도 유지.
+      디스크 기록은 전용 스레드가 모아서 하고(put은 기다리지 않음), 이벤트 루프에서는 aget()으로
+      메모리에 없을 때만 스레드에서 조회한다
+    """
+    _WRITE_BATCH = 256  # 기록 스레드가 한 번에 커밋하는 최대 항목 수
+
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "expired": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()  # SQLite 연결 (메모리 조회는 디스크 I/O를 기다리지 않음)
+        self._writes: "queue.SimpleQueue[Optional[Tuple[str, str, float]]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_loop, name="analysis-cache-writer", daemon=True)
+            self._writer.start()
+
+    @staticmethod
+    def make_key(text: str, model: str, prompt_version: str, context: str = "") -> Optional[str]:
+        """
+        정규화 결과가 비면 None (캐시하지 않음).
+        context: 프롬프트에 현재 발화와 함께 들어가는 문맥(최근 발화, 요약 등). 같은 발화라도
+        문맥이 다르면 판정이 달라질 수 있으므로 키에 포함한다 (문맥 없는 호출끼리만 결과를 공유)
+        """
+        norm = normalize_transcript(text)
+        if not norm:
+            return None
+        raw = f"{model}\x1f{prompt_version}\x1f{norm}"
+        if context:
+            raw += "\x1f" + hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if item[0] >= now:
+                    self._items.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return dict(item[1])
+                del self._items[key]
+                self._stats["expired"] += 1
+            if self._db is None:
+                self._stats["misses"] += 1
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            if self._db is None:
+                row = None
+            else:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM analysis_cache WHERE key = ? AND expires_at >= ?",
+                    (key, now),
+                ).fetchone()
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            return dict(value)
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """동기 조회 (메모리에 없으면 호출 스레드에서 SQLite 조회). 이벤트 루프에서는 aget()"""
+        if key is None:
+            return None
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None or self._db is None:
+            return value
+        return self._disk_get(key, now)
+
+    async def aget(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """이벤트 루프용 조회: 메모리 적중은 바로, 디스크 조회만 스레드에서"""
+        if key is None:
+            return None
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None or self._db is None:
+            return value
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    def put(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        """메모리에 바로 저장하고 디스크 기록은 기록 스레드에 맡긴다 (기다리지 않음)"""
+        if key is None:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        value = dict(value)
+        with self._lock:
+            self._remember(key, expires_at, value)
+        if self._writer is not None:
+            self._writes.put((key, json.dumps(value, ensure_ascii=False), expires_at))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._writes.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self._WRITE_BATCH:
+                    break
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    item = False
+                    break
+            if batch:
+                try:
+                    with self._db_lock:
+                        if self._db is not None:
+                            self._db.executemany(
+                                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                                batch,
+                            )
+                            self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning("분석 캐시 디스크 기록 실패: %s", e)
+            if item is None:
+                return
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._items),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        """남은 디스크 기록을 마치고 SQLite 연결을 닫는다"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(None)
+            writer.join(timeout=5.0)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# 프로세스 공용 캐시
+_shared_cache: Optional[AnalysisCache] = None
+_shared_lock = threading.Lock()
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """공용 분석 결과 캐시 (analysis_cache_size가 0이면 캐시 사용 안 함)"""
+    global _shared_cache
+    if settings.analysis_cache_size <= 0:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache(
+                max_entries=settings.analysis_cache_size,
+                ttl_seconds=settings.analysis_cache_ttl_seconds,
+                sqlite_path=settings.analysis_cache_path,
+            )
+        return _shared_cache
+
+def close_analysis_cache() -> None:
+    global _shared_cache
+    with _shared_lock:
+        cache, _shared_cache = _shared_cache, None
+    if cache is not None:
+        cache.close()
@@ -1,13 +1,31 @@
 # app/risk_analyzer_vertex.py
 import os
 import json
+import hashlib
 import re
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Protocol, Tuple
 
+import httpx
 # Google Gen AI SDK (Vertex 경유)
 from google import genai
 from google.genai import types
 
+from ..config import settings
+from ..utils.log import get_logger, trace
+from .result_cache import AnalysisCache, get_analysis_cache, normalize_transcript
+from .hedging import HedgedRetryPolicy
+from .context import clip_tokens, estimate_tokens
+from .risk_local import get_local_risk_classifier
+from .llm_scheduler import LLMDeadlineExceeded, LLMSchedulerError
+from .stream_json import IncrementalJSONParser, is_complete_json_object, parse_json_object
+
+logger = get_logger("risk_analyzer")
+
+# 스트리밍 중 최상위 필드가 완성될 때마다 지금까지의 필드로 호출되는 콜백
+PartialCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
 # 모델이 순수 JSON만 반환하도록 스키마와 MIME 타입 지정
 RESPONSE_SCHEMA = {
     "type": "OBJECT",
@@ -48,116 +66,306 @@ SYSTEM_PROMPT = """전화사기 위험도 분석기입니다.
   "actions": ["권고사항"]
 }"""
 
+# 시스템 프롬프트가 바뀌면 캐시 키도 자동으로 바뀌도록 내용 해시를 버전으로 사용
+PROMPT_VERSION = hashlib.sha1(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:8]
+_SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+# 마이크로 배칭용: 같은 기준으로 여러 발화를 한 번에 분석해 JSON 배열로 받는다
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT.split("반드시")[0] + """각 발화를 서로 독립적으로 분석하세요.
+반드시 입력 순서대로 다음 JSON 배열만 출력하세요. 다른 텍스트는 포함하지 마세요:
+[
+  {
+    "id": 발화번호,
+    "risk_score": 0-50,
+    "risk_level": "LOW|MID|HIGH",
+    "labels": ["위험신호"],
+    "evidence": ["문장조각"],
+    "reason": "판단근거",
+    "actions": ["권고사항"]
+  }
+]"""
+
+# 배치 응답 토큰 한도 (발화당 할당량, 상한)
+_BATCH_TOKENS_PER_ITEM = 384
+_BATCH_MAX_OUTPUT_TOKENS = 8192
+
 def _build_client() -> genai.Client:
     project = os.getenv("GCP_PROJECT_ID")
     location = os.getenv("GCP_LOCATION", "us-central1")
     if not project:
         raise RuntimeError("GCP_PROJECT_ID 환경변수를 설정하세요.")
+    # 모든 세션이 하나의 keep-alive 커넥션 풀을 공유 (요청마다 TLS 핸드셰이크 방지)
+    limits = httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_connections,
+    )
+    http_options = types.HttpOptions(
+        client_args={"limits": limits},
+        async_client_args={"limits": limits},
+    )
     # Vertex 경유
-    return genai.Client(vertexai=True, project=project, location=location)
+    return genai.Client(vertexai=True, project=project, location=location, http_options=http_options)
+
+class _Fallback(dict):
+    """실패/기본값 결과 표시용 dict (캐시에 저장하지 않음)"""
 
 def _default_result(reason: str) -> Dict[str, Any]:
-    return {
+    return _Fallback({
         "risk_score": 0,
         "risk_level": "LOW",
         "labels": ["의심 없음"],
         "evidence": [],
         "reason": reason[:300],
         "actions": ["의심 시 공식 채널로 직접 확인"],
-    }
+    })
 
-def _strip_code_fences(text: str) -> str:
-    """```json ... ``` 또는 ``` ... ```로 감싼 응답에서 순수 JSON만 추출"""
-    if not text:
-        return text
-    s = text.strip()
-    if s.startswith("```"):
-        # 맨 앞 펜스 제거
-        s = re.sub(r"^```(?:json)?\s*", "", s, count=1, flags=re.IGNORECASE)
-        # 맨 뒤 펜스 제거
-        s = re.sub(r"\s*```$", "", s, count=1)
-    # 여분 텍스트가 붙는 경우 마지막 '}'까지만 사용
-    last = s.rfind("}")
-    if last != -1:
-        s = s[: last + 1]
-    return s.strip()
+def _fallback_result(text: str, reason: str) -> Dict[str, Any]:
+    """Vertex 호출 실패(장애/쿼터) 시 대체 결과: 설정에 따라 로컬 분류기 판정, 아니면 기본값 (둘 다 캐시하지 않음)"""
+    if settings.risk_local_fallback:
+        try:
+            result = get_local_risk_classifier().classify(text)
+            result["reason"] = f"{result['reason']} (LLM 실패: {reason})"[:300]
+            return _Fallback(result)
+        except Exception as e:
+            logger.warning("로컬 분류기 대체 실패: %s", e)
+    return _default_result(reason)
 
 def _safe_load_json(text: str) -> Dict[str, Any]:
-    """가능하면 그대로, 안되면 펜스 제거 후, 그래도 안되면 기본값"""
-    print(f"[DEBUG] JSON 파싱 시도: {repr(text)}")
+    """가능하면 그대로, 안되면 선형 시간 복구 파서(코드펜스/앞뒤 잡텍스트 처리, 잘린 응답은 ValueError)"""
     if not text:
         raise ValueError("빈 응답")
 
     # 1) 일단 그대로
     try:
-        return json.loads(text)
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
     except Exception as e:
-        print(f"[DEBUG] 직접 JSON 파싱 실패: {e}")
+        trace(logger, "직접 JSON 파싱 실패, 복구 파서 사용", error=str(e), text=text)
 
-    # 2) 코드펜스 제거 + 끝 '}'까지
-    cleaned = _strip_code_fences(text)
-    print(f"[DEBUG] 펜스 제거 후 텍스트: {repr(cleaned)}")
-    try:
-        return json.loads(cleaned)
-    except Exception as e:
-        print(f"[DEBUG] 펜스 제거 후 파싱 실패: {e}")
+    # 2) 복구 파서: 읽을 수 있는 최상위 필드를 모두 꺼냄 (하나도 없으면 ValueError)
+    return parse_json_object(text)
 
-    # 3) 마지막 중괄호까지만 다시 한 번 시도(혹시 줄바꿈/공백 문제)
-    last = cleaned.rfind("}")
-    if last != -1:
-        try:
-            return json.loads(cleaned[: last + 1])
-        except Exception as e:
-            print(f"[DEBUG] 마지막 중괄호 기준 재시도 실패: {e}")
+def _load_json_array(text: str) -> List[Dict[str, Any]]:
+    """배치 응답 파싱: 펜스 제거 후 첫 '['부터 마지막 ']'까지"""
+    s = (text or "").strip()
+    if s.startswith("```"):
+        s = re.sub(r"^```(?:json)?\s*", "", s, count=1, flags=re.IGNORECASE)
+        s = re.sub(r"\s*```$", "", s, count=1)
+    first, last = s.find("["), s.rfind("]")
+    if first == -1 or last <= first:
+        raise ValueError("배치 응답에 JSON 배열이 없음")
+    data = json.loads(s[first : last + 1])
+    if not isinstance(data, list):
+        raise ValueError("배치 응답이 배열이 아님")
+    return [d for d in data if isinstance(d, dict)]
+
+def _normalize_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    """파싱된 응답을 스키마에 맞게 보정"""
+    score = int(max(0, min(50, int(data.get("risk_score", 0)))))
+    level = data.get("risk_level")
+    if level not in ["LOW", "MID", "HIGH"]:
+        level = "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW")
+    labels = [l for l in data.get("labels", []) if l in SCHEMA_LABELS] or ["의심 없음"]
+    evidence = data.get("evidence", [])[:3]
+    actions = data.get("actions", [])[:3]
+    reason = (data.get("reason", "") or "")[:300]
+
+    # 추가 검증: 점수가 0이 아닌데 라벨이 "의심 없음"이면 조정
+    if score > 0 and labels == ["의심 없음"]:
+        labels = ["위험 신호 감지"]
+    
+    # 추가 검증: 점수가 0인데 위험 라벨이 있으면 조정
+    if score == 0 and any(l != "의심 없음" for l in labels):
+        labels = ["의심 없음"]
 
-    # 4) 더 강력한 JSON 추출 시도
-    try:
-        # JSON 객체 패턴 찾기
-        import re
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        matches = re.findall(json_pattern, cleaned, re.DOTALL)
-        if matches:
-            for match in matches:
-                try:
-                    return json.loads(match)
-                except:
-                    continue
-    except Exception as e:
-        print(f"[DEBUG] 정규식 JSON 추출 실패: {e}")
+    return {
+        "risk_score": score,
+        "risk_level": level,
+        "labels": labels,
+        "evidence": evidence,
+        "reason": reason,
+        "actions": actions,
+    }
 
-    # 5) 부분적 JSON 복구 시도
-    try:
-        # 필수 필드만 있는 최소 JSON 생성
-        partial_json = "{}"
-        if '"risk_score"' in cleaned:
-            score_match = re.search(r'"risk_score"\s*:\s*(\d+)', cleaned)
-            if score_match:
-                score = score_match.group(1)
-                partial_json = f'{{"risk_score": {score}}}'
-        
-        if partial_json != "{}":
-            return json.loads(partial_json)
-    except Exception as e:
-        print(f"[DEBUG] 부분적 JSON 복구 실패: {e}")
+def _normalize_partial(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """스트리밍 중 완성된 필드만 _normalize_result와 같은 범위/허용값으로 보정 (보정할 수 없는 필드는 빼고 전달)"""
+    out: Dict[str, Any] = {}
+    if "risk_score" in fields:
+        try:
+            out["risk_score"] = int(max(0, min(50, int(fields["risk_score"]))))
+        except (TypeError, ValueError):
+            pass
+    level = fields.get("risk_level")
+    if level in ["LOW", "MID", "HIGH"]:
+        out["risk_level"] = level
+    elif level is not None and "risk_score" in out:
+        score = out["risk_score"]
+        out["risk_level"] = "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW")
+    if isinstance(fields.get("labels"), list):
+        labels = [l for l in fields["labels"] if l in SCHEMA_LABELS]
+        if labels:
+            out["labels"] = labels
+    for name in ("evidence", "actions"):
+        if isinstance(fields.get(name), list):
+            out[name] = fields[name][:3]
+    if isinstance(fields.get("reason"), str):
+        out["reason"] = fields["reason"][:300]
+    return out
+
+class _PartialRelay:
+    """
+    hedge/재시도 시도들의 부분 결과를 on_partial 하나로 전달.
+    처음 필드를 보낸 시도만 계속 전달하고, 그 시도가 실패하면(예외, 빈/잘린 응답) 다음 시도가 처음부터 다시 보낸다.
+    """
+    def __init__(self, on_partial: Optional[PartialCallback]):
+        self.on_partial = on_partial
+        self._owner: Optional[int] = None
+        self._attempts = 0
+        self._sent: Dict[str, Any] = {}
+
+    async def run(self, call: Callable[[Optional[PartialCallback]], Awaitable[str]]) -> str:
+        """call(relay)로 한 번 시도하고 응답 텍스트를 반환"""
+        if self.on_partial is None:
+            return await call(None)
+        self._attempts += 1
+        attempt = self._attempts
+
+        async def relay(fields: Dict[str, Any]) -> None:
+            if self._owner is None:
+                self._owner = attempt
+                self._sent = {}
+            if self._owner != attempt:
+                return
+            new = {k: v for k, v in _normalize_partial(fields).items() if k not in self._sent}
+            if not new:
+                return
+            self._sent.update(new)
+            try:
+                await self.on_partial(dict(self._sent))
+            except Exception as e:
+                logger.warning("부분 결과 전달 실패: %s", e)
 
-    raise ValueError("LLM JSON 파싱 실패")
+        complete = False
+        try:
+            text = await call(relay)
+            complete = is_complete_json_object(text)
+            return text
+        finally:
+            if not complete and self._owner == attempt:
+                self._owner = None
+
+class _UserPrompt(NamedTuple):
+    """_build_user_prompt 결과"""
+    text: str
+    context: str   # 캐시 키용: 예산 안에서 실제로 들어간 문맥을 정규화한 것 (문맥이 없으면 "")
+    tokens: int    # 시스템 프롬프트 제외 추정 토큰
+    trimmed: bool
+
+def _asr_bucket(asr_conf: Optional[float]) -> Optional[float]:
+    """ASR 신뢰도는 0.1 단위로만 프롬프트/캐시 키에 쓴다 (0.913과 0.917이 다른 키가 되지 않도록)"""
+    return None if asr_conf is None else round(asr_conf, 1)
+
+class RiskModel(Protocol):
+    """위험도 분석 백엔드 공통 계약 (VertexRiskAnalyzer, LocalRiskClassifier)"""
+    async def analyze_async(
+        self,
+        final_text: str,
+        recent_utts: List[str],
+        asr_conf: Optional[float] = None,
+        snippets: Optional[List[str]] = None,
+        summary: str = "",
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]: ...
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]: ...
 
 class VertexRiskAnalyzer:
     """기존 클래스명 유지(호출부 변경 없이 교체 가능)"""
-    def __init__(self, model_name: str = "gemini-2.5-flash"):
+    def __init__(
+        self,
+        model_name: str = "gemini-2.5-flash",
+        cache: Optional[AnalysisCache] = None,
+        retry_policy: Optional[HedgedRetryPolicy] = None,
+    ):
         self.client = _build_client()
         self.model_name = model_name
+        self.cache = cache if cache is not None else get_analysis_cache()
+        self.retry_policy = retry_policy or HedgedRetryPolicy.from_settings()
+        self._prompt_stats = {"prompts": 0, "tokens": 0, "max_tokens": 0, "trimmed": 0}
+
+    def _cache_key(self, final_text: str, context: str = "") -> Optional[str]:
+        """context: _UserPrompt.context (문맥이 다르면 판정도 다를 수 있으므로 키에 포함)"""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(final_text, self.model_name, PROMPT_VERSION, context)
+
+    def _cache_store(self, key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        if self.cache is not None and not isinstance(result, _Fallback):
+            self.cache.put(key, result)
+        return result
 
-    @staticmethod
     def _build_user_prompt(
+        self,
         final_text: str,
         recent_utts: List[str],
         asr_conf: Optional[float] = None,
         snippets: Optional[List[str]] = None,
+        summary: str = "",
+    ) -> _UserPrompt:
+        """
+        문맥 포함 사용자 프롬프트. 시스템 프롬프트까지 합친 추정 토큰이 settings.llm_max_prompt_tokens를
+        넘으면 이전 대화 요약 -> 오래된 최근 발화 순으로 빼고, 그래도 넘으면 현재 발화를 자른다.
+        context는 그렇게 줄인 뒤 실제로 들어간 문맥만 normalize_transcript로 정규화해 만든다
+        (구두점/띄어쓰기/숫자만 다른 같은 스크립트 문맥은 같은 캐시 키).
+        """
+        budget = settings.llm_max_prompt_tokens - _SYSTEM_PROMPT_TOKENS
+        asr_conf = _asr_bucket(asr_conf)
+        recent = list(recent_utts[-settings.llm_context_turns:]) if recent_utts and settings.llm_context_turns > 0 else []
+        prompt = self._render_user_prompt(final_text, recent, asr_conf, snippets, summary)
+        tokens = estimate_tokens(prompt)
+        trimmed = tokens > budget
+        if tokens > budget and summary:
+            summary = ""
+            prompt = self._render_user_prompt(final_text, recent, asr_conf, snippets, summary)
+            tokens = estimate_tokens(prompt)
+        while tokens > budget and recent:
+            recent.pop(0)
+            prompt = self._render_user_prompt(final_text, recent, asr_conf, snippets, summary)
+            tokens = estimate_tokens(prompt)
+        if tokens > budget:
+            final_text = clip_tokens(final_text, max(16, estimate_tokens(final_text) - (tokens - budget)))
+            prompt = self._render_user_prompt(final_text, recent, asr_conf, snippets, summary)
+            tokens = estimate_tokens(prompt)
+        context = ""
+        if recent or summary or snippets or asr_conf is not None:
+            context = "\x1e".join([
+                *map(normalize_transcript, recent), "\x1d", normalize_transcript(summary),
+                "\x1d", *map(normalize_transcript, snippets or []), "\x1d", str(asr_conf),
+            ])
+        return _UserPrompt(prompt, context, tokens, trimmed)
+
+    def _count_prompt(self, prompt: _UserPrompt) -> None:
+        """실제로 보낸 프롬프트만 집계 (캐시 적중은 제외)"""
+        stats = self._prompt_stats
+        stats["prompts"] += 1
+        stats["tokens"] += prompt.tokens + _SYSTEM_PROMPT_TOKENS
+        stats["max_tokens"] = max(stats["max_tokens"], prompt.tokens + _SYSTEM_PROMPT_TOKENS)
+        stats["trimmed"] += prompt.trimmed
+
+    @staticmethod
+    def _render_user_prompt(
+        final_text: str,
+        recent: List[str],
+        asr_conf: Optional[float],
+        snippets: Optional[List[str]],
+        summary: str,
     ) -> str:
-        ctx = "\n".join([f"- {u}" for u in recent_utts[-5:]]) if recent_utts else "(없음)"
+        ctx = "\n".join([f"- {u}" for u in recent]) if recent else "(없음)"
         snips = "\n".join([f"{i+1}) {s}" for i, s in enumerate(snippets or [])]) or "(없음)"
-        return f"""[최근 문맥(최대 5문장)]
+        return f"""[이전 대화 요약]
+{summary or "(없음)"}
+
+[최근 문맥(최대 {settings.llm_context_turns}문장)]
 {ctx}
 
 [의심 스니펫]
@@ -170,112 +378,277 @@ class VertexRiskAnalyzer:
 - asr_confidence: {asr_conf if asr_conf is not None else "unknown"}
 """
 
+    def _generate_config(self) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT,
+            temperature=0.0,
+            max_output_tokens=1024,  # 512에서 1024로 증가
+            # response_mime_type="application/json",  # 구조화된 출력 제거
+            # response_schema=RESPONSE_SCHEMA,  # 구조화된 출력 제거
+        )
+
     def _call_genai_once(self, user_prompt: str) -> str:
         """한 번 호출하고 text를 반환(없으면 '')"""
-        print(f"[DEBUG] Google GenAI 호출 시작...")
-        print(f"[DEBUG] 프로젝트 ID: {os.getenv('GCP_PROJECT_ID')}")
-        print(f"[DEBUG] 위치: {os.getenv('GCP_LOCATION', 'us-central1')}")
-
         resp = self.client.models.generate_content(
             model=self.model_name,
             contents=user_prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                temperature=0.0,
-                max_output_tokens=1024,  # 512에서 1024로 증가
-                # response_mime_type="application/json",  # 구조화된 출력 제거
-                # response_schema=RESPONSE_SCHEMA,  # 구조화된 출력 제거
-            ),
+            config=self._generate_config(),
         )
         response_text = (getattr(resp, "text", "") or "").strip()
-        print(f"[DEBUG] GenAI 원본 응답: {repr(response_text)}")
-        print(f"[DEBUG] 응답 길이: {len(response_text)}")
+        trace(logger, "GenAI 응답", prompt=user_prompt, response=response_text)
         return response_text
 
+    async def _acall_genai_once(
+        self,
+        user_prompt: str,
+        on_partial: Optional[PartialCallback] = None,
+        started: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """
+        비동기 클라이언트로 한 번 스트리밍 호출하고 전체 text를 반환 (타임아웃은 retry_policy가 적용).
+        응답 조각을 증분 파싱해 최상위 필드가 완성될 때마다 on_partial을 호출하고,
+        첫 조각이 오면 started()로 retry_policy에 알린다 (이후 hedge 안 함).
+        """
+        parser = IncrementalJSONParser()
+        pieces: List[str] = []
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=user_prompt,
+            config=self._generate_config(),
+        )
+        async for chunk in stream:
+            piece = getattr(chunk, "text", "") or ""
+            if not piece:
+                continue
+            if not pieces and started is not None:
+                started()
+            pieces.append(piece)
+            if parser.feed(piece) and on_partial is not None:
+                await on_partial(dict(parser.fields))
+        response_text = "".join(pieces).strip()
+        trace(logger, "GenAI 스트리밍 응답", prompt=user_prompt, response=response_text, chunks=len(pieces))
+        return response_text
+
+    def prompt_stats(self) -> Dict[str, Any]:
+        """프롬프트 추정 토큰(시스템 프롬프트 포함): 평균, 최댓값, 예산 초과로 줄인 횟수"""
+        stats = dict(self._prompt_stats)
+        stats["avg_tokens"] = round(stats.pop("tokens") / stats["prompts"], 1) if stats["prompts"] else 0.0
+        stats["budget"] = settings.llm_max_prompt_tokens
+        return stats
+
+    @staticmethod
+    def _retry_prompts(final_text: str, user_prompt: str) -> List[Tuple[str, str]]:
+        """(단계명, 프롬프트) 목록: 응답이 비면 점점 단순한 프롬프트로 재시도"""
+        final_text = clip_tokens(final_text, settings.llm_max_prompt_tokens // 2)
+        return [
+            ("1차 호출", user_prompt),
+            # 비거나 이상하면 2차 재시도(더 간단한 프롬프트)
+            ("2차 재시도", f'분석: "{final_text}"\n\nJSON만 출력:\n{{"risk_score":0,"risk_level":"LOW","labels":["의심 없음"],"evidence":[],"reason":"","actions":[]}}'),
+            # 여전히 비면 3차 재시도(최소한의 프롬프트)
+            ("3차 재시도", f'"{final_text}" -> JSON: {{"risk_score":0,"risk_level":"LOW","labels":["의심 없음"],"evidence":[],"reason":"","actions":[]}}'),
+        ]
+
     def analyze(
         self,
         final_text: str,
         recent_utts: List[str],
         asr_conf: Optional[float] = None,
         snippets: Optional[List[str]] = None,
+        summary: str = "",
     ) -> Dict[str, Any]:
-        user_prompt = self._build_user_prompt(final_text, recent_utts, asr_conf, snippets)
+        """
+        동기 분석. 이벤트 루프 안에서는 analyze_async를 사용할 것.
+        hedge 없이 순차 재시도하되, 마감 시간이 지나면 더 시도하지 않고 LLMDeadlineExceeded.
+        """
+        prompt_info = self._build_user_prompt(final_text, recent_utts, asr_conf, snippets, summary)
+        key = self._cache_key(final_text, prompt_info.context)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        self._count_prompt(prompt_info)
+        user_prompt = prompt_info.text
+
+        deadline = time.monotonic() + self.retry_policy.deadline_seconds
+        response_text = ""
+        for n, (stage, prompt) in enumerate(self._retry_prompts(final_text, user_prompt)):
+            if is_complete_json_object(response_text):
+                break
+            if n > 0 and time.monotonic() >= deadline:
+                raise LLMDeadlineExceeded(f"LLM 판정 마감 시간 초과 ({self.retry_policy.deadline_seconds}s)")
+            if n > 0:
+                logger.debug("응답이 비었거나 잘려 %s", stage)
+            try:
+                response_text = self._call_genai_once(prompt)
+            except Exception as e:
+                logger.exception("LLM %s 예외: %s", stage, e)
+                return _fallback_result(final_text, f"LLM {stage} 실패: {type(e).__name__}: {e}")
+
+        return self._cache_store(key, self._finalize(final_text, response_text))
+
+    async def analyze_async(
+        self,
+        final_text: str,
+        recent_utts: List[str],
+        asr_conf: Optional[float] = None,
+        snippets: Optional[List[str]] = None,
+        summary: str = "",
+        on_partial: Optional[PartialCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        비동기 분석. Vertex 응답을 기다리는 동안 다른 소켓의 오디오 수신이 멈추지 않는다.
+        retry_policy가 지연 예산 안에서 hedge/재시도/백오프를 처리하고,
+        마감 시간(settings.llm_deadline_seconds)을 넘기면 LLMDeadlineExceeded (호출부는 룰 점수 사용).
+        태스크가 취소되면(소켓 종료) 진행 중인 요청도 함께 취소된다.
+        같은 스크립트(정규화 후 동일 텍스트, 같은 문맥)는 캐시된 결과를 바로 반환한다.
+        on_partial을 주면 응답을 스트리밍하며 risk_score/risk_level 등 먼저 완성된 필드를
+        전체 응답 전에 전달한다 (_normalize_partial로 보정, 한 시도의 값만 - _PartialRelay).
+        응답이 중간에 잘리면 실패한 시도로 보고 재시도하고, 끝내 잘리면 대체 결과(캐시하지 않음).
+        summary: SessionContext가 접어 둔 이전 대화 요약 (프롬프트 토큰 예산 안에서만 포함)
+        """
+        prompt_info = self._build_user_prompt(final_text, recent_utts, asr_conf, snippets, summary)
+        key = self._cache_key(final_text, prompt_info.context)
+        cached = await self.cache.aget(key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        self._count_prompt(prompt_info)
+        user_prompt = prompt_info.text
+        prompts = self._retry_prompts(final_text, user_prompt)
+        partials = _PartialRelay(on_partial)
 
-        # 1차 호출
         try:
-            response_text = self._call_genai_once(user_prompt)
+            # stage: 빈/잘린 응답이면 점점 단순한 프롬프트 사용 (hedge는 같은 프롬프트)
+            response_text = await self.retry_policy.run(
+                lambda stage, started: partials.run(
+                    lambda relay: self._acall_genai_once(prompts[min(stage, len(prompts) - 1)][1], relay, started)
+                ),
+                accept=is_complete_json_object,
+            )
+        except LLMSchedulerError:
+            raise
         except Exception as e:
-            import traceback
-            print(f"[ERROR] 1차 호출 예외: {e}")
-            print(traceback.format_exc())
-            return _default_result(f"LLM 1차 호출 실패: {type(e).__name__}: {e}")
+            logger.exception("LLM 호출 예외: %s", e)
+            return _fallback_result(final_text, f"LLM 호출 실패: {type(e).__name__}: {e}")
 
-        # 비거나 이상하면 2차 재시도(더 간단한 프롬프트)
-        if not response_text or len(response_text) < 10:
-            try:
-                print("[DEBUG] 응답이 비어 2차 재시도합니다...")
-                retry_prompt = f'분석: "{final_text}"\n\nJSON만 출력:\n{{"risk_score":0,"risk_level":"LOW","labels":["의심 없음"],"evidence":[],"reason":"","actions":[]}}'
-                response_text = self._call_genai_once(retry_prompt)
-            except Exception as e:
-                import traceback
-                print(f"[ERROR] 2차 재시도 호출 예외: {e}")
-                print(traceback.format_exc())
-                return _default_result(f"LLM 2차 재시도 실패: {type(e).__name__}: {e}")
-
-        # 여전히 비면 3차 재시도(최소한의 프롬프트)
-        if not response_text or len(response_text) < 10:
-            try:
-                print("[DEBUG] 응답이 비어 3차 재시도합니다...")
-                retry_prompt = f'"{final_text}" -> JSON: {{"risk_score":0,"risk_level":"LOW","labels":["의심 없음"],"evidence":[],"reason":"","actions":[]}}'
-                response_text = self._call_genai_once(retry_prompt)
-            except Exception as e:
-                import traceback
-                print(f"[ERROR] 3차 재시도 호출 예외: {e}")
-                print(traceback.format_exc())
-                return _default_result(f"LLM 3차 재시도 실패: {type(e).__name__}: {e}")
+        return self._cache_store(key, self._finalize(final_text, response_text))
 
+    @staticmethod
+    def _finalize(final_text: str, response_text: str) -> Dict[str, Any]:
+        """응답 텍스트를 파싱해 스키마에 맞게 보정 (비었거나 잘린 응답은 캐시하지 않는 대체 결과)"""
         # 여전히 비면 기본값
         if not response_text or len(response_text) < 10:
             return _default_result("LLM 응답이 비어 기본값 사용")
+        if not is_complete_json_object(response_text):
+            logger.warning("LLM 응답이 중간에 잘려 대체 결과 사용 (%d자)", len(response_text))
+            trace(logger, "잘린 응답", response=response_text)
+            return _fallback_result(final_text, "LLM 응답이 중간에 잘림")
 
         # JSON 파싱
         try:
             data = _safe_load_json(response_text)
-            print(f"[DEBUG] JSON 파싱 성공: {data}")
         except Exception as e:
-            import traceback
-            print(f"[ERROR] JSON 파싱 실패: {e}")
-            print(traceback.format_exc())
+            logger.error("LLM JSON 파싱 실패: %s", e)
+            trace(logger, "파싱 실패 응답", response=response_text)
             return _default_result(f"LLM JSON 파싱 실패: {type(e).__name__}: {e}")
 
         # 후처리(스키마 보정)
-        score = int(max(0, min(50, int(data.get("risk_score", 0)))))
-        level = data.get("risk_level")
-        if level not in ["LOW", "MID", "HIGH"]:
-            level = "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW")
-        labels = [l for l in data.get("labels", []) if l in SCHEMA_LABELS] or ["의심 없음"]
-        evidence = data.get("evidence", [])[:3]
-        actions = data.get("actions", [])[:3]
-        reason = (data.get("reason", "") or "")[:300]
-
-        # 추가 검증: 점수가 0이 아닌데 라벨이 "의심 없음"이면 조정
-        if score > 0 and labels == ["의심 없음"]:
-            labels = ["위험 신호 감지"]
-        
-        # 추가 검증: 점수가 0인데 위험 라벨이 있으면 조정
-        if score == 0 and any(l != "의심 없음" for l in labels):
-            labels = ["의심 없음"]
-
-        # 디버깅
-        print(f"[DEBUG] LLM 원본 데이터: {data}")
-        print(f"[DEBUG] 계산된 점수: {score}")
-        print(f"[DEBUG] 최종 라벨: {labels}")
-
-        return {
-            "risk_score": score,
-            "risk_level": level,
-            "labels": labels,
-            "evidence": evidence,
-            "reason": reason,
-            "actions": actions,
-        }
+        result = _normalize_result(data)
+        trace(logger, "LLM 판정", data=data, risk_score=result["risk_score"], labels=result["labels"])
+        return result
+
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        여러 최종 발화를 한 번의 호출로 분석 (RiskBatcher용, 결과는 입력 순서대로).
+        캐시에 있는 발화는 빼고 나머지만 묶어 보낸다. 배치에서는 이전 발화 문맥을 쓰지 않는다.
+        응답에서 빠진 항목은 기본값으로 채운다.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        keys = [self._cache_key(t) for t in texts]
+        todo: List[int] = []
+        for i, key in enumerate(keys):
+            cached = await self.cache.aget(key) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                todo.append(i)
+        if not todo:
+            return results
+
+        prompt = "\n".join(f'{n + 1}) "{texts[i]}"' for n, i in enumerate(todo))
+        config = types.GenerateContentConfig(
+            system_instruction=BATCH_SYSTEM_PROMPT,
+            temperature=0.0,
+            max_output_tokens=min(_BATCH_MAX_OUTPUT_TOKENS, _BATCH_TOKENS_PER_ITEM * len(todo)),
+        )
+
+        async def call(stage: int, started: Callable[[], None]) -> str:
+            resp = await self.client.aio.models.generate_content(model=self.model_name, contents=prompt, config=config)
+            return getattr(resp, "text", "") or ""
+
+        try:
+            items = _load_json_array(await self.retry_policy.run(call, accept=lambda text: "[" in text))
+        except LLMSchedulerError:
+            raise
+        except Exception as e:
+            logger.error("배치 호출 실패: %s", e)
+            return [r if r is not None else _fallback_result(texts[i], f"LLM 배치 호출 실패: {type(e).__name__}: {e}")
+                    for i, r in enumerate(results)]
+
+        # id가 있으면 id로, 없으면 위치로 매칭
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for pos, item in enumerate(items):
+            try:
+                by_id[int(item.get("id", pos + 1))] = item
+            except (TypeError, ValueError):
+                by_id[pos + 1] = item
+        for n, i in enumerate(todo):
+            item = by_id.get(n + 1)
+            if item is None:
+                results[i] = _default_result("LLM 배치 응답에 항목 누락")
+                continue
+            try:
+                results[i] = self._cache_store(keys[i], _normalize_result(item))
+            except (TypeError, ValueError) as e:
+                results[i] = _default_result(f"LLM 배치 항목 보정 실패: {type(e).__name__}: {e}")
+        return results
+
+# 프로세스 공용 분석기: 앱 시작 시 한 번 만들고 모든 세션이 공유
+_shared_analyzer: Optional[RiskModel] = None
+_shared_lock = threading.Lock()
+
+def init_risk_analyzer() -> RiskModel:
+    """
+    공용 분석기를 생성(이미 있으면 재사용). settings.risk_backend에 따라
+    "vertex"(자격증명이 없으면 예외) | "local"(프로세스 내 분류기)
+    """
+    global _shared_analyzer
+    with _shared_lock:
+        if _shared_analyzer is None:
+            if settings.risk_backend == "local":
+                _shared_analyzer = get_local_risk_classifier()
+            elif settings.risk_backend == "vertex":
+                _shared_analyzer = VertexRiskAnalyzer()
+            else:
+                raise ValueError(f"알 수 없는 위험도 분석 백엔드: {settings.risk_backend} (가능: vertex, local)")
+        return _shared_analyzer
+
+def get_risk_analyzer() -> Optional[RiskModel]:
+    """FastAPI 의존성. 시작 시 생성에 실패했으면 여기서 다시 시도하고, 그래도 안되면 None"""
+    if _shared_analyzer is not None:
+        return _shared_analyzer
+    try:
+        return init_risk_analyzer()
+    except Exception as e:
+        logger.warning("위험도 분석기 생성 실패: %s", e)
+        return None
+
+async def close_risk_analyzer() -> None:
+    """앱 종료 시 커넥션 풀 정리 (분석 경로가 모두 client.aio를 쓰므로 비동기 클라이언트도 닫는다)"""
+    global _shared_analyzer
+    with _shared_lock:
+        analyzer, _shared_analyzer = _shared_analyzer, None
+    if isinstance(analyzer, VertexRiskAnalyzer):
+        try:
+            await analyzer.client.aio.aclose()
+            analyzer.client.close()  # aclose()는 동기 클라이언트를 닫지 않음
+        except Exception as e:
+            logger.warning("위험도 분석기 종료 실패: %s", e)
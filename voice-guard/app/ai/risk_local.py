@@ -0,0 +1,209 @@
+# app/ai/risk_local.py
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .result_cache import normalize_transcript
+
+DEFAULT_TRAIN_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "risk_train.json")
+
+# SYSTEM_PROMPT의 위험 신호 점수와 같은 기준 (라벨 합산, 상한 50)
+LABEL_WEIGHTS = {
+    "협박/압박": 15,
+    "금전요구": 12,
+    "정부기관사칭": 10,
+    "개인정보요구": 8,
+    "원격제어유도": 8,
+    "링크/앱설치": 5,
+}
+LABEL_ACTIONS = {
+    "협박/압박": "통화를 끊고 가족/지인에게 상황 공유",
+    "금전요구": "송금/이체 절대 금지",
+    "정부기관사칭": "기관 대표번호로 직접 확인",
+    "개인정보요구": "개인정보/인증번호 제공 금지",
+    "원격제어유도": "원격제어 앱 실행 금지",
+    "링크/앱설치": "문자 링크 클릭/앱 설치 금지",
+}
+
+_DIM = 1 << 16       # 해시 특징 공간 크기
+_NGRAMS = (1, 2, 3)  # 문자 n-gram (단어 경계는 공백 한 칸으로 유지)
+
+def _features(text: str) -> Dict[int, float]:
+    """정규화된 텍스트 -> {해시 인덱스: 값} (문자 n-gram 출현 여부, L2 정규화)"""
+    s = f" {normalize_transcript(text)} "
+    idx = {
+        zlib.crc32(s[i:i + n].encode("utf-8")) % _DIM
+        for n in _NGRAMS for i in range(len(s) - n + 1)
+        if s[i:i + n].strip()
+    }
+    if not idx:
+        return {}
+    value = 1.0 / np.sqrt(len(idx))
+    return {i: value for i in idx}
+
+class LocalRiskClassifier:
+    """
+    Vertex 없이 프로세스 안에서 도는 위험도 분류기 (1차 판정, Vertex 장애 시 대체, 오프라인 부하 시험용).
+    - 문자 n-gram 해시 특징 + 라벨별 로지스틱 회귀 (one-vs-rest, 여러 라벨 동시 가능)
+    - 시작 시 학습 파일(fixtures/risk_train.json)로 한 번 학습 (수십 ms), 판정은 발화당 수십~수백 us
+    - 결과는 LLM과 같은 {risk_score, risk_level, labels, evidence, reason, actions} 형식.
+      점수는 확률이 threshold 이상인 라벨의 LABEL_WEIGHTS 합 (SYSTEM_PROMPT 기준)
+    """
+    def __init__(self, labels: List[str], threshold: float = 0.5):
+        unknown = [label for label in labels if label not in LABEL_WEIGHTS]
+        if unknown:
+            raise ValueError(f"알 수 없는 위험 라벨: {unknown}")
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.weights = np.zeros((_DIM, len(labels)), dtype=np.float32)
+        self.bias = np.zeros(len(labels), dtype=np.float32)
+        self._stats = {"calls": 0, "seconds": 0.0, "flagged": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "LocalRiskClassifier":
+        path = settings.risk_local_train_path or DEFAULT_TRAIN_PATH
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        model = cls(data["labels"], threshold=settings.risk_local_threshold)
+        model.fit([s["text"] for s in data["samples"]], [s["labels"] for s in data["samples"]])
+        return model
+
+    def fit(self, texts: List[str], labels: List[List[str]], epochs: int = 500, lr: float = 4.0, l2: float = 1e-4) -> None:
+        """
+        전체 배치 경사하강. 학습 데이터에 나온 특징만 모아 작은 밀집 행렬로 학습한 뒤 해시 공간에 펼친다.
+        라벨마다 양성 예시가 적으므로 양성/음성 비율로 가중해 균형을 맞춘다.
+        """
+        if not texts:
+            raise ValueError("학습 데이터가 비어 있습니다")
+        feats = [_features(t) for t in texts]
+        used = np.asarray(sorted({i for f in feats for i in f}), dtype=np.int64)
+        col = {int(i): k for k, i in enumerate(used)}
+        x = np.zeros((len(texts), len(used)), dtype=np.float32)
+        for r, f in enumerate(feats):
+            for i, v in f.items():
+                x[r, col[i]] = v
+        y = np.asarray([[label in ls for label in self.labels] for ls in labels], dtype=np.float32)
+        pos = y.sum(axis=0)
+        if not pos.all():
+            missing = [label for label, n in zip(self.labels, pos) if not n]
+            raise ValueError(f"학습 예시가 없는 라벨: {missing}")
+        sample_w = np.where(y > 0, (len(texts) - pos) / pos, 1.0).astype(np.float32)
+        sample_w /= sample_w.mean(axis=0)
+        w = np.zeros((len(used), len(self.labels)), dtype=np.float32)
+        b = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            err = (1.0 / (1.0 + np.exp(-(x @ w + b))) - y) * sample_w
+            w -= lr * (x.T @ err / len(texts) + l2 * w)
+            b -= lr * err.mean(axis=0)
+        self.weights = np.zeros((_DIM, len(self.labels)), dtype=np.float32)
+        self.weights[used] = w
+        self.bias = b
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        feats = _features(text)
+        if not feats:
+            return {label: 0.0 for label in self.labels}
+        idx = np.fromiter(feats.keys(), dtype=np.int64, count=len(feats))
+        z = self.weights[idx].sum(axis=0) * next(iter(feats.values())) + self.bias
+        p = 1.0 / (1.0 + np.exp(-z))
+        return {label: float(p[k]) for k, label in enumerate(self.labels)}
+
+    def _evidence(self, text: str, labels: List[str]) -> List[str]:
+        """라벨별로 가중치 기여가 가장 큰 어절 (최대 3개)"""
+        words = text.split()
+        if not words:
+            return []
+        cols = [self.labels.index(label) for label in labels]
+        scores: List[Tuple[float, str]] = []
+        for word in words:
+            feats = _features(word)
+            if feats:
+                idx = np.fromiter(feats.keys(), dtype=np.int64, count=len(feats))
+                scores.append((float(self.weights[idx][:, cols].sum()), word))
+        picked: List[str] = []
+        for score, word in sorted(scores, reverse=True):
+            if score <= 0 or len(picked) >= 3:
+                break
+            if word not in picked:
+                picked.append(word)
+        return picked
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """발화 하나 판정 (동기, CPU만 사용)"""
+        return self.predict(text)[0]
+
+    def predict(self, text: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """(판정 결과, 라벨별 확률) - RiskCascade가 확률로 불확실 구간을 가른다"""
+        started = time.perf_counter()
+        proba = {label: 0.0 for label in self.labels}
+        if not text or not text.strip():
+            result = {
+                "risk_score": 0, "risk_level": "LOW", "labels": ["의심 없음"], "evidence": [],
+                "reason": "빈 텍스트", "actions": ["의심 시 공식 채널로 직접 확인"],
+            }
+        else:
+            proba = self.predict_proba(text)
+            hits = sorted((l for l, p in proba.items() if p >= self.threshold), key=lambda l: -proba[l])
+            score = min(50, sum(LABEL_WEIGHTS[l] for l in hits))
+            result = {
+                "risk_score": score,
+                "risk_level": "HIGH" if score >= 30 else ("MID" if score >= 15 else "LOW"),
+                "labels": hits or ["의심 없음"],
+                "evidence": self._evidence(text, hits) if hits else [],
+                "reason": "로컬 분류기: " + (
+                    ", ".join(f"{l} {proba[l]:.2f}" for l in hits) if hits else "위험 신호 없음"
+                ),
+                "actions": [LABEL_ACTIONS[l] for l in hits][:3] or ["의심 시 공식 채널로 직접 확인"],
+            }
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["seconds"] += time.perf_counter() - started
+            self._stats["flagged"] += result["risk_score"] > 0
+        return result, proba
+
+    async def analyze_risk(self, text: str, on_partial=None) -> Dict[str, Any]:
+        """VertexRiskAnalyzer.analyze_risk와 같은 호출 방식 (부분 결과 없이 바로 완성된 결과)"""
+        return self.classify(text)
+
+    async def analyze_async(
+        self,
+        final_text: str,
+        recent_utts: Optional[List[str]] = None,
+        asr_conf: Optional[float] = None,
+        snippets: Optional[List[str]] = None,
+        summary: str = "",
+        on_partial=None,
+    ) -> Dict[str, Any]:
+        """VertexRiskAnalyzer.analyze_async와 같은 호출 방식 (문맥 인자는 사용하지 않음)"""
+        return self.classify(final_text)
+
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        return [self.classify(t) for t in texts]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                "calls": calls,
+                "flagged": self._stats["flagged"],
+                "avg_us": round(self._stats["seconds"] / calls * 1e6, 1) if calls else 0.0,
+                "threshold": self.threshold,
+            }
+
+# 프로세스 공용 분류기 (처음 쓸 때 한 번 학습)
+_shared_classifier: Optional[LocalRiskClassifier] = None
+_shared_lock = threading.Lock()
+
+def get_local_risk_classifier() -> LocalRiskClassifier:
+    global _shared_classifier
+    with _shared_lock:
+        if _shared_classifier is None:
+            _shared_classifier = LocalRiskClassifier.from_settings()
+        return _shared_classifier
@@ -1,40 +1,293 @@
 # app/rule_filter.py
 import re
-from typing import List
+from array import array
+from collections import deque
+from typing import Dict, List, NamedTuple, Tuple
 
 _PATTERNS = [
     # 개인정보/계정정보 요구
     (r"(주민등록번호|주민번호|계좌번호|비밀번호|OTP|공인인증|보안카드|일회용\s*번호|인증번호)", "PII/계정정보요구"),
-    
+
     # 금전/자산 이체 요구
     (r"(해외송금|송금요청|입금요청|가상화폐|코인|비트코인|송금|이체|입금|출금|보내|받아|돈|현금|수수료)", "금전/자산이체요구"),
     (r"(\d{1,3}(,\d{3})+|[0-9]+)\s*(원|만원|억|KRW|달러|USD)", "금전/자산이체요구"),
-    
+
     # 정부기관/권위기관 사칭
     (r"(검찰|경찰|지검|금감원|법원|국세청|세무서|수사|압수수색|계좌동결|범죄|처벌|벌금|벌칙)", "권위기관사칭/압박"),
-    
+
     # 협박/압박/위협
     (r"(납치|살해|죽여|죽어|협박|위협|압박|강요|강제|즉시|긴급|지금\s*바로|당장|빨리|서둘러)", "협박/압박/위협"),
-    
+
     # 링크/앱 설치 유도
     (r"(링크|URL|주소|앱설치|다운로드|설치|다운|클릭|접속|이동)", "링크/앱설치유도"),
-    
+
     # 원격제어 유도
     (r"(원격제어|리모트|팀뷰어|애니데스크|화면\s*공유|제어|접속\s*허용)", "원격제어유도"),
 ]
 
+# 금액 패턴은 키워드 목록이 아니므로 오토마톤 대신 정규식 그대로 사용
+_AMOUNT_INDEX = 2
+
 _COMPILED = [(re.compile(p, re.IGNORECASE), label) for p, label in _PATTERNS]
+_AMOUNT_RX = _COMPILED[_AMOUNT_INDEX][0]
+
+_GAP = r"\s*"
+
+# 오토마톤 입력 심볼: 0 = 키워드에 없는 문자, 1 = 공백, 2~ = 키워드 문자(대소문자 통합)
+_SYM_OTHER = "\x00"
+_SYM_SPACE = "\x01"
+
+class RuleMatch(NamedTuple):
+    """룰 매칭 결과 (end는 exclusive)"""
+    label: str
+    keyword: str
+    start: int
+    end: int
+    pattern_index: int
+
+def _keywords(pattern: str) -> List[str]:
+    """'(A|B|C\\s*D)' 형태의 패턴을 키워드 목록으로 분해"""
+    return pattern[1:-1].split("|")
+
+class _SymbolTable(dict):
+    """str.translate용 문자 -> 심볼 매핑. 처음 보는 문자는 공백/기타로 분류해 캐시"""
+    def __missing__(self, code: int) -> str:
+        sym = _SYM_SPACE if chr(code).isspace() else _SYM_OTHER
+        self[code] = sym
+        return sym
+
+class KeywordAutomaton:
+    """
+    _PATTERNS 키워드로 한 번만 만드는 Aho-Corasick 오토마톤.
+    실패 링크를 미리 펼친 전이 테이블(DFA)이라 텍스트를 문자당 한 번의 테이블 조회로 훑는다.
+    - IGNORECASE: 영문 대/소문자를 같은 심볼로 매핑
+    - 키워드 안의 '\\s*': 공백을 소비하며 대기하는 보조 상태를 따로 둔다
+    - 상태(int)만 저장해 두면 이어서 스캔할 수 있다(증분 스캔용)
+    """
+    def __init__(self, patterns: List[Tuple[str, str]], skip: Tuple[int, ...] = ()):
+        self._labels = [label for _, label in patterns]
+        self._symbols = _SymbolTable()
+        self._n_sym = 2
+        goto: List[Dict[int, int]] = [{}]
+        gap: List[bool] = [False]
+        # state -> [(pattern_index, keyword, 공백 제외 문자 수, 공백 허용 여부)]
+        out: List[List[Tuple[int, str, int, bool]]] = [[]]
+
+        for idx, (pattern, _label) in enumerate(patterns):
+            if idx in skip:
+                continue
+            for kw in _keywords(pattern):
+                state = 0
+                parts = kw.split(_GAP)
+                for n, part in enumerate(parts):
+                    if n > 0:
+                        gap[state] = True
+                    for ch in part:
+                        sym = self._symbol(ch)
+                        nxt = goto[state].get(sym)
+                        if nxt is None:
+                            goto.append({})
+                            gap.append(False)
+                            out.append([])
+                            nxt = goto[state][sym] = len(goto) - 1
+                        state = nxt
+                out[state].append((idx, kw.replace(_GAP, " "), sum(map(len, parts)), len(parts) > 1))
+
+        self._table, self._out = self._build(goto, gap, out, self._n_sym)
+
+    def _symbol(self, ch: str) -> int:
+        key = ord(ch.lower())
+        if key not in self._symbols:
+            if self._n_sym > 0xFF:
+                raise ValueError("키워드 문자 종류가 너무 많습니다 (최대 254)")
+            self._symbols[key] = chr(self._n_sym)
+            self._n_sym += 1
+        self._symbols[ord(ch)] = self._symbols[ord(ch.upper())] = self._symbols[key]
+        return ord(self._symbols[key])
+
+    @staticmethod
+    def _build(goto, gap, out, n_sym):
+        """실패 링크를 계산해 (전이 테이블, 상태별 출력)으로 펼친다"""
+        fail = [0] * len(goto)
+        delta: List[Dict[int, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        # 자신 또는 실패 링크 중 가장 깊은 '\\s*' 위치 노드 (없으면 -1)
+        gap_node = [0 if gap[0] else -1] + [-1] * (len(goto) - 1)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            f = fail[state]
+            out[state] = out[state] + [o for o in out[f] if o not in out[state]]
+            delta[state] = {**delta[f], **goto[state]}
+            gap_node[state] = state if gap[state] else gap_node[f]
+            for sym, nxt in goto[state].items():
+                fail[nxt] = delta[f].get(sym, 0)
+                queue.append(nxt)
+
+        # 공백 대기 상태: 공백이면 제자리, 아니면 원래 노드의 goto 또는 루트에서 다시 시작
+        waits = {g: len(goto) + i for i, g in enumerate(sorted({g for g in gap_node if g >= 0}))}
+        table = []
+        for state in range(len(goto)):
+            row = [0] * n_sym
+            row[1] = waits[gap_node[state]] if gap_node[state] >= 0 else 0
+            for sym, nxt in delta[state].items():
+                row[sym] = nxt
+            table.append(row)
+        for g in waits:
+            row = [0] * n_sym
+            row[1] = waits[g]
+            for sym, nxt in {**delta[0], **goto[g]}.items():
+                row[sym] = nxt
+            table.append(row)
+        return table, out + [[] for _ in waits]
+
+    @property
+    def state_count(self) -> int:
+        return len(self._table)
+
+    def encode(self, text: str) -> bytes:
+        """텍스트를 문자당 1바이트 심볼열로 변환 (인덱스는 원문과 1:1 대응)"""
+        return text.translate(self._symbols).encode("latin-1")
+
+    def scan(self, text: str, start: int = 0, state: int = 0,
+             matches: List[RuleMatch] | None = None,
+             trail: array | None = None) -> Tuple[int, List[RuleMatch]]:
+        """
+        text[start:]를 state에서 이어서 한 번 훑어 키워드 매칭을 누적한다.
+        trail을 주면 문자마다 도달한 상태를 기록한다(증분 재스캔용).
+        (마지막 상태, 매칭 목록)을 반환한다.
+        """
+        if matches is None:
+            matches = []
+        table, out, labels = self._table, self._out, self._labels
+        i = start
+        for sym in self.encode(text[start:]):
+            state = table[state][sym]
+            if trail is not None:
+                trail.append(state)
+            if out[state]:
+                for idx, kw, length, has_gap in out[state]:
+                    begin = _match_start(text, i, length) if has_gap else i - length + 1
+                    matches.append(RuleMatch(labels[idx], kw, begin, i + 1, idx))
+            i += 1
+        return state, matches
+
+def _match_start(text: str, end: int, length: int) -> int:
+    """공백 허용 키워드의 시작 위치: 끝에서부터 공백이 아닌 문자 length개를 거슬러 올라간다"""
+    i = end
+    while True:
+        if not text[i].isspace():
+            length -= 1
+            if length == 0:
+                return i
+        i -= 1
+
+_AUTOMATON = KeywordAutomaton(_PATTERNS, skip=(_AMOUNT_INDEX,))
+
+_DIGIT_RX = re.compile(r"\d")
+
+def _has_digit(text: str) -> bool:
+    """금액 정규식 앞단 빠른 경로: 숫자가 없으면 정규식을 돌리지 않는다"""
+    return _DIGIT_RX.search(text) is not None
+
+def scan_amounts(text: str) -> List[RuleMatch]:
+    """금액 표현(숫자+단위) 매칭"""
+    if not _has_digit(text):
+        return []
+    label = _PATTERNS[_AMOUNT_INDEX][1]
+    return [RuleMatch(label, m.group(0), m.start(), m.end(), _AMOUNT_INDEX)
+            for m in _AMOUNT_RX.finditer(text)]
+
+def rule_matches(text: str) -> List[RuleMatch]:
+    """텍스트 한 번 스캔으로 모든 룰 매칭(라벨 + 위치)을 반환"""
+    text = text or ""
+    _, matches = _AUTOMATON.scan(text)
+    matches.extend(scan_amounts(text))
+    return matches
+
+def labels_from_matches(matches: List[RuleMatch]) -> List[str]:
+    """매칭 결과를 _PATTERNS 순서의 라벨 리스트로 변환 (패턴당 최대 1회)"""
+    hit = {m.pattern_index for m in matches}
+    return [_PATTERNS[i][1] for i in sorted(hit)]
 
 def rule_hit_labels(text: str) -> List[str]:
-    """텍스트에서 위험 신호를 감지하여 라벨 리스트 반환"""
-    hits = []
+    """
+    텍스트에서 위험 신호를 감지하여 라벨 리스트 반환.
+    위치가 필요 없는 한 번짜리 검사는 컴파일된 정규식(C 구현)이 파이썬 오토마톤 루프보다 빠르다.
+    오토마톤은 위치(rule_matches)나 증분 상태(IncrementalRuleMatcher)가 필요할 때만 쓴다.
+    """
     text = text or ""
-    
-    for rx, label in _COMPILED:
-        if rx.search(text):
-            hits.append(label)
-    
-    return hits
+    return [label for rx, label in _COMPILED if rx.search(text)]
+
+# 금액 표현(숫자 + 단위)을 이룰 수 있는 글자
+_AMOUNT_CHARS = frozenset("0123456789,원만억달러KRWUSDkrwusd")
+
+def _common_prefix_len(a: str, b: str) -> int:
+    """두 문자열의 공통 접두사 길이 (슬라이스 비교로 C 레벨에서 이분 탐색)"""
+    hi = min(len(a), len(b))
+    if a[:hi] == b[:hi]:
+        return hi
+    lo = 0
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+class IncrementalRuleMatcher:
+    """
+    세션(발화)별 증분 룰 매처.
+    중간 결과(partial)는 대부분 이전 결과에 글자가 덧붙는 형태이므로
+    이전 텍스트와의 공통 접두사까지의 오토마톤 상태를 재사용하고 새 접미사만 스캔한다.
+    STT가 앞 단어를 고쳐 쓰면 처음 바뀐 글자부터 다시 스캔한다.
+    """
+    __slots__ = ("_text", "_trail", "_matches", "_amounts")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """발화가 끝나(is_final) 다음 발화를 새로 시작할 때 호출"""
+        self._text = ""
+        self._trail = array("H")   # i번째 문자까지 스캔한 뒤의 오토마톤 상태
+        self._matches: List[RuleMatch] = []
+        self._amounts: List[RuleMatch] = []
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def update(self, text: str) -> List[RuleMatch]:
+        """새 전사 텍스트를 반영하고 전체 매칭 목록을 반환"""
+        text = text or ""
+        keep = _common_prefix_len(self._text, text)
+
+        # 키워드: keep 이전에 끝난 매칭은 그대로 유효
+        if keep < len(self._trail):
+            del self._trail[keep:]
+            self._matches = [m for m in self._matches if m.end <= keep]
+        state = self._trail[keep - 1] if keep else 0
+        _AUTOMATON.scan(text, keep, state, self._matches, self._trail)
+
+        # 금액: 숫자/쉼표/공백/단위 글자를 거슬러 올라가 금액 표현이 시작되기 전부터 다시 찾는다
+        back = keep
+        while back > 0 and (text[back - 1] in _AMOUNT_CHARS or text[back - 1].isspace()
+                            or text[back - 1].isdigit()):
+            back -= 1
+        self._amounts = [m for m in self._amounts if m.end <= back]
+        if _has_digit(text[back:]):
+            label = _PATTERNS[_AMOUNT_INDEX][1]
+            self._amounts.extend(RuleMatch(label, m.group(0), m.start(), m.end(), _AMOUNT_INDEX)
+                                 for m in _AMOUNT_RX.finditer(text, back))
+
+        self._text = text
+        return self._matches + self._amounts
+
+    def labels(self) -> List[str]:
+        """현재 텍스트 기준 rule_hit_labels와 같은 라벨 리스트"""
+        return labels_from_matches(self._matches + self._amounts)
 
 def should_call_llm(text: str) -> bool:
     """LLM 분석이 필요한지 판단 (현재는 항상 True로 설정하여 모든 텍스트 분석)"""
@@ -56,5 +309,5 @@ def calculate_rule_score(labels: List[str]) -> int:
             score += 5
         elif "원격제어유도" in label:
             score += 8
-    
+
     return min(score, 50)  # 최대 50점으로 제한
@@ -0,0 +1,116 @@
+# app/ai/session_state.py
+import sys
+import threading
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+from ..config import settings
+
+# 라벨 문자열 -> 1바이트 id (프로세스 공용). 세션은 한글 라벨 문자열 대신 id만 들고 있다.
+# LLM이 목록에 없는 라벨을 지어내도 표가 커지지 않도록 상한을 넘으면 "기타"(0)로 모은다.
+_MAX_LABELS = 256
+_label_ids: Dict[str, int] = {"기타": 0}
+_label_names: List[str] = ["기타"]
+_labels_lock = threading.Lock()
+
+def intern_label(label: str) -> int:
+    label_id = _label_ids.get(label)
+    if label_id is not None:
+        return label_id
+    with _labels_lock:
+        label_id = _label_ids.get(label)
+        if label_id is None:
+            if len(_label_names) >= _MAX_LABELS:
+                return 0
+            label_id = len(_label_names)
+            _label_ids[label] = label_id
+            _label_names.append(label)
+        return label_id
+
+def label_name(label_id: int) -> str:
+    return _label_names[label_id]
+
+def intern_labels(labels: Iterable[str]) -> bytes:
+    """라벨 목록 -> id 바이트열 ("의심 없음"은 라벨이 아니므로 뺀다)"""
+    return bytes(intern_label(label) for label in labels if label and label != "의심 없음")
+
+# (발화, 점수, 라벨 id, 메모리 바이트)
+Utterance = Tuple[str, int, bytes, int]
+
+class SessionState:
+    """
+    통화 하나의 판정 상태 (통화 길이와 상관없이 메모리 고정).
+    - 최근 최종 발화: 최대 max_utterances개이면서 max_bytes 안에 드는 만큼만 링 버퍼로 유지
+      (발화 하나가 max_bytes를 넘으면 앞부분만 남긴다)
+    - 누적 점수/발화 수는 정수, 라벨은 id별 횟수 배열로만 집계 (오래된 발화 원문은 버린다)
+    memory_bytes()는 이 객체가 들고 있는 컨테이너/문자열의 실제 크기(sys.getsizeof 합)
+    """
+    __slots__ = ("max_utterances", "max_bytes", "turns", "total_score", "_recent", "_recent_bytes", "_label_counts")
+
+    def __init__(self, max_utterances: int = 8, max_bytes: int = 16384):
+        if max_utterances < 1 or max_bytes < 256:
+            raise ValueError(f"세션 상한이 너무 작습니다: max_utterances={max_utterances}, max_bytes={max_bytes}")
+        self.max_utterances = max_utterances
+        self.max_bytes = max_bytes
+        self.turns = 0
+        self.total_score = 0
+        self._recent: Deque[Utterance] = deque()
+        self._recent_bytes = 0
+        self._label_counts = array("I")
+
+    @classmethod
+    def from_settings(cls) -> "SessionState":
+        return cls(max_utterances=settings.session_recent_utterances, max_bytes=settings.session_memory_bytes)
+
+    def add(self, text: str, score: int = 0, labels: Iterable[str] = ()) -> None:
+        """판정이 끝난 최종 발화 추가 (상한을 넘으면 가장 오래된 발화부터 버린다)"""
+        if not text:
+            return
+        if sys.getsizeof(text) > self.max_bytes // 2:
+            text = text[: self.max_bytes // 8]  # 글자당 최대 4바이트 (UCS-4)
+        ids = intern_labels(labels)
+        self.turns += 1
+        self.total_score += int(score)
+        counts = self._label_counts
+        for label_id in ids:
+            if label_id >= len(counts):
+                counts.extend([0] * (label_id + 1 - len(counts)))
+            counts[label_id] += 1
+        size = sys.getsizeof(text) + sys.getsizeof(ids)
+        self._recent.append((text, int(score), ids, size))
+        self._recent_bytes += size
+        while len(self._recent) > 1 and self._over_budget():
+            self._evict(self._recent.popleft())
+
+    def _over_budget(self) -> bool:
+        return len(self._recent) > self.max_utterances or self._recent_bytes > self.max_bytes
+
+    def _evict(self, utterance: Utterance) -> None:
+        self._recent_bytes -= utterance[3]
+
+    def recent(self) -> List[str]:
+        return [item[0] for item in self._recent]
+
+    def label_counts(self) -> Dict[str, int]:
+        """통화 전체 라벨별 횟수 (많은 순)"""
+        counts = {label_name(i): n for i, n in enumerate(self._label_counts) if n}
+        return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+    def memory_bytes(self) -> int:
+        entry = sys.getsizeof(("", 0, b"", 0))
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self._recent)
+            + sum(entry + item[3] for item in self._recent)
+            + sys.getsizeof(self._label_counts)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "total_score": self.total_score,
+            "recent": len(self._recent),
+            "labels": self.label_counts(),
+            "memory_bytes": self.memory_bytes(),
+        }
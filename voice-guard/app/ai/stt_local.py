@@ -0,0 +1,155 @@
+# app/ai/stt_local.py
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config import settings
+from .audio_format import AudioFormat
+
+DEFAULT_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "stt_scripts.json")
+
+# 입력 코덱별 샘플 크기 (압축 코덱은 길이를 알 수 없어 경과 시간 기준)
+_SAMPLE_BYTES = {"pcm16": 2, "f32": 4, "mulaw": 1}
+_FINAL_DELAY = 0.2   # 발화 끝 -> 확정 결과까지 (엔드포인팅 지연 흉내)
+_LOOP_GAP = 1.0      # 대본을 다 쓰면 이 간격 뒤 처음부터 반복
+
+_scripts_cache: Dict[str, List[Dict[str, Any]]] = {}
+_session_counter = itertools.count()
+_cache_lock = threading.Lock()
+
+def load_scripts(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    대본 파일 읽기 (경로별 한 번만).
+    {"calls": [{"name": ..., "utterances": [{"start": 초, "end": 초, "text": ...}, ...]}, ...]}
+    """
+    path = path or settings.stt_script_path or DEFAULT_SCRIPT_PATH
+    with _cache_lock:
+        calls = _scripts_cache.get(path)
+        if calls is None:
+            with open(path, encoding="utf-8") as f:
+                calls = json.load(f)["calls"]
+            if not calls:
+                raise ValueError(f"대본이 비어 있습니다: {path}")
+            _scripts_cache[path] = calls
+        return calls
+
+def script_timeline(call: Dict[str, Any]) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    통화 대본 -> (오디오 시각, payload) 순서열 (끝없이 반복).
+    발화 구간 동안 단어가 하나씩 늘어나는 중간 결과, 발화 끝 직후 확정 결과.
+    """
+    utterances = sorted(call["utterances"], key=lambda u: u["start"])
+    length = max(u["end"] for u in utterances) + _FINAL_DELAY + _LOOP_GAP
+    for loop in itertools.count():
+        offset = loop * length
+        for u in utterances:
+            words = u["text"].split()
+            start, end = offset + u["start"], offset + u["end"]
+            step = (end - start) / len(words)
+            for i in range(1, len(words)):
+                yield start + step * i, {
+                    "type": "stt_update",
+                    "is_final": False,
+                    "transcript": " ".join(words[:i]),
+                    "confidence": None,
+                }
+            yield end + _FINAL_DELAY, {
+                "type": "stt_update",
+                "is_final": True,
+                "transcript": " ".join(words),
+                "confidence": 0.9,
+            }
+
+class ScriptedSTT:
+    """
+    GCP 없이 실시간 경로(WebSocket -> 룰 -> LLM)를 시험하기 위한 로컬 STT 백엔드 (StreamingSTT 계약).
+    - 대본 파일의 통화 하나를 받은 오디오 길이에 맞춰 재생한다 (오디오 내용은 보지 않고 시간만 사용)
+      실시간 속도로 보내면 실제 통화와 같은 간격으로, 빠르게 보내면 그만큼 빨리 결과가 나온다
+    - 압축 코덱(Opus/FLAC)은 길이를 알 수 없어 start() 이후 경과 시간 기준
+    - 세션마다 대본을 순서대로 돌아가며 골라 결과가 결정적
+    """
+    def __init__(
+        self,
+        sample_rate_hz: int = 16000,
+        audio_format: Optional[AudioFormat] = None,
+        call: Optional[Dict[str, Any]] = None,
+    ):
+        self.audio_format = audio_format or AudioFormat(sample_rate_hz=sample_rate_hz)
+        if call is None:
+            calls = load_scripts()
+            call = calls[next(_session_counter) % len(calls)]
+        self.call = call
+        sample_bytes = _SAMPLE_BYTES.get(self.audio_format.codec)
+        self._bytes_per_second = (
+            self.audio_format.sample_rate_hz * self.audio_format.channels * sample_bytes if sample_bytes else None
+        )
+        self._audio_seconds = 0.0
+        self._started = 0.0
+        self._running = False
+        self._tick: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()
+        self._stats = {"bytes_in": 0, "interim": 0, "final": 0}
+
+    def _now(self) -> float:
+        if self._bytes_per_second is None:
+            return time.monotonic() - self._started
+        return self._audio_seconds
+
+    def _dispatch(self, on_json, payload: dict) -> None:
+        # Google 엔진과 같이 결과 처리가 다음 결과를 막지 않도록 태스크로 실행
+        task = asyncio.create_task(on_json(payload))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def _play(self, on_json) -> None:
+        for at, payload in script_timeline(self.call):
+            while self._now() < at:
+                if not self._running:
+                    return
+                if self._bytes_per_second is None:
+                    await asyncio.sleep(min(0.05, at - self._now()))
+                else:
+                    self._tick.clear()
+                    await self._tick.wait()
+            self._stats["final" if payload["is_final"] else "interim"] += 1
+            self._dispatch(on_json, payload)
+
+    async def start(self, on_json):
+        self._running = True
+        self._started = time.monotonic()
+        self._tick = asyncio.Event()
+        self._task = asyncio.create_task(self._play(on_json))
+
+    def feed_audio(self, pcm_chunk: bytes):
+        if self._running:
+            self._stats["bytes_in"] += len(pcm_chunk)
+            if self._bytes_per_second is not None:
+                self._audio_seconds += len(pcm_chunk) / self._bytes_per_second
+                self._tick.set()
+
+    async def feed_audio_async(self, pcm_chunk: bytes):
+        self.feed_audio(pcm_chunk)
+
+    def audio_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "backend": "scripted",
+            "script": self.call.get("name"),
+            "audio_seconds": round(self._now(), 2),
+            "format": self.audio_format.describe(),
+        }
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._tick is not None:
+            self._tick.set()
+        for task in (self._task, *self._callbacks):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,151 @@
+# app/ai/stt_rotation.py
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from ..config import settings
+from .audio_format import AudioFormat
+
+# 헤더 없이 이어 붙일 수 있는 인코딩만 교체 가능 (WebM/Ogg/FLAC은 새 스트림에 컨테이너 헤더가 필요)
+_RAW_ENCODINGS = ("LINEAR16", "MULAW")
+_TIME_TOLERANCE = 0.05
+
+def is_stream_limit_error(e: BaseException) -> bool:
+    """스트림 최대 길이 초과(OUT_OF_RANGE) 여부: 오류로 끝내지 않고 다음 스트림으로 교체한다"""
+    return isinstance(e, google_exceptions.OutOfRange) or "maximum allowed stream duration" in str(e)
+
+def _seconds(value: Any) -> Optional[float]:
+    """result_end_time(timedelta 또는 Duration) -> 초, 없으면 None"""
+    if value is None:
+        return None
+    if hasattr(value, "total_seconds"):
+        return value.total_seconds()
+    if hasattr(value, "seconds"):
+        return value.seconds + getattr(value, "nanos", 0) / 1e9
+    return None
+
+class StreamSegment:
+    """
+    교체 단위 스트림 하나: 전체 타임라인에서의 시작 위치(초)와 보낸 양.
+    in_overlap: 겹침 오디오로 시작한 스트림이 아직 첫 확정 결과를 내지 않은 상태 (중복 제거 대상)
+    """
+    __slots__ = ("base_seconds", "sent_bytes", "started", "rotate", "in_overlap")
+
+    def __init__(self, base_seconds: float = 0.0, in_overlap: bool = False):
+        self.base_seconds = base_seconds
+        self.sent_bytes = 0
+        self.started = time.monotonic()
+        self.rotate = False
+        self.in_overlap = in_overlap
+
+class StreamRotation:
+    """
+    긴 통화용 STT 스트림 교체 상태 (Google 스트리밍 인식은 스트림당 길이 제한이 있음).
+    - 스트림이 max_stream_seconds(오디오 길이 또는 경과 시간)에 닿으면 엔진이 다음 스트림을 연다
+    - 다음 스트림에는 최근 overlap_seconds 오디오를 먼저 다시 보내 단어가 잘리지 않게 한다
+    - 겹친 구간의 결과는 중복 제거: 이미 확정된 구간 안에서 끝나는 결과는 버리고,
+      확정 문장 끝과 겹치는 앞 단어는 잘라낸다
+    - 타임라인은 STT로 실제 보낸 오디오 기준 (VAD가 거른 침묵은 포함하지 않음)
+    """
+    _WORD_MEMORY = 64
+
+    def __init__(self, bytes_per_second: int, frame_bytes: int, max_stream_seconds: float, overlap_seconds: float):
+        self.bytes_per_second = bytes_per_second
+        self.frame_bytes = frame_bytes
+        self.max_stream_seconds = max_stream_seconds
+        self.max_stream_bytes = int(max_stream_seconds * bytes_per_second)
+        self.overlap_bytes = int(overlap_seconds * bytes_per_second) // frame_bytes * frame_bytes
+        self._lock = threading.Lock()
+        self._recent: Deque[bytes] = deque()
+        self._recent_bytes = 0
+        self._total_bytes = 0
+        self._final_until = 0.0
+        self._final_words: Deque[str] = deque(maxlen=self._WORD_MEMORY)
+        self._stats = {"streams": 1, "rotations": 0, "replayed_bytes": 0, "dropped_results": 0, "trimmed_words": 0}
+
+    @classmethod
+    def for_format(cls, audio_format: AudioFormat) -> Optional["StreamRotation"]:
+        """교체가 꺼져 있거나(stt_stream_max_seconds <= 0) 헤더가 필요한 코덱이면 None"""
+        if settings.stt_stream_max_seconds <= 0 or audio_format.stt_encoding not in _RAW_ENCODINGS:
+            return None
+        sample_bytes = 2 if audio_format.stt_encoding == "LINEAR16" else 1
+        frame_bytes = sample_bytes * audio_format.stt_channels
+        return cls(
+            bytes_per_second=audio_format.stt_sample_rate_hz * frame_bytes,
+            frame_bytes=frame_bytes,
+            max_stream_seconds=settings.stt_stream_max_seconds,
+            overlap_seconds=settings.stt_rotation_overlap_ms / 1000.0,
+        )
+
+    def due(self, segment: StreamSegment) -> bool:
+        return (
+            segment.sent_bytes >= self.max_stream_bytes
+            or time.monotonic() - segment.started >= self.max_stream_seconds
+        )
+
+    def record(self, segment: StreamSegment, chunk: bytes) -> None:
+        """새 오디오를 현재 스트림으로 보낼 때 호출 (타임라인 전진 + 겹침 버퍼 보관)"""
+        with self._lock:
+            segment.sent_bytes += len(chunk)
+            self._total_bytes += len(chunk)
+            self._recent.append(chunk)
+            self._recent_bytes += len(chunk)
+            while self._recent and self._recent_bytes - len(self._recent[0]) >= self.overlap_bytes:
+                self._recent_bytes -= len(self._recent.popleft())
+
+    def next_segment(self) -> Tuple[StreamSegment, List[bytes]]:
+        """다음 스트림과 먼저 다시 보낼 겹침 오디오 (타임라인 위치는 겹침 시작점)"""
+        with self._lock:
+            replay = list(self._recent)
+            extra = self._recent_bytes - self.overlap_bytes
+            if replay and extra > 0:
+                replay[0] = replay[0][extra - extra % self.frame_bytes:]
+            replay_bytes = sum(len(c) for c in replay)
+            segment = StreamSegment((self._total_bytes - replay_bytes) / self.bytes_per_second, in_overlap=bool(replay))
+            segment.sent_bytes = replay_bytes
+            self._stats["streams"] += 1
+            self._stats["rotations"] += 1
+            self._stats["replayed_bytes"] += replay_bytes
+        return segment, replay
+
+    def accept(self, segment: StreamSegment, transcript: str, is_final: bool, end_time: Any) -> Optional[str]:
+        """
+        결과 하나를 전체 타임라인에 맞춰 걸러낸다.
+        내보낼 전사(겹친 앞 단어를 잘라낸 것) 또는 None(이미 확정된 구간의 중복 결과)
+        """
+        end = _seconds(end_time)
+        with self._lock:
+            overlapped = segment.in_overlap
+            if overlapped and end is not None and segment.base_seconds + end <= self._final_until + _TIME_TOLERANCE:
+                self._stats["dropped_results"] += 1
+                return None
+            words = transcript.split()
+            if overlapped:
+                k = self._overlap_words(words)
+                if k:
+                    self._stats["trimmed_words"] += k
+                    words = words[k:]
+                if not words:
+                    self._stats["dropped_results"] += 1
+                    return None
+            if is_final:
+                segment.in_overlap = False
+                if end is not None:
+                    self._final_until = max(self._final_until, segment.base_seconds + end)
+                self._final_words.extend(words)
+        return " ".join(words)
+
+    def _overlap_words(self, words: List[str]) -> int:
+        """words의 앞부분과 최근 확정 문장 끝이 겹치는 최대 단어 수"""
+        recent = list(self._final_words)
+        for k in range(min(len(words), len(recent)), 0, -1):
+            if words[:k] == recent[-k:]:
+                return k
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "audio_seconds": round(self._total_bytes / self.bytes_per_second, 1)}
@@ -2,6 +2,14 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     db_url: str = "sqlite:///./voiceguard.db"
+    # 통화 기록 목록 total: 필터 조합별 정확한 개수 캐시 TTL(초, 0이면 끔, 새 기록은 최대 이만큼 늦게 반영)과 항목 수,
+    # count=estimate일 때 직접 세는 최대 행 수
+    call_count_cache_ttl_seconds: float = 30.0
+    call_count_cache_size: int = 1024
+    call_count_estimate_cap: int = 10000
+    # POST /api/calls:bulk 요청당 최대 항목 수와 본문 최대 크기(바이트)
+    call_bulk_max_items: int = 5000
+    call_bulk_max_bytes: int = 8 * 1024 * 1024
     phone_salt: str = "dev_salt"
     allowed_origins: str = "http://localhost:5173"
 
@@ -14,6 +22,82 @@ class Settings(BaseSettings):
     gcp_project_id: str | None = None
     gcp_location: str | None = None
     google_application_credentials: str | None = None
+    # STT 백엔드: "google"(Google Cloud STT) | "scripted"(대본 재생 로컬 STT, GCP 없이 부하 시험용)
+    stt_backend: str = "google"
+    # scripted 백엔드 대본 파일 (없으면 app/ai/fixtures/stt_scripts.json)
+    stt_script_path: str | None = None
+    # STT 엔진: "async"(이벤트 루프 기반 비동기 gRPC) | "thread"(통화당 스레드, 기존 방식)
+    stt_engine: str = "async"
+    # STT 오디오 큐가 가득 찼을 때: "block"(수신 대기, TCP 역압) | "coalesce"(프레임 합치기) | "drop"(버림, 집계)
+    stt_backpressure: str = "coalesce"
+    # STT 오디오 큐 길이(청크 수)와 합친 프레임 최대 크기(바이트, Google 스트리밍 요청당 권장 한도)
+    stt_queue_max_chunks: int = 64
+    stt_max_frame_bytes: int = 25600
+    # STT 앞단 음성 구간 검출(VAD): 침묵 프레임은 Google로 보내지 않음 (임계 dBFS, 음성 뒤 유지/앞 포함 구간 ms)
+    stt_vad: bool = True
+    stt_vad_threshold_db: float = -45.0
+    stt_vad_hangover_ms: int = 800
+    stt_vad_preroll_ms: int = 200
+    # STT 스트림 교체: 스트림당 최대 길이(초, Google 한도 약 305초보다 짧게, 0이면 끔)와 새 스트림에 다시 보낼 겹침 오디오(ms)
+    stt_stream_max_seconds: float = 280.0
+    stt_rotation_overlap_ms: int = 2000
+
+    # 위험도 분석 백엔드: "vertex"(Gemini) | "local"(프로세스 내 문자 n-gram 분류기, Vertex 없이 동작)
+    risk_backend: str = "vertex"
+    # Vertex 호출 실패(장애/쿼터) 시 기본값 대신 로컬 분류기 결과 사용
+    risk_local_fallback: bool = True
+    # 로컬 분류기 학습 파일(없으면 app/ai/fixtures/risk_train.json)과 라벨 판정 확률 임계값
+    risk_local_train_path: str | None = None
+    risk_local_threshold: float = 0.5
+    # 위험도 판정 단계(cascade): 룰/로컬 분류기로 명확한 최종 발화는 바로 판정하고 불확실한 발화만 LLM으로
+    # (끄면 모든 최종 발화를 LLM으로)
+    cascade_enabled: bool = True
+    # 로컬 분류기 최대 라벨 확률: low 미만(룰 미검출)이면 안전, high 이상(룰도 검출)이면 위험으로 확정
+    cascade_low: float = 0.2
+    cascade_high: float = 0.9
+    # 룰 점수가 이 값 이상이면 LLM 없이 위험으로 확정
+    cascade_rule_certain: int = 30
+    # 통화별 상태 상한: 원문으로 들고 있을 최근 최종 발화 수와 세션 상태 메모리(바이트, 넘으면 오래된 발화부터 버림)
+    session_recent_utterances: int = 8
+    session_memory_bytes: int = 16384
+    # LLM 프롬프트 문맥: 원문으로 넣을 최근 발화 수와 토큰 예산, 그보다 오래된 대화 요약의 토큰 예산
+    llm_context_turns: int = 5
+    llm_context_recent_tokens: int = 240
+    llm_context_summary_tokens: int = 120
+    # 시스템 프롬프트 포함 입력 추정 토큰 상한 (넘으면 요약 -> 오래된 발화 -> 현재 발화 순으로 줄임)
+    llm_max_prompt_tokens: int = 1024
+    # LLM(Vertex) 공용 클라이언트 커넥션 풀 크기
+    llm_max_connections: int = 32
+    # LLM 호출 1회당 타임아웃(초)
+    llm_timeout_seconds: float = 10.0
+    # LLM 스케줄러: 전역 동시 호출 수, 대기열 길이, 요청별 마감 시간(초)
+    # 마감 시간은 최종 전사 후 판정까지의 SLO(1.5초): 넘기면 룰 점수 사용
+    llm_max_concurrency: int = 8
+    llm_max_queue: int = 256
+    llm_deadline_seconds: float = 1.5
+    # 지연 예산 기반 재시도: hedge 지연(ms, adaptive면 최근 응답 p95), 최대 시도 수, 쿼터 초과 시 백오프(ms)
+    llm_hedge_delay_ms: int = 700
+    llm_hedge_adaptive: bool = True
+    llm_max_attempts: int = 3
+    llm_backoff_base_ms: int = 100
+    llm_backoff_max_ms: int = 800
+    # 누적 위험도가 이 값 이상인 통화의 발화는 우선 처리
+    llm_priority_risk_threshold: int = 30
+    # 위험도 분석 결과 캐시: 항목 수(0이면 끔), TTL(초), SQLite 파일 경로(선택)
+    analysis_cache_size: int = 4096
+    analysis_cache_ttl_seconds: float = 3600.0
+    analysis_cache_path: str | None = None
+    # 마이크로 배칭: 동시에 들어온 발화를 최대 N개, 최대 대기 시간(ms)까지 모아 한 번에 분석
+    # (배치 호출은 문맥 없이 발화만 보내므로 /voice-guard/ws/stt는 이전 문맥이 없는 발화만 배칭)
+    llm_batching: bool = False
+    llm_batch_max_size: int = 8
+    llm_batch_max_wait_ms: int = 100
+    # 로깅: 레벨, 형식("text" | "json"), DEBUG일 때 호출별 상세 추적 샘플링 비율(0이면 끔)
+    log_level: str = "INFO"
+    log_format: str = "text"
+    trace_sample_rate: float = 0.0
+    # WebSocket 프로토콜에 [DEBUG]/[CASCADE] 진단 프레임 전송 여부 (운영에서는 끔)
+    ws_debug_frames: bool = False
 
     model_config = SettingsConfigDict(env_file=".env", env_prefix="", case_sensitive=False)
 
@@ -1,17 +1,42 @@
 # app/main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
 from .config import settings
+from .utils.log import configure_logging, shutdown_logging
 from .db import Base, engine
+from .migrations import run_migrations
 from .routers import call_logs, uploads, realtime, voice_guard
+from .ai import get_risk_analyzer, close_risk_analyzer, close_analysis_cache, close_llm_scheduler, close_risk_batcher, close_stt_clients, get_risk_cascade
+
+# 구조화 로깅 (레벨/형식은 settings.log_level, settings.log_format)
+configure_logging()
 
 # DB 모델 자동생성
 Base.metadata.create_all(bind=engine)
+# 기존 DB에 새 인덱스/보조 테이블 내용 적용 (create_all은 기존 테이블을 바꾸지 않음)
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # 프로세스 공용 위험도 분석기(genai.Client + 커넥션 풀)를 시작 시 한 번만 생성
+    voice_guard._setup_gcp_credentials()
+    get_risk_analyzer()
+    # 판정 cascade의 로컬 분류기도 시작 시 학습 (첫 발화에서 지연되지 않도록)
+    get_risk_cascade()
+    yield
+    await close_risk_batcher()
+    await close_llm_scheduler()
+    await close_risk_analyzer()
+    close_analysis_cache()
+    await close_stt_clients()
+    shutdown_logging()
 
-app = FastAPI(title="VoiceGuard API - 통합 시스템")
+app = FastAPI(title="VoiceGuard API - 통합 시스템", lifespan=lifespan)
 
 # CORS: 프론트 로컬 개발 주소 허용
 origins = [o.strip() for o in settings.allowed_origins.split(",") if o.strip()]
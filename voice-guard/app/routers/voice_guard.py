@@ -1,12 +1,22 @@
 # app/routers/voice_guard.py
 # voice-guard의 원본 로직을 그대로 유지
 import os
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import json
+import asyncio
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 
-from ..ai import GoogleStreamingSTT, rule_hit_labels, calculate_rule_score, VertexRiskAnalyzer
+from ..config import settings
+from ..utils.log import get_logger
+from ..ai import (
+    create_streaming_stt, rule_hit_labels, RiskModel, VertexRiskAnalyzer, get_risk_analyzer,
+    LLMScheduler, LLMSchedulerError, llm_priority, get_llm_scheduler, get_analysis_cache,
+    RiskBatcher, get_risk_batcher, get_local_risk_classifier, RiskCascade, get_risk_cascade, cascade_totals, SessionContext, audio_queue_totals, vad_totals, AudioFormat, DEFAULT_AUDIO_FORMAT,
+)
 
 router = APIRouter(prefix="/voice-guard", tags=["voice-guard"])
+logger = get_logger("routers.voice_guard")
 
 # 자격증명/경로 설정 (voice-guard 원본 로직)
 def _setup_gcp_credentials():
@@ -30,14 +40,14 @@ def _setup_gcp_credentials():
                 project_id = key_data.get('project_id')
                 if project_id:
                     os.environ["GCP_PROJECT_ID"] = project_id
-                    print(f"✅ GCP_PROJECT_ID 자동 설정: {project_id}")
+                    logger.info("GCP_PROJECT_ID 자동 설정: %s", project_id)
         except Exception as e:
-            print(f"⚠️ GCP_PROJECT_ID 자동 설정 실패: {e}")
+            logger.warning("GCP_PROJECT_ID 자동 설정 실패: %s", e)
 
     # GCP 위치 기본값 설정
     if not os.environ.get("GCP_LOCATION"):
         os.environ["GCP_LOCATION"] = "us-central1"
-        print(f"✅ GCP_LOCATION 기본값 설정: us-central1")
+        logger.info("GCP_LOCATION 기본값 설정: us-central1")
 
 @router.get("/")
 def voice_guard_index():
@@ -86,6 +96,35 @@ def voice_guard_diag_stt():
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+@router.get("/diag/llm")
+def voice_guard_diag_llm(
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    batcher: Optional[RiskBatcher] = Depends(get_risk_batcher),
+    analyzer: Optional[RiskModel] = Depends(get_risk_analyzer),
+):
+    cache = get_analysis_cache()
+    return {
+        "ok": True,
+        "scheduler": scheduler.stats(),
+        "backend": settings.risk_backend,
+        "calls": analyzer.retry_policy.stats() if isinstance(analyzer, VertexRiskAnalyzer) else None,
+        "prompt": analyzer.prompt_stats() if isinstance(analyzer, VertexRiskAnalyzer) else None,
+        "local": get_local_risk_classifier().stats() if settings.risk_backend == "local" or settings.risk_local_fallback else None,
+        "cache": cache.stats() if cache else None,
+        "batcher": batcher.stats() if batcher else None,
+        "cascade": cascade_totals(),
+    }
+
+@router.get("/diag/audio")
+def voice_guard_diag_audio():
+    """STT 오디오 큐/VAD 누적 통계 (버린 바이트, 큐 깊이 최고치, 침묵으로 거른 비율 등) - 워커 크기 산정용"""
+    return {
+        "ok": True,
+        "backpressure": settings.stt_backpressure,
+        "audio_queue": audio_queue_totals(),
+        "vad": vad_totals() if settings.stt_vad else None,
+    }
+
 @router.get("/diag/vertex")
 def voice_guard_diag_vertex():
     try:
@@ -100,9 +139,35 @@ def voice_guard_diag_vertex():
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+async def _negotiate_audio_format(ws: WebSocket) -> Tuple[Optional[AudioFormat], Optional[bytes]]:
+    """
+    첫 메시지로 오디오 형식 협상.
+    - 텍스트 {"type":"start","codec":...,"sampleRate":...,"channels":...}: 형식을 정하고 [READY] 응답
+    - 바이너리: 핸드셰이크 없는 기존 클라이언트(16kHz mono pcm16), 받은 청크는 첫 오디오로 사용
+    형식이 잘못됐으면 [ERROR]를 보내고 (None, None)
+    """
+    msg = await ws.receive()
+    if msg.get("type") == "websocket.disconnect":
+        raise WebSocketDisconnect(msg.get("code", 1000))
+    if msg.get("bytes") is not None:
+        return DEFAULT_AUDIO_FORMAT, msg["bytes"]
+    try:
+        audio_format = AudioFormat.from_start(json.loads(msg.get("text") or ""))
+    except ValueError as e:
+        await ws.send_text(f"[ERROR] {e}")
+        return None, None
+    await ws.send_text(f"[READY] {json.dumps(audio_format.describe(), ensure_ascii=False)}")
+    return audio_format, None
+
 # voice-guard의 원본 STT WebSocket (그대로 유지)
 @router.websocket("/ws/stt")
-async def ws_stt(ws: WebSocket):
+async def ws_stt(
+    ws: WebSocket,
+    analyzer: Optional[RiskModel] = Depends(get_risk_analyzer),
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    batcher: Optional[RiskBatcher] = Depends(get_risk_batcher),
+    cascade: RiskCascade = Depends(get_risk_cascade),
+):
     await ws.accept()
     stt = None
     
@@ -111,11 +176,14 @@ async def ws_stt(ws: WebSocket):
     
     # 누적 점수 시스템
     total_risk_score = 0
-    session_utterances = []
+    # 통화 상태 + LLM 문맥: 최근 발화 + 오래된 발화 요약, 누적 점수/라벨 횟수 (통화가 길어도 메모리 고정)
+    context = SessionContext.from_settings()
+    # 진행 중인 LLM 분석 태스크 (소켓 종료 시 취소)
+    llm_tasks: set = set()
 
     async def on_json(payload: dict):
         """STT 결과를 WebSocket으로 전송"""
-        nonlocal total_risk_score, session_utterances  # 외부 변수 접근
+        nonlocal total_risk_score  # 외부 변수 접근
         try:
             if payload.get("type") == "stt_update":
                 if payload.get("is_final"):
@@ -127,33 +195,76 @@ async def ws_stt(ws: WebSocket):
                     labels = rule_hit_labels(text)
                     await ws.send_text(f"[FILTER] 룰 필터 결과: {labels}")
                     
-                    # 2단계: 분석 실행 및 점수 계산
-                    current_score = 0
+                    # 2단계: cascade 판정 - 명확한 발화는 룰/로컬 분류기에서 끝내고 불확실한 발화만 LLM 분석
+                    # (분석기가 없으면 불확실 구간도 로컬 분류기로 끝낸다)
+                    decision = cascade.decide(text, labels, llm_available=analyzer is not None)
+                    if settings.ws_debug_frames:
+                        await ws.send_text(f"[CASCADE] {json.dumps(decision.describe(), ensure_ascii=False)}")
+                    # 점수와 라벨은 같은 출처에서 (LLM 판정이면 LLM 라벨, 생략/실패면 룰/로컬 라벨)
+                    current_score = decision.score
+                    current_labels = decision.labels
                     
-                    if labels:  # 룰 필터에 걸린 경우
-                        await ws.send_text(f"[RULE_SCORE] 룰 기반 점수 계산...")
-                        current_score = calculate_rule_score(labels)
+                    if decision.tier == "rule":  # 룰 점수로 위험 확정
                         await ws.send_text(f"[RULE_SCORE] 룰 기반 위험도: {current_score}점 ({', '.join(labels)})")
-                    else:  # 룰 필터에 걸리지 않은 경우
+                    elif not decision.needs_llm:  # 로컬 분류기로 안전/위험 확정
+                        await ws.send_text(f"[LOCAL_SCORE] 로컬 분류기 위험도: {current_score}점 ({', '.join(decision.labels) or '의심 없음'})")
+                    else:  # 불확실 구간
                         await ws.send_text(f"[ANALYSIS] LLM 분석 시작...")
                         try:
-                            analyzer = VertexRiskAnalyzer()
-                            # analyze() 메서드에 필요한 매개변수 전달
-                            data = analyzer.analyze(text, session_utterances)
+                            if analyzer is None:
+                                raise RuntimeError("위험도 분석기가 초기화되지 않았습니다 (GCP 설정 확인)")
+                            # analyze_async(): 응답 대기 중에도 다른 소켓의 오디오 수신이 멈추지 않음
+                            # 전역 스케줄러가 동시 호출 수와 마감 시간을 관리 (위험 통화 우선)
+                            priority = llm_priority(decision.rule_score, total_risk_score)
+                            recent, summary = context.recent(), context.summary()
+                            partial: dict = {}  # 마지막으로 보낸 부분 결과 (마감 초과 시 판정으로 유지)
+                            if batcher is not None and not recent and not summary:
+                                # 배치 호출은 발화 텍스트만 보내므로, 이전 문맥이 없는 발화만 다른 세션의 발화와 묶는다
+                                task = asyncio.create_task(batcher.analyze(text, priority=priority))
+                            else:
+                                # 스트리밍 응답에서 먼저 완성된 필드(risk_score/risk_level 등)를 바로 전달
+                                async def send_partial(fields: dict):
+                                    partial.clear()
+                                    partial.update(fields)
+                                    await ws.send_text(f"[RISK_PARTIAL] {fields}")
+
+                                task = asyncio.create_task(scheduler.submit(
+                                    lambda: analyzer.analyze_async(text, recent, summary=summary, on_partial=send_partial),
+                                    priority=priority,
+                                ))
+                            llm_tasks.add(task)
+                            task.add_done_callback(llm_tasks.discard)
+                            data = await task
                             current_score = data.get("risk_score", 0)
+                            current_labels = data.get("labels", [])
                             await ws.send_text(f"[RISK] {data}")
+                        except LLMSchedulerError as e:
+                            if "risk_score" in partial:
+                                # 이미 보낸 부분 점수를 판정으로 유지 (HIGH를 보낸 뒤 더 낮은 잠정 점수로 뒤집지 않음)
+                                current_score = partial["risk_score"]
+                                current_labels = partial.get("labels", decision.labels)
+                                await ws.send_text(f"[RISK_DEGRADED] LLM 분석 중단({e.reason}): {e} - 부분 결과 점수 {current_score}점 유지")
+                                await ws.send_text(f"[RISK] {dict(partial, partial=True)}")
+                            else:
+                                # LLM을 건너뛴 사실을 명시적으로 알리고 룰/로컬 잠정 점수 사용
+                                current_score = decision.score
+                                current_labels = decision.labels
+                                await ws.send_text(f"[RISK_DEGRADED] LLM 분석 생략({e.reason}): {e} - 잠정 점수 {current_score}점 사용")
                         except Exception as e:
                             await ws.send_text(f"[RISK_ERROR] {e}")
-                            # LLM 분석 실패 시 명시적으로 0점 설정
-                            current_score = 0
-                            await ws.send_text(f"[DEBUG] LLM 분석 실패로 0점 설정")
+                            # LLM 분석 실패 시 룰/로컬 잠정 점수 사용
+                            current_score = decision.score
+                            current_labels = decision.labels
+                            if settings.ws_debug_frames:
+                                await ws.send_text(f"[DEBUG] LLM 분석 실패로 잠정 점수 {current_score}점 사용")
                     
-                    # 디버깅: 현재 점수 확인
-                    await ws.send_text(f"[DEBUG] 현재 발화 점수: {current_score}점")
+                    # 디버깅: 현재 점수 확인 (ws_debug_frames=True일 때만 전송)
+                    if settings.ws_debug_frames:
+                        await ws.send_text(f"[DEBUG] 현재 발화 점수: {current_score}점")
                     
                     # 3단계: 누적 점수 계산 및 출력
-                    total_risk_score += current_score
-                    session_utterances.append(text)
+                    context.add(text, current_score, current_labels)
+                    total_risk_score = context.total_score
                     
                     await ws.send_text(f"[ACCUMULATED] 누적 점수: {total_risk_score}점 (현재: +{current_score}점)")
                     
@@ -180,14 +291,20 @@ async def ws_stt(ws: WebSocket):
             await ws.send_text(f"[ERROR] on_json 처리 오류: {e}")
     
     try:
-        stt = GoogleStreamingSTT()
+        audio_format, first_chunk = await _negotiate_audio_format(ws)
+        if audio_format is None:
+            await ws.close(code=1003)
+            return
+        stt = create_streaming_stt(audio_format=audio_format)
         await stt.start(on_json)
+        if first_chunk:
+            await stt.feed_audio_async(first_chunk)
         
         while True:
             # WebSocket에서 오디오 데이터 수신
             try:
                 data = await ws.receive_bytes()
-                stt.feed_audio(data)
+                await stt.feed_audio_async(data)
             except Exception as e:
                 # 텍스트 메시지 처리 (예: "__END__")
                 try:
@@ -198,14 +315,22 @@ async def ws_stt(ws: WebSocket):
                     else:
                         await ws.send_text(f"[INFO] 텍스트 메시지 수신: {text_data}")
                 except Exception as text_e:
-                    print(f"WebSocket 데이터 수신 오류: {e}")
+                    logger.warning("WebSocket 데이터 수신 오류: %s", e)
                     break
             
     except WebSocketDisconnect:
-        print("WebSocket 연결 종료")
+        logger.info("WebSocket 연결 종료")
     except Exception as e:
-        print(f"WebSocket 오류: {e}")
+        logger.error("WebSocket 오류: %s", e)
         await ws.send_text(f"[ERROR] {str(e)}")
     finally:
+        for task in list(llm_tasks):
+            task.cancel()
+        logger.info("통화 세션 상태", extra={"fields": context.stats()})
         if stt:
             stt.close()
+            audio = stt.audio_stats()
+            if audio.get("dropped_chunks"):
+                logger.warning("STT 오디오 손실 (큐 포화)", extra={"fields": audio})
+            else:
+                logger.info("STT 오디오 큐 통계", extra={"fields": audio})
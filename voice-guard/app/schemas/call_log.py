@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import date
 from .common import PageMeta
 
@@ -27,3 +27,12 @@ class CallResponse(BaseModel):
 class CallList(BaseModel):
     meta: PageMeta
     items: List[CallResponse]
+
+class CallBulkError(BaseModel):
+    index: int   # 입력 순서 (0부터, NDJSON은 빈 줄 제외)
+    error: str
+
+class CallBulkResult(BaseModel):
+    inserted: int
+    ids: List[Optional[int]]   # 입력 순서대로 저장된 id, 거부된 항목은 null
+    errors: List[CallBulkError]
@@ -1,7 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class PageMeta(BaseModel):
     page: int
     size: int
-    total: int
+    total: Optional[int] = None       # count=none이면 없음
+    totalEstimated: bool = False      # total이 추정값(하한 포함)인지
     hasNext: bool
+    nextCursor: Optional[str] = None  # 다음 페이지 커서 (cursor 파라미터로 전달)
@@ -0,0 +1,85 @@
+# app/utils/log.py
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from typing import Any, Optional
+
+from ..config import settings
+
+_ROOT = "voiceguard"
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+class _TextFormatter(logging.Formatter):
+    """사람이 읽는 한 줄 형식: 메시지 뒤에 key=value 필드"""
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v!r}" for k, v in fields.items())
+        return line
+
+class _JsonFormatter(logging.Formatter):
+    """수집기용 JSON 한 줄 형식"""
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        return json.dumps(payload, ensure_ascii=False, default=repr)
+
+def configure_logging() -> None:
+    """
+    앱 로거 설정 (여러 번 불러도 한 번만 적용).
+    - 레벨: settings.log_level, 형식: settings.log_format ("text" | "json")
+    - 호출한 스레드(이벤트 루프)에서는 큐에 넣기만 하고, 실제 stdout 쓰기는 별도 스레드가 처리
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        if settings.log_format == "json":
+            stream.setFormatter(_JsonFormatter())
+        else:
+            stream.setFormatter(_TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        logger = logging.getLogger(_ROOT)
+        logger.setLevel(settings.log_level.upper())
+        logger.handlers = [logging.handlers.QueueHandler(records)]
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, stream)
+        _listener.start()
+
+def shutdown_logging() -> None:
+    """남은 로그를 모두 쓰고 쓰기 스레드 종료"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{_ROOT}.{name}")
+
+def trace(logger: logging.Logger, event: str, **fields: Any) -> None:
+    """
+    호출별 상세 추적(원본 응답, 파싱 결과 등).
+    DEBUG 레벨이고 settings.trace_sample_rate 확률로 샘플링된 경우에만 기록한다.
+    꺼져 있으면 필드 포맷팅(repr 등)은 전혀 일어나지 않는다.
+    """
+    rate = settings.trace_sample_rate
+    if rate <= 0 or not logger.isEnabledFor(logging.DEBUG):
+        return
+    if rate < 1 and random.random() >= rate:
+        return
+    logger.debug(event, extra={"fields": fields})
@@ -0,0 +1,10 @@
+# app/utils/text.py
+"""외부 의존성 없는 전사 텍스트 유틸 (STT 클라이언트와 캐시 키 정규화가 함께 사용)"""
+
+SPACEPIECE = "\u2581"  # '▁'
+
+def clean_text(s: str) -> str:
+    if not s:
+        return s
+    s = s.replace(SPACEPIECE, " ")
+    return " ".join(s.split()).strip()